@@ -1,12 +1,20 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
+from fastapi.responses import Response
+from datetime import datetime, timedelta
 from typing import Optional
 from pydantic import BaseModel
 from dotenv import load_dotenv
+import os
+import threading
+import numpy as np
 
 from traffic_predictor import TrafficPredictor
 from route_optimizer import RouteOptimizer
+from traffic_grid import batch_predictor, encode_grid, grid_axes, grid_shape, predict_grid, time_axis
+from road_graph import LocalRouteOptimizer, RoadGraph
+from traffic_cache import TileCache
+from model_manager import ModelManager
 
 # Load environment variables
 load_dotenv()
@@ -29,12 +37,47 @@ app.add_middleware(
 
 # Initialize components
 traffic_predictor = TrafficPredictor()
-route_optimizer = RouteOptimizer(traffic_predictor)
+predict_batch = batch_predictor(traffic_predictor)
+# Point predictions and route costs are served per geohash tile and hour of
+# the week; saving a new TRAFFIC_MODEL_FILE clears the cache
+model_manager = ModelManager("models")
+traffic_model_file = os.getenv('TRAFFIC_MODEL_FILE', 'traffic_model.h5')
+tile_cache = TileCache(predict_batch, precision=int(os.getenv('TRAFFIC_TILE_PRECISION', '6')),
+                       max_entries=int(os.getenv('TRAFFIC_CACHE_ENTRIES', '1000000')),
+                       version=lambda: model_manager.get_model_version(traffic_model_file))
+# ROAD_GRAPH points at a road graph file (see road_graph.py) to route locally
+# between 'lat,lng' locations instead of through Google Maps
+if os.getenv('ROAD_GRAPH'):
+    route_optimizer = LocalRouteOptimizer(RoadGraph.load(os.getenv('ROAD_GRAPH')), tile_cache,
+                                          congestion_weight=float(os.getenv('CONGESTION_WEIGHT', '1.0')))
+    tile_cache.add_listener(route_optimizer.traffic.invalidate)
+else:
+    route_optimizer = RouteOptimizer(traffic_predictor)
+
+# Largest heatmap (time steps x cells) served in one request
+MAX_HEATMAP_CELLS = 4_000_000
+# Most departure slots evaluated by one /optimize-route sweep
+MAX_DEPARTURE_SLOTS = 672
+
+@app.on_event("startup")
+def precompute_traffic():
+    """
+    Fill the tile cache for TRAFFIC_PRECOMPUTE_AREA ('min_lat,min_lng,max_lat,max_lng')
+    over the next TRAFFIC_PRECOMPUTE_HOURS hours (default 24) in the background
+    """
+    area = os.getenv('TRAFFIC_PRECOMPUTE_AREA')
+    if area:
+        bounds = [float(value) for value in area.split(',')]
+        threading.Thread(target=tile_cache.precompute, args=(*bounds, int(os.getenv('TRAFFIC_PRECOMPUTE_HOURS', '24'))),
+                         name="traffic-precompute", daemon=True).start()
 
 class RouteRequest(BaseModel):
     origin: str
     destination: str
     departure_time: Optional[datetime] = None
+    # Set to sweep departures from departure_time (default: now) to this time
+    departure_window_end: Optional[datetime] = None
+    step_minutes: int = 15
 
 @app.get("/")
 def read_root():
@@ -50,18 +93,45 @@ def optimize_route(route_request: RouteRequest):
     """
     Get the optimal route between two points
     
+    With departure_window_end set, every departure from departure_time to
+    departure_window_end, step_minutes apart, is evaluated instead (local
+    routing only).
+    
     Args:
         route_request: RouteRequest object containing origin and destination
         
     Returns:
-        Optimized route information including traffic predictions
+        Optimized route information including traffic predictions, or the
+        travel-time curve and the best departure for a sweep
     """
     try:
+        if route_request.departure_window_end is not None:
+            if not isinstance(route_optimizer, LocalRouteOptimizer):
+                raise HTTPException(status_code=400, detail="Departure sweeps need a local road graph (ROAD_GRAPH)")
+            start = route_request.departure_time or datetime.now()
+            if route_request.step_minutes <= 0 or route_request.departure_window_end < start:
+                raise HTTPException(status_code=400, detail="Need step_minutes > 0 and a window ending after it starts")
+            slots = (route_request.departure_window_end - start) // timedelta(minutes=route_request.step_minutes) + 1
+            if slots > MAX_DEPARTURE_SLOTS:
+                raise HTTPException(status_code=400,
+                                    detail=f"Window has {slots} departure slots, more than {MAX_DEPARTURE_SLOTS}")
+            return route_optimizer.sweep_departures(
+                route_request.origin,
+                route_request.destination,
+                start,
+                route_request.departure_window_end,
+                timedelta(minutes=route_request.step_minutes)
+            )
+        
         return route_optimizer.get_optimal_route(
             route_request.origin,
             route_request.destination,
             route_request.departure_time
         )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -89,7 +159,7 @@ def get_traffic_prediction(latitude: float, longitude: float, time: Optional[dat
             longitude
         ]
         
-        prediction = traffic_predictor.predict_traffic(features)
+        prediction = tile_cache(np.array([features], dtype=np.float32))[0]
         return {
             "location": {"lat": latitude, "lng": longitude},
             "time": time.isoformat(),
@@ -98,6 +168,65 @@ def get_traffic_prediction(latitude: float, longitude: float, time: Optional[dat
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/traffic-heatmap")
+def get_traffic_heatmap(min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                        resolution: float = 0.01, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None, step_minutes: int = 60):
+    """
+    Get traffic predictions for every cell of a bounding box over a time range
+    
+    Args:
+        min_lat, min_lng, max_lat, max_lng: Bounding box in degrees
+        resolution: Cell size in degrees (default: 0.01)
+        start: First prediction time (defaults to current time)
+        end: Last prediction time (defaults to start)
+        step_minutes: Minutes between prediction times (default: 60)
+        
+    Returns:
+        Binary grid of little-endian float16 traffic predictions in C order
+        with shape (times, latitudes, longitudes). Latitudes and longitudes
+        ascend from the cell centres in X-Grid-Origin, X-Grid-Resolution
+        degrees apart; the shape is in X-Grid-Shape and the first time and
+        step in X-Grid-Start and X-Grid-Step-Minutes.
+    """
+    try:
+        if start is None:
+            start = datetime.now()
+        if end is None:
+            end = start
+            
+        step = timedelta(minutes=step_minutes)
+        try:
+            # Sized arithmetically first, so an oversized grid is rejected before its axes are built
+            n_times, n_lats, n_lngs = grid_shape(min_lat, min_lng, max_lat, max_lng, resolution, start, end, step)
+            cells = n_times * n_lats * n_lngs
+            if cells > MAX_HEATMAP_CELLS:
+                raise ValueError(f"Grid has {cells} cells, more than {MAX_HEATMAP_CELLS}; "
+                                 "use a coarser resolution, a smaller box or fewer time steps")
+            lats, lngs = grid_axes(min_lat, min_lng, max_lat, max_lng, resolution)
+            times = time_axis(start, end, step)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+            
+        grid = predict_grid(predict_batch, times, lats, lngs)
+        return Response(content=encode_grid(grid), media_type="application/octet-stream", headers={
+            "X-Grid-Shape": f"{len(times)},{len(lats)},{len(lngs)}",
+            "X-Grid-Dtype": "float16",
+            "X-Grid-Origin": f"{lats[0]},{lngs[0]}",
+            "X-Grid-Resolution": str(resolution),
+            "X-Grid-Start": start.isoformat(),
+            "X-Grid-Step-Minutes": str(step_minutes)
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/traffic-cache-metrics")
+def traffic_cache_metrics():
+    """Tile cache size, hit rate and evictions"""
+    return tile_cache.metrics()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
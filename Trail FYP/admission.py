@@ -0,0 +1,131 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a lane cannot take a request
+
+    Attributes:
+        lane: Name of the saturated lane
+        status_code: 429 if the lane's queue was full, 503 if the request
+            waited in the queue until its deadline
+        retry_after: Suggested seconds before retrying
+    """
+
+    def __init__(self, lane: str, status_code: int, retry_after: int):
+        reason = "queue is full" if status_code == 429 else "queue wait deadline expired"
+        super().__init__(f"{lane} lane is saturated ({reason}), retry in {retry_after}s")
+        self.lane = lane
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class Lane:
+    """
+    Concurrency limit with a bounded, deadline-limited wait queue
+
+    Up to ``max_concurrency`` requests run at once. Up to ``max_queue`` more
+    wait for a slot, each for at most ``queue_timeout`` seconds; anything
+    beyond that is rejected immediately, so a saturated lane answers fast
+    instead of tying up server threads.
+
+    Args:
+        name: Lane name used in errors and metrics
+        max_concurrency: Requests allowed to run at once
+        max_queue: Requests allowed to wait for a slot
+        queue_timeout: Seconds a request may wait before it is rejected
+        service_time: Initial estimate of seconds per request, used for
+            Retry-After until requests have been timed
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float,
+                 service_time: float = 1.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.service_time = service_time
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._condition = threading.Condition()
+
+    def _retry_after(self) -> int:
+        # Time for the requests ahead to drain through the lane's slots
+        return max(1, math.ceil(self.service_time * (self.active + self.waiting + 1) / self.max_concurrency))
+
+    @contextmanager
+    def admit(self):
+        """
+        Hold a slot in the lane for the duration of the block
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait deadline expires
+        """
+        with self._condition:
+            if self.active >= self.max_concurrency:
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise AdmissionRejected(self.name, 429, self._retry_after())
+                self.waiting += 1
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self.active >= self.max_concurrency:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timed_out += 1
+                            raise AdmissionRejected(self.name, 503, self._retry_after())
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+
+        began = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.active -= 1
+                self.completed += 1
+                self.service_time = 0.8 * self.service_time + 0.2 * (time.monotonic() - began)
+                self._condition.notify()
+
+    def metrics(self) -> dict:
+        with self._condition:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "active": self.active,
+                "waiting": self.waiting,
+                "completed": self.completed,
+                "rejected_queue_full": self.rejected,
+                "rejected_deadline": self.timed_out,
+                "service_time": self.service_time
+            }
+
+class AdmissionController:
+    """
+    Separate lanes for classes of expensive work, so that one class
+    saturating its lane (e.g. training) cannot starve another (e.g.
+    predictions). Cheap reads should not go through a lane at all.
+    """
+
+    def __init__(self):
+        self.lanes: Dict[str, Lane] = {}
+
+    def add_lane(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float,
+                 service_time: float = 1.0) -> Lane:
+        self.lanes[name] = Lane(name, max_concurrency, max_queue, queue_timeout, service_time)
+        return self.lanes[name]
+
+    def admit(self, name: str):
+        """Context manager holding a slot in the named lane"""
+        return self.lanes[name].admit()
+
+    def metrics(self) -> Dict[str, dict]:
+        return {name: lane.metrics() for name, lane in self.lanes.items()}
@@ -0,0 +1,140 @@
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import requests
+
+from series_store import BAR_DTYPE
+
+API_URL = 'https://www.alphavantage.co/query'
+BULK_QUOTE_LIMIT = 100  # Symbols per REALTIME_BULK_QUOTES call
+
+def parse_csv_bars(text: str) -> np.ndarray:
+    """
+    Parse a datatype=csv time series straight into bar records
+
+    Each column is converted from a strided slice of the flat cell list in a
+    single numpy call, so no intermediate DataFrame, object array or float64
+    copy is built. Alpha Vantage lists the newest bar first; the slices are
+    taken back to front so the records come out in ascending time order.
+    Columns other than timestamp, open, high, low, close and volume (e.g.
+    adjusted_close) are skipped.
+
+    Args:
+        text: CSV payload with a header row
+
+    Returns:
+        Bars as SeriesStore records in ascending time order
+
+    Raises:
+        ValueError: If the payload is not a time series CSV
+    """
+    header, _, body = text.replace('\r', '').partition('\n')
+    names = header.split(',')
+    if names[0] != 'timestamp' or not set(BAR_DTYPE.names) <= set(names):
+        raise ValueError(f"Unexpected payload: {text[:200]}")
+
+    cells = body.replace('\n', ',').split(',')
+    if cells[-1] == '':
+        cells.pop()
+    width = len(names)
+    if len(cells) % width:
+        raise ValueError("Malformed CSV payload: ragged rows")
+
+    rows = len(cells) // width
+    bars = np.empty(rows, dtype=BAR_DTYPE)
+    if rows == 0:
+        return bars
+    last_row = (rows - 1) * width
+    bars['timestamp'] = np.array(cells[last_row::-width], dtype='datetime64[s]').astype(np.int64)
+    for field in BAR_DTYPE.names[1:]:
+        bars[field] = np.array(cells[last_row + names.index(field)::-width], dtype=np.float32)
+
+    if rows > 1 and (np.diff(bars['timestamp']) < 0).any():
+        bars = bars[np.argsort(bars['timestamp'], kind='stable')]
+    return bars
+
+def fetch_series(params: dict, symbol: str) -> np.ndarray:
+    """Request a time series function as CSV and parse it into bar records"""
+    response = requests.get(API_URL, params=dict(params, symbol=symbol, datatype='csv'))
+    text = response.text
+    # Errors and rate limit notes come back as JSON even when CSV was requested
+    if text.lstrip().startswith('{'):
+        raise ValueError(f"No data found for symbol {symbol}")
+    return parse_csv_bars(text)
+
+def fetch_intraday(symbol: str, api_key: str, interval: str = '5min', outputsize: str = 'full') -> np.ndarray:
+    """
+    Fetch an intraday series from TIME_SERIES_INTRADAY
+
+    Args:
+        symbol: Stock symbol
+        api_key: Alpha Vantage API key
+        interval: Bar interval, e.g. '5min'
+        outputsize: 'full' for the whole history, 'compact' for the latest 100 bars
+
+    Returns:
+        Bars as SeriesStore records in ascending time order
+    """
+    params = {
+        'function': 'TIME_SERIES_INTRADAY',
+        'apikey': api_key,
+        'interval': interval,
+        'outputsize': outputsize
+    }
+    return fetch_series(params, symbol)
+
+def fetch_daily(symbol: str, api_key: str, outputsize: str = 'full') -> np.ndarray:
+    """
+    Fetch a daily series from TIME_SERIES_DAILY_ADJUSTED
+
+    Returns:
+        Bars as SeriesStore records in ascending time order, with the
+        unadjusted close
+    """
+    params = {
+        'function': 'TIME_SERIES_DAILY_ADJUSTED',
+        'apikey': api_key,
+        'outputsize': outputsize
+    }
+    return fetch_series(params, symbol)
+
+def fetch_bulk_quotes(symbols: List[str], api_key: str) -> Dict[str, dict]:
+    """
+    Fetch the latest quote for many symbols with REALTIME_BULK_QUOTES
+
+    Args:
+        symbols: Stock symbols; split into calls of BULK_QUOTE_LIMIT symbols
+        api_key: Alpha Vantage API key
+
+    Returns:
+        Mapping of symbol to {'timestamp', 'price', 'volume'}, where timestamp
+        is in exchange time seconds like bar timestamps and volume is the
+        cumulative session volume
+
+    Raises:
+        ValueError: If the endpoint returns no quotes (e.g. it is not
+            enabled for the API key)
+    """
+    quotes = {}
+    for start in range(0, len(symbols), BULK_QUOTE_LIMIT):
+        params = {
+            'function': 'REALTIME_BULK_QUOTES',
+            'symbol': ','.join(symbols[start:start + BULK_QUOTE_LIMIT]),
+            'apikey': api_key
+        }
+        response = requests.get(API_URL, params=params)
+        response.raise_for_status()
+        data = response.json()
+
+        if 'data' not in data:
+            raise ValueError(f"Bulk quotes unavailable: {data.get('Information') or data.get('Note') or data}")
+
+        for quote in data['data']:
+            timestamp = datetime.strptime(quote['timestamp'][:19], "%Y-%m-%d %H:%M:%S")
+            quotes[quote['symbol']] = {
+                'timestamp': int((timestamp - datetime(1970, 1, 1)).total_seconds()),
+                'price': float(quote['close']),
+                'volume': float(quote['volume'])
+            }
+    return quotes
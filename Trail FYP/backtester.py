@@ -0,0 +1,162 @@
+import argparse
+import json
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from feature_engine import compute_features, make_windows, scale_windows
+from stock_predictor import StockPredictor
+from stock_trend_predictor import StockTrendPredictor
+
+def price_model(look_back: int, multivariate: bool = False):
+    """Untrained model with the StockPredictor architecture"""
+    predictor = StockPredictor("models", multivariate=multivariate)
+    predictor.look_back = look_back
+    predictor.create_model()
+    return predictor.model
+
+def trend_model(look_back: int, multivariate: bool = False):
+    """Untrained model with the StockTrendPredictor architecture"""
+    predictor = StockTrendPredictor(multivariate=multivariate)
+    predictor.look_back = look_back
+    predictor.create_model()
+    return predictor.model
+
+class WalkForwardBacktester:
+    """
+    Replay a close-price history walk-forward and score each model on bars
+    it has not been trained on.
+
+    The history after the first ``min_train_bars`` is split into segments of
+    ``retrain_every`` bars. Before each segment the model is (re)trained on
+    the preceding ``train_window`` bars (all preceding bars if None), then
+    every window in the segment is scored in a single batched predict call.
+    Windows are min-max scaled on their own range and predictions unscaled
+    with it, as in training and serving (StockPredictor.prepare_data).
+    """
+
+    def __init__(self, look_back: int = 60, retrain_every: int = 2000, train_window: Optional[int] = 5000,
+                 min_train_bars: int = 2000, epochs: int = 2, batch_size: int = 256,
+                 inference_batch_size: int = 8192, warm_start: bool = True, multivariate: bool = False):
+        self.look_back = look_back
+        self.retrain_every = retrain_every
+        self.train_window = train_window
+        self.min_train_bars = max(min_train_bars, look_back + 1)
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.inference_batch_size = inference_batch_size
+        self.warm_start = warm_start
+        self.multivariate = multivariate  # Use the engineered OHLCV features instead of Close only
+
+    def run(self, df: pd.DataFrame, models: Optional[Dict[str, Callable[[int], object]]] = None):
+        """
+        Backtest each model over df
+
+        Args:
+            df: Historical OHLCV data, sorted by time
+            models: Mapping of name to a factory returning an untrained,
+                compiled Keras model for a given look_back and multivariate
+                flag (default: the price and trend architectures)
+
+        Returns:
+            Dictionary with error metrics, directional accuracy and
+            throughput figures for every model
+        """
+        if models is None:
+            models = {'price': price_model, 'trend': trend_model}
+
+        if self.multivariate:
+            df = compute_features(df).dropna()
+            values = df.values.astype(np.float32)
+        else:
+            values = df[['Close']].values.astype(np.float32)
+        if len(values) <= self.min_train_bars:
+            raise ValueError(f"Need more than {self.min_train_bars} bars to backtest, got {len(values)}")
+
+        results = {
+            'bars': int(len(values)),
+            'evaluated_bars': int(len(values) - self.min_train_bars),
+            'start': str(df.index[self.min_train_bars]),
+            'end': str(df.index[-1]),
+            'models': {}
+        }
+        for name, factory in models.items():
+            results['models'][name] = self._run_model(values, factory)
+        return results
+
+    def _run_model(self, values: np.ndarray, factory: Callable[[int, bool], object]):
+        # Close is the first column in both modes
+        closes = values[:, 0]
+        n = len(values)
+        predicted = np.empty(n - self.min_train_bars, dtype=np.float32)
+        model = None
+        retrains = 0
+        train_seconds = inference_seconds = 0.0
+
+        for start in range(self.min_train_bars, n, self.retrain_every):
+            end = min(start + self.retrain_every, n)
+            train_start = 0 if self.train_window is None else max(0, start - self.train_window)
+            train = values[train_start:start]
+
+            began = time.perf_counter()
+            if model is None or not self.warm_start:
+                model = factory(self.look_back, self.multivariate)
+            x, y_index = make_windows(train, self.look_back)
+            x_scaled, low, span = scale_windows(x)
+            model.fit(x_scaled, (train[y_index, 0] - low[:, 0, 0]) / span[:, 0, 0], epochs=self.epochs,
+                      batch_size=self.batch_size, verbose=0)
+            train_seconds += time.perf_counter() - began
+            retrains += 1
+
+            # Every window whose target falls in [start, end) in one forward pass
+            began = time.perf_counter()
+            windows, _ = make_windows(values[start - self.look_back:end], self.look_back)
+            windows_scaled, low, span = scale_windows(windows)
+            scaled = model.predict(windows_scaled, batch_size=self.inference_batch_size, verbose=0)
+            predicted[start - self.min_train_bars:end - self.min_train_bars] = \
+                scaled[:, 0] * span[:, 0, 0] + low[:, 0, 0]
+            inference_seconds += time.perf_counter() - began
+
+        actual = closes[self.min_train_bars:]
+        previous = closes[self.min_train_bars - 1:-1]
+        errors = predicted - actual
+        called_rise = predicted > previous
+        rose = actual > previous
+
+        return {
+            'mae': float(np.mean(np.abs(errors))),
+            'rmse': float(np.sqrt(np.mean(errors ** 2))),
+            'mape': float(np.mean(np.abs(errors / actual)) * 100),
+            'directional_accuracy': float(np.mean(called_rise == rose) * 100),
+            'rise_calls': int(called_rise.sum()),
+            'fall_calls': int((~called_rise).sum()),
+            'retrains': retrains,
+            'train_seconds': train_seconds,
+            'inference_seconds': inference_seconds,
+            'windows_per_second': float(len(actual) / inference_seconds) if inference_seconds else None
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the stock prediction models")
+    parser.add_argument("symbol", help="Stock symbol to backtest")
+    parser.add_argument("--retrain-every", type=int, default=2000, help="Bars between retrains")
+    parser.add_argument("--train-window", type=int, default=5000, help="Bars per training slice (0 for expanding)")
+    parser.add_argument("--min-train-bars", type=int, default=2000, help="Bars reserved for the first training slice")
+    parser.add_argument("--epochs", type=int, default=2, help="Epochs per retrain")
+    parser.add_argument("--multivariate", action="store_true", help="Use the engineered OHLCV features")
+    args = parser.parse_args()
+
+    df = StockPredictor("models").load_data(args.symbol)
+    backtester = WalkForwardBacktester(
+        retrain_every=args.retrain_every,
+        train_window=args.train_window or None,
+        min_train_bars=args.min_train_bars,
+        epochs=args.epochs,
+        multivariate=args.multivariate
+    )
+    print(json.dumps(backtester.run(df), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,640 @@
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def wait_for_server(base_url: str, timeout: float = 120.0):
+    """Poll the health check until the server answers or the timeout expires"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/", timeout=1).ok:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Server at {base_url} did not start within {timeout}s")
+
+def run_load(send, clients: int, duration: float):
+    """
+    Call send() from `clients` threads for `duration` seconds
+
+    Returns:
+        Dictionary with request count, error count, throughput and latency percentiles
+    """
+    deadline = time.time() + duration
+
+    def client():
+        latencies, errors = [], 0
+        with requests.Session() as session:
+            while time.time() < deadline:
+                began = time.perf_counter()
+                try:
+                    send(session).raise_for_status()
+                    latencies.append(time.perf_counter() - began)
+                except requests.exceptions.RequestException:
+                    errors += 1
+        return latencies, errors
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(lambda _: client(), range(clients)))
+    elapsed = time.perf_counter() - began
+
+    latencies = sorted(l for result in results for l in result[0])
+    errors = sum(result[1] for result in results)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else None
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99)
+    }
+
+def bench_workers(args):
+    """Throughput of serve.py for each worker count against one port"""
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = []
+    for workers in args.workers:
+        server = subprocess.Popen([sys.executable, "serve.py", "--port", str(args.port), "--workers", str(workers)],
+                                  cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_server(base_url)
+            send = lambda session: session.post(f"{base_url}/predict-stock", json={"symbol": args.symbol})
+            # Let every worker load the model and map the shared files before measuring
+            run_load(send, args.clients, 5)
+            result = run_load(send, args.clients, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+        result['workers'] = workers
+        results.append(result)
+        print(json.dumps(result))
+
+    baseline = results[0]['requests_per_second']
+    for result in results:
+        result['scaling'] = result['requests_per_second'] / baseline if baseline else None
+    return results
+
+def synthetic_payloads(rows: int):
+    """The same intraday series as a TIME_SERIES_INTRADAY JSON document and as CSV, newest bar first"""
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.003, rows)))
+    volume = rng.integers(1000, 100000, rows)
+    stamps = pd.date_range(end="2026-01-02 16:00", periods=rows, freq="5min").strftime("%Y-%m-%d %H:%M:%S")[::-1]
+    close, volume = close[::-1], volume[::-1]
+
+    series = {
+        stamp: {'1. open': f"{c:.4f}", '2. high': f"{c * 1.001:.4f}", '3. low': f"{c * 0.999:.4f}",
+                '4. close': f"{c:.4f}", '5. volume': str(v)}
+        for stamp, c, v in zip(stamps, close, volume)
+    }
+    lines = ["timestamp,open,high,low,close,volume"] + [
+        f"{stamp},{c:.4f},{c * 1.001:.4f},{c * 0.999:.4f},{c:.4f},{v}" for stamp, c, v in zip(stamps, close, volume)
+    ]
+    return json.dumps({'Time Series (5min)': series}), "\r\n".join(lines) + "\r\n"
+
+def parse_with_pandas(text: str):
+    """The DataFrame based parsing fetch_intraday used before the CSV parser"""
+    from series_store import SeriesStore
+
+    df = pd.DataFrame(json.loads(text)['Time Series (5min)']).T
+    df = df.rename(columns={'1. open': 'Open', '2. high': 'High', '3. low': 'Low', '4. close': 'Close', '5. volume': 'Volume'})
+    df = df.astype(float)
+    df.index = pd.to_datetime(df.index)
+    return SeriesStore.from_frame(df.sort_index())
+
+def bench_parse(args):
+    """Parsing throughput and peak allocations of the pandas path and the columnar CSV parser"""
+    from alpha_vantage import parse_csv_bars
+
+    json_text, csv_text = synthetic_payloads(args.rows)
+    parsers = {'pandas_json': (parse_with_pandas, json_text), 'columnar_csv': (parse_csv_bars, csv_text)}
+
+    results, outputs = [], {}
+    for name, (parse, text) in parsers.items():
+        outputs[name] = parse(text)
+        began = time.perf_counter()
+        for _ in range(args.repeat):
+            parse(text)
+        seconds = (time.perf_counter() - began) / args.repeat
+
+        tracemalloc.start()
+        parse(text)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        result = {
+            'parser': name,
+            'rows': args.rows,
+            'payload_bytes': len(text),
+            'ms': seconds * 1000,
+            'rows_per_second': args.rows / seconds,
+            'peak_alloc_mb': peak / 2**20
+        }
+        results.append(result)
+        print(json.dumps(result))
+
+    if not np.array_equal(outputs['pandas_json'], outputs['columnar_csv']):
+        raise AssertionError("Parsers disagree on the parsed bars")
+    results[-1]['speedup'] = results[0]['ms'] / results[-1]['ms']
+    return results
+
+def synthetic_frame(rows: int, seed: int) -> pd.DataFrame:
+    """A random-walk 5-minute OHLCV history shaped like StockPredictor.load_data's output"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.003, rows)))
+    return pd.DataFrame({
+        'Open': close, 'High': close * 1.001, 'Low': close * 0.999, 'Close': close,
+        'Volume': rng.integers(1000, 100000, rows).astype(float)
+    }, index=pd.date_range(end="2026-01-02 16:00", periods=rows, freq="5min"))
+
+def bench_concurrency(args):
+    """
+    Stress test of concurrent inference sessions
+
+    Every symbol gets its own randomly initialised price model, so a request
+    served with another symbol's model or window gives a different answer.
+    Predictions from each thread count are compared against a sequential
+    reference, and throughput is reported relative to one thread. With
+    --batch-wait-ms the sessions run through an InferenceBatcher and its
+    metrics are reported per thread count.
+    """
+    from backtester import price_model
+    from inference_batcher import InferenceBatcher
+    from inference_session import SessionRegistry
+    from model_manager import ModelManager
+    from shared_model import shared_paths
+    from stock_trend_predictor import StockTrendPredictor
+
+    model_dir = tempfile.mkdtemp()
+    try:
+        manager = ModelManager(model_dir)
+        trend = StockTrendPredictor()
+        trend.create_model()
+        frames = {}
+        for i in range(args.symbols):
+            symbol = f"SYM{i}"
+            manager.save_model(price_model(60), f"{symbol}_model.h5")
+            if args.backend == "keras":
+                for path in shared_paths(os.path.join(model_dir, f"{symbol}_model.h5")):
+                    os.remove(path)
+            frames[symbol] = synthetic_frame(500, i)
+
+        reference = {symbol: SessionRegistry(manager, trend).get(symbol).predict(frame) for symbol, frame in frames.items()}
+
+        def request(symbol):
+            return symbol, registry.get(symbol).predict(frames[symbol])
+
+        def matches(expected, actual):
+            return all(
+                np.isclose(actual[part][key], expected[part][key], rtol=1e-6) if isinstance(expected[part][key], float)
+                else actual[part][key] == expected[part][key]
+                for part in range(2) for key in expected[part]
+            )
+
+        results = []
+        symbols = list(frames) * (args.requests // len(frames))
+        for threads in args.threads:
+            batcher = InferenceBatcher(max_wait=args.batch_wait_ms / 1000) if args.batch_wait_ms is not None else None
+            registry = SessionRegistry(manager, trend, batcher=batcher)
+            random.shuffle(symbols)
+            began = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                answers = list(pool.map(request, symbols))
+            elapsed = time.perf_counter() - began
+
+            result = {
+                'threads': threads,
+                'backend': args.backend,
+                'requests': len(answers),
+                'mismatches': sum(not matches(reference[symbol], answer) for symbol, answer in answers),
+                'requests_per_second': len(answers) / elapsed
+            }
+            if batcher is not None:
+                result['batching'] = batcher.metrics()
+            results.append(result)
+            print(json.dumps(result))
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+    baseline = results[0]['requests_per_second']
+    for result in results:
+        result['scaling'] = result['requests_per_second'] / baseline
+    if any(result['mismatches'] for result in results):
+        raise AssertionError("Concurrent predictions differ from the sequential reference")
+    return results
+
+def bench_streaming(args):
+    """
+    Per-bar cost and deviation of StreamingLSTM against a full window
+    recompute, replaying a synthetic series one bar at a time, with the
+    share of bars whose deviation exceeds the tolerance
+    """
+    from backtester import price_model
+    from inference_session import predict_price
+    from model_manager import ModelManager
+    from streaming_lstm import StreamingLSTM
+
+    model_dir = tempfile.mkdtemp()
+    try:
+        manager = ModelManager(model_dir)
+        manager.save_model(price_model(args.look_back), "BENCH_model.h5")
+        model = manager.get_model("BENCH_model.h5")
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+    stream = StreamingLSTM(model, tolerance=args.tolerance)
+    frame = synthetic_frame(args.bars + args.look_back, 0)
+    close, timestamps = frame['Close'].values, frame.index.asi8
+    stream_seconds = full_seconds = 0.0
+    deviations = []
+    for end in range(args.look_back, len(close)):
+        window = close[end - args.look_back:end].reshape(-1, 1)
+        began = time.perf_counter()
+        streamed = stream.predict(timestamps[end - args.look_back:end], window)
+        stream_seconds += time.perf_counter() - began
+        began = time.perf_counter()
+        full = predict_price(model, window)
+        full_seconds += time.perf_counter() - began
+        deviations.append(abs(streamed - full) / abs(full))
+
+    return dict(stream.metrics(), **{
+        'bars': args.bars,
+        'stream_ms_per_bar': stream_seconds / args.bars * 1000,
+        'full_ms_per_bar': full_seconds / args.bars * 1000,
+        'speedup': full_seconds / stream_seconds,
+        'mean_relative_deviation': float(np.mean(deviations)),
+        'max_relative_deviation': float(np.max(deviations)),
+        'tolerance': args.tolerance,
+        'share_above_tolerance': float(np.mean(np.array(deviations) > args.tolerance))
+    })
+
+def resident_memory() -> int:
+    """Resident set size of this process in bytes (Linux), or 0 where unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+def bench_backends(args):
+    """
+    Latency, memory and size of each serving backend for one price model,
+    with the parity of the quantized artifacts against the float model
+    """
+    from backtester import price_model
+    from inference_session import forward
+    from model_manager import ModelManager
+    from shared_model import shared_paths
+    from tflite_backend import QUANTIZATIONS, holdout_windows
+
+    model_dir = tempfile.mkdtemp()
+    try:
+        manager = ModelManager(model_dir)
+        filename = "BENCH_model.h5"
+        close = synthetic_frame(args.bars, 0)['Close'].values
+        windows = holdout_windows(close, 60, count=len(close))
+        model = price_model(60)
+        model.fit(windows[:-args.holdout], windows[:-args.holdout, -1, 0], epochs=args.epochs, batch_size=256, verbose=0)
+        manager.save_model(model, filename)
+        holdout = windows[-args.holdout:]
+
+        reports = {q: manager.export_tflite(model, filename, q, holdout, args.max_error) for q in QUANTIZATIONS}
+        model_path = os.path.join(model_dir, filename)
+        sizes = {
+            'keras': os.path.getsize(model_path),
+            'shared': os.path.getsize(shared_paths(model_path)[1]),
+            **{f'tflite-{q}': reports[q]['size'] for q in QUANTIZATIONS}
+        }
+
+        results = []
+        for backend in ['keras', 'shared'] + [f'tflite-{q}' for q in QUANTIZATIONS if reports[q]['passed']]:
+            manager.set_backend(filename, backend)
+            gc.collect()
+            memory_before = resident_memory()
+            began = time.perf_counter()
+            served = manager.get_model(filename)
+            forward(served, holdout[:1])
+            load_seconds = time.perf_counter() - began
+            memory = resident_memory() - memory_before
+
+            latencies = []
+            for i in range(args.calls):
+                began = time.perf_counter()
+                forward(served, holdout[i % len(holdout)][np.newaxis])
+                latencies.append(time.perf_counter() - began)
+            latencies.sort()
+
+            result = {
+                'backend': backend,
+                'size_bytes': sizes[backend],
+                'load_seconds': load_seconds,
+                'resident_memory_delta_bytes': memory,
+                'p50_ms': latencies[len(latencies) // 2] * 1000,
+                'p99_ms': latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000
+            }
+            if backend.startswith('tflite-'):
+                report = reports[backend[len('tflite-'):]]
+                result.update(max_abs_error=report['max_abs_error'], mean_abs_error=report['mean_abs_error'])
+            results.append(result)
+            print(json.dumps(result))
+
+        for q in QUANTIZATIONS:
+            if not reports[q]['passed']:
+                results.append({'backend': f'tflite-{q}', 'rejected': reports[q]})
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
+    return results
+
+def _bulk_retrain(seconds: float, symbols: int, rows: int) -> int:
+    """
+    Retrain price models on synthetic histories, one epoch per symbol in
+    turn, for about `seconds`
+
+    Returns:
+        Epochs completed
+    """
+    from backtester import price_model
+    from feature_engine import make_windows, scale_windows
+
+    data = []
+    for i in range(symbols):
+        close = synthetic_frame(rows, 100 + i)['Close'].values
+        x, y_index = make_windows(close, 60)
+        x_scaled, low, span = scale_windows(x)
+        data.append((price_model(60), x_scaled, (close[y_index] - low[:, 0, 0]) / span[:, 0, 0]))
+
+    epochs = 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        model, x, y = data[epochs % symbols]
+        model.fit(x, y, epochs=1, batch_size=32, verbose=0)
+        epochs += 1
+    return epochs
+
+def bench_partition(args):
+    """
+    Prediction latency while a bulk retrain runs, with and without CPU partitioning
+
+    The benchmark process is configured as a serving process (cpu_config).
+    Client threads then run predictions for --duration seconds in three
+    phases: idle, during a bulk retrain in a thread of the serving process
+    (training shares the serving CPUs, as it did before the training pool),
+    and during the same retrain in a TrainingPool process pinned to the
+    training CPUs. With partitioning, p99 should stay close to idle. On a
+    single CPU both roles share it and only the training priority differs.
+    """
+    from cpu_config import configure_process, cpu_plan
+    plan = cpu_plan()
+    configure_process('serving')
+
+    from backtester import price_model
+    from inference_session import SessionRegistry
+    from model_manager import ModelManager
+    from stock_trend_predictor import StockTrendPredictor
+    from training_pool import TrainingPool
+
+    model_dir = tempfile.mkdtemp()
+    pool = TrainingPool(1)
+    try:
+        manager = ModelManager(model_dir)
+        trend = StockTrendPredictor()
+        trend.create_model()
+        frames = {}
+        for i in range(args.symbols):
+            manager.save_model(price_model(60), f"SYM{i}_model.h5")
+            frames[f"SYM{i}"] = synthetic_frame(500, i)
+        registry = SessionRegistry(manager, trend)
+        for symbol, frame in frames.items():
+            registry.get(symbol).predict(frame)
+        # Start the training process and its TensorFlow before measuring
+        pool.run(_bulk_retrain, 0, 1, 100)
+
+        def measure():
+            deadline = time.time() + args.duration
+
+            def client(seed):
+                rng = random.Random(seed)
+                latencies = []
+                while time.time() < deadline:
+                    symbol = rng.choice(list(frames))
+                    began = time.perf_counter()
+                    registry.get(symbol).predict(frames[symbol])
+                    latencies.append(time.perf_counter() - began)
+                return latencies
+
+            with ThreadPoolExecutor(max_workers=args.clients) as clients:
+                latencies = sorted(l for result in clients.map(client, range(args.clients)) for l in result)
+            return {
+                'requests': len(latencies),
+                'p50_ms': latencies[len(latencies) // 2] * 1000,
+                'p99_ms': latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000
+            }
+
+        results = {'cpu_plan': plan, 'idle': measure()}
+        print(json.dumps(results['idle']))
+
+        retrain = (_bulk_retrain, args.duration, args.retrain_symbols, args.bars)
+        with ThreadPoolExecutor(max_workers=1) as thread:
+            training = thread.submit(*retrain)
+            results['shared'] = measure()
+            results['shared']['training_epochs'] = training.result()
+        print(json.dumps(results['shared']))
+
+        training = pool.submit(*retrain)
+        results['partitioned'] = measure()
+        results['partitioned']['training_epochs'] = training.result()
+        print(json.dumps(results['partitioned']))
+    finally:
+        pool.shutdown()
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+    for phase in ('shared', 'partitioned'):
+        results[phase]['p99_vs_idle'] = results[phase]['p99_ms'] / results['idle']['p99_ms']
+    return results
+
+def bench_uncertainty(args):
+    """
+    Latency of Monte Carlo dropout trend predictions
+
+    Compares one deterministic pass, K stochastic passes batched into one
+    forward call (what TREND_UNCERTAINTY_SAMPLES does) and the same K passes
+    run one after another.
+    """
+    from feature_engine import scale_window
+    from inference_session import _serving_function, forward, forward_samples, predict_trend
+    from stock_trend_predictor import StockTrendPredictor
+
+    trend = StockTrendPredictor()
+    trend.create_model()
+    window = synthetic_frame(500, 0)['Close'].values[-60:].reshape(-1, 1)
+    x = scale_window(window)[0][np.newaxis]
+    stochastic = _serving_function(trend.model, training=True)
+
+    def timed(call):
+        call()
+        times = []
+        for _ in range(args.calls):
+            began = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - began)
+        return float(np.median(times) * 1000)
+
+    results = {'samples': args.samples}
+    results['single_pass_ms'] = timed(lambda: forward(trend.model, x))
+    results['batched_samples_ms'] = timed(lambda: forward_samples(trend.model, x, args.samples))
+    results['sequential_samples_ms'] = timed(lambda: [stochastic(x) for _ in range(args.samples)])
+    results['batched_vs_single'] = results['batched_samples_ms'] / results['single_pass_ms']
+    results['example'] = predict_trend(trend.model, window, float(window[-1, 0]), samples=args.samples)
+    return results
+
+def bench_journal(args):
+    """
+    Cost of journaling served predictions and of querying the journal
+
+    Records --rows predictions over --symbols symbols and --days days of
+    5-minute bars through PredictionJournal.record, writes them out, then
+    times per-symbol aggregates over every row and over one symbol and day.
+    """
+    from prediction_journal import PredictionJournal
+    from series_store import SeriesStore
+
+    data_dir = tempfile.mkdtemp()
+    try:
+        journal = PredictionJournal(os.path.join(data_dir, 'journal'), batch_size=100_000,
+                                    max_pending=args.rows)
+        store = SeriesStore(data_dir)
+        bars_per_day = 78
+        first_bar = int(np.datetime64('2026-01-05T09:30', 's').astype(np.int64))
+        timestamps = first_bar + np.arange(args.days)[:, None] * 86400 + np.arange(bars_per_day)[None, :] * 300
+        timestamps = timestamps.ravel()
+        symbols = [f"SYM{i}" for i in range(args.symbols)]
+        closes = {}
+        for i, symbol in enumerate(symbols):
+            frame = synthetic_frame(len(timestamps), i)
+            frame.index = pd.DatetimeIndex(timestamps.astype('datetime64[s]'))
+            store.write(symbol, '5min', SeriesStore.from_frame(frame))
+            closes[symbol] = frame['Close'].values
+
+        rng = np.random.default_rng(0)
+        rows = rng.integers(0, len(timestamps), args.rows)
+        which = rng.integers(0, args.symbols, args.rows)
+        began = time.perf_counter()
+        for bar, i in zip(rows.tolist(), which.tolist()):
+            close = closes[symbols[i]][bar]
+            journal.record(symbols[i], int(timestamps[bar]), '1767225600000000000', close * 1.001, close,
+                           'rise', 60.0, 4.0, False)
+        record_seconds = time.perf_counter() - began
+        began = time.perf_counter()
+        journal.close()
+        flush_seconds = time.perf_counter() - began
+
+        def timed(call):
+            began = time.perf_counter()
+            result = call()
+            return result, (time.perf_counter() - began) * 1000
+
+        everything, all_ms = timed(lambda: journal.aggregate(series_store=store))
+        _, unscored_ms = timed(lambda: journal.aggregate())
+        one_day = str(np.datetime64(int(timestamps[0]), 's').astype('datetime64[D]'))
+        _, one_ms = timed(lambda: journal.aggregate([symbols[0]], one_day, str(np.datetime64(one_day) + 1), store))
+        size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(journal.journal_dir)
+                   for f in files)
+        return {
+            'rows': args.rows,
+            'record_us_per_row': record_seconds / args.rows * 1e6,
+            'flush_seconds': flush_seconds,
+            'bytes_per_row': size / args.rows,
+            'aggregate_all_ms': all_ms,
+            'aggregate_all_unscored_ms': unscored_ms,
+            'aggregate_one_symbol_day_ms': one_ms,
+            'example': everything[symbols[0]]
+        }
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Performance benchmarks for the Stock Market Prediction System")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    workers = subparsers.add_parser("workers", help="Throughput scaling of serve.py with the number of workers")
+    workers.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    workers.add_argument("--symbol", default="AAPL")
+    workers.add_argument("--clients", type=int, default=32, help="Concurrent client threads")
+    workers.add_argument("--duration", type=float, default=30.0, help="Seconds to measure per worker count")
+    workers.add_argument("--port", type=int, default=8100)
+    workers.set_defaults(run=bench_workers)
+
+    parse = subparsers.add_parser("parse", help="Alpha Vantage payload parsing throughput, pandas vs columnar")
+    parse.add_argument("--rows", type=int, default=20000, help="Bars in the synthetic payload")
+    parse.add_argument("--repeat", type=int, default=5)
+    parse.set_defaults(run=bench_parse)
+
+    concurrency = subparsers.add_parser("concurrency", help="Correctness and thread scaling of concurrent inference sessions")
+    concurrency.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    concurrency.add_argument("--symbols", type=int, default=8, help="Symbols, each with its own model")
+    concurrency.add_argument("--requests", type=int, default=2000, help="Predictions per thread count")
+    concurrency.add_argument("--backend", choices=["shared", "keras"], default="shared",
+                             help="Serve the memory-mapped NumPy export or the Keras models")
+    concurrency.add_argument("--batch-wait-ms", type=float, default=None,
+                             help="Coalesce forward passes through an InferenceBatcher with this window")
+    concurrency.set_defaults(run=bench_concurrency)
+
+    streaming = subparsers.add_parser("streaming", help="Incremental LSTM stepping vs full window recompute")
+    streaming.add_argument("--bars", type=int, default=1000, help="Bars to replay")
+    streaming.add_argument("--look-back", type=int, default=60)
+    streaming.add_argument("--tolerance", type=float, default=0.001,
+                           help="Allowed relative deviation of a streamed prediction from the full recompute")
+    streaming.set_defaults(run=bench_streaming)
+
+    backends = subparsers.add_parser("backends", help="Latency, memory and size per serving backend, with TFLite parity")
+    backends.add_argument("--bars", type=int, default=3000, help="Bars of synthetic history to train on")
+    backends.add_argument("--holdout", type=int, default=256, help="Windows held out for the parity check")
+    backends.add_argument("--epochs", type=int, default=2)
+    backends.add_argument("--calls", type=int, default=500, help="Single-window calls to time per backend")
+    backends.add_argument("--max-error", type=float, default=0.01, help="Parity threshold in the model's output scale")
+    backends.set_defaults(run=bench_backends)
+
+    partition = subparsers.add_parser("partition", help="Prediction p99 during a bulk retrain, shared vs partitioned CPUs")
+    partition.add_argument("--duration", type=float, default=20.0, help="Seconds per phase")
+    partition.add_argument("--clients", type=int, default=4, help="Concurrent prediction threads")
+    partition.add_argument("--symbols", type=int, default=4, help="Symbols served")
+    partition.add_argument("--retrain-symbols", type=int, default=8, help="Models in the bulk retrain")
+    partition.add_argument("--bars", type=int, default=3000, help="Bars of history per retrained model")
+    partition.set_defaults(run=bench_partition)
+
+    uncertainty = subparsers.add_parser("uncertainty", help="Monte Carlo dropout trend latency, batched vs sequential")
+    uncertainty.add_argument("--samples", type=int, default=32, help="Stochastic passes per prediction")
+    uncertainty.add_argument("--calls", type=int, default=50, help="Predictions to time per mode")
+    uncertainty.set_defaults(run=bench_uncertainty)
+
+    journal = subparsers.add_parser("journal", help="Prediction journal write cost and aggregate query latency")
+    journal.add_argument("--rows", type=int, default=2_000_000, help="Predictions to journal")
+    journal.add_argument("--symbols", type=int, default=100, help="Distinct symbols")
+    journal.add_argument("--days", type=int, default=20, help="Trading days the bars span")
+    journal.set_defaults(run=bench_journal)
+
+    args = parser.parse_args()
+    print(json.dumps(args.run(args), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+import argparse
+import bisect
+import hashlib
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import requests
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+class HashRing:
+    """
+    Consistent hash ring of node URLs
+
+    Each node is placed at ``replicas`` points on the ring and a key belongs
+    to the first node point at or after the key's hash. Adding or removing a
+    node therefore only moves the keys of the ring segments it gains or
+    loses, about 1/n of them, instead of reshuffling every key.
+
+    Args:
+        nodes: Initial node URLs
+        replicas: Points per node; more points spread keys more evenly
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 100):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            del self._owners[point]
+            self._points.remove(point)
+
+    def owner(self, key: str) -> Optional[str]:
+        """Node that owns key, or None if the ring is empty"""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+class StockRequest(BaseModel):
+    symbol: str
+    date: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    symbols: List[str]
+
+class ClusterRouter:
+    """
+    Routes symbol requests to the prediction node that owns the symbol
+
+    Symbols are assigned to nodes with a HashRing, so each node only keeps
+    the models of its share of the symbols warm. When nodes join or leave,
+    explicitly or because their health check fails, the symbols the router
+    knows about (``symbols`` plus every symbol it has routed) are
+    reassigned. Each node that gains symbols is asked to warm them through
+    its /warm endpoint. A request whose node cannot be reached is retried
+    once on the new owner after that node is taken out of the ring.
+
+    Args:
+        nodes: Prediction node base URLs, e.g. http://127.0.0.1:8001
+        symbols: Symbols to keep warm across the cluster
+        timeout: Seconds to wait for a node's answer
+        health_interval: Seconds between node health checks (0 disables them)
+    """
+
+    def __init__(self, nodes: Iterable[str], symbols: Iterable[str] = (), timeout: float = 120.0,
+                 health_interval: float = 5.0):
+        self.members = set(node.rstrip('/') for node in nodes)
+        self.ring = HashRing(self.members)
+        self.symbols = set(symbol.upper() for symbol in symbols)
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.rebalances = 0
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def assignments(self) -> Dict[str, List[str]]:
+        """Known symbols per node; with no node in the ring there are none"""
+        with self._lock:
+            assigned = {node: [] for node in self.ring.nodes}
+            for symbol in sorted(self.symbols):
+                owner = self.ring.owner(symbol)
+                if owner is not None:
+                    assigned[owner].append(symbol)
+            return assigned
+
+    def _change_membership(self, change):
+        with self._lock:
+            before = {symbol: self.ring.owner(symbol) for symbol in self.symbols}
+            change()
+            moved = {}
+            for symbol, owner in before.items():
+                new_owner = self.ring.owner(symbol)
+                if new_owner is not None and new_owner != owner:
+                    moved.setdefault(new_owner, []).append(symbol)
+            self.rebalances += 1
+        for node, symbols in moved.items():
+            threading.Thread(target=self._warm, args=(node, symbols), daemon=True).start()
+        return moved
+
+    def _warm(self, node: str, symbols: List[str]):
+        try:
+            self._session.post(f"{node}/warm", json={"symbols": symbols}, timeout=10).raise_for_status()
+            logger.info("Asked %s to warm %d symbols it took over", node, len(symbols))
+        except requests.exceptions.RequestException as e:
+            logger.warning("Could not ask %s to warm %s: %s", node, symbols, e)
+
+    def warm_assignments(self):
+        """Ask every node to warm the known symbols it owns"""
+        for node, symbols in self.assignments().items():
+            if symbols:
+                self._warm(node, symbols)
+
+    def join(self, node: str) -> Dict[str, List[str]]:
+        """Add a node to the cluster; returns the symbols it took over"""
+        node = node.rstrip('/')
+        with self._lock:
+            self.members.add(node)
+        return self._change_membership(lambda: self.ring.add(node))
+
+    def leave(self, node: str, forget: bool = True) -> Dict[str, List[str]]:
+        """Remove a node from the ring; with forget, health checks will not re-add it"""
+        node = node.rstrip('/')
+        if forget:
+            with self._lock:
+                self.members.discard(node)
+        return self._change_membership(lambda: self.ring.remove(node))
+
+    def healthy(self, node: str) -> bool:
+        try:
+            return self._session.get(f"{node}/", timeout=2).ok
+        except requests.exceptions.RequestException:
+            return False
+
+    def check_health(self):
+        """Take unreachable nodes out of the ring and put recovered ones back"""
+        with self._lock:
+            members = sorted(self.members)
+        for node in members:
+            healthy = self.healthy(node)
+            if not healthy and node in self.ring.nodes:
+                logger.warning("Node %s is down, rebalancing", node)
+                self.leave(node, forget=False)
+            elif healthy and node not in self.ring.nodes:
+                logger.info("Node %s is back, rebalancing", node)
+                self.join(node)
+
+    def start(self):
+        if self.health_interval > 0:
+            threading.Thread(target=self._health_loop, name="cluster-health", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def forward(self, symbol: str, path: str, payload: dict):
+        """
+        POST payload to the node owning symbol
+
+        Returns:
+            Tuple of (node, response)
+
+        Raises:
+            HTTPException: 503 if no node can take the request, 504 if the
+                owning node did not answer within the timeout, 502 for other
+                transport failures
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            self.symbols.add(symbol)
+        for attempt in range(2):
+            with self._lock:
+                node = self.ring.owner(symbol)
+            if node is None:
+                raise HTTPException(status_code=503, detail="No prediction nodes available")
+            try:
+                return node, self._session.post(f"{node}{path}", json=payload, timeout=self.timeout)
+            except requests.exceptions.ConnectionError as e:
+                # Also covers ConnectTimeout: the node is unreachable, not just busy
+                logger.warning("Node %s is unreachable (%s), rebalancing", node, e)
+                self.leave(node, forget=False)
+            except requests.exceptions.Timeout:
+                # A node busy with a cold start or training keeps its symbols
+                raise HTTPException(status_code=504, detail=f"Node {node} did not answer for {symbol} in time")
+            except requests.exceptions.RequestException as e:
+                raise HTTPException(status_code=502, detail=f"Node {node} failed for {symbol}: {e}")
+        raise HTTPException(status_code=503, detail=f"No prediction node could serve {symbol}")
+
+    def status(self) -> dict:
+        assignments = self.assignments()
+        with self._lock:
+            return {
+                "members": sorted(self.members),
+                "nodes": sorted(self.ring.nodes),
+                "rebalances": self.rebalances,
+                "assignments": assignments,
+                # Symbols with no node to own them while every node is down
+                "unassigned": [symbol for symbol in sorted(self.symbols) if self.ring.owner(symbol) is None]
+            }
+
+def _body(response: requests.Response) -> dict:
+    """JSON body of a node response, or its text as the detail if it is not JSON"""
+    try:
+        return response.json()
+    except ValueError:
+        return {"detail": response.text}
+
+def create_app(router: ClusterRouter) -> FastAPI:
+    """Router API in front of the prediction nodes"""
+    app = FastAPI(title="Stock Market Prediction Cluster Router",
+                  description="Routes symbol requests to the prediction node that owns the symbol")
+
+    @app.on_event("startup")
+    def start():
+        router.start()
+
+    @app.on_event("shutdown")
+    def stop():
+        router.stop()
+
+    @app.get("/")
+    def read_root():
+        return {"status": "online", "service": "Stock Market Prediction Cluster Router",
+                "nodes": sorted(router.ring.nodes)}
+
+    @app.post("/predict-stock")
+    def predict_stock(stock_request: StockRequest):
+        """Forward a prediction request to the symbol's node, passing its status through"""
+        node, response = router.forward(stock_request.symbol, "/predict-stock",
+                                        {"symbol": stock_request.symbol, "date": stock_request.date})
+        headers = {"X-Cluster-Node": node}
+        if "Retry-After" in response.headers:
+            headers["Retry-After"] = response.headers["Retry-After"]
+        return JSONResponse(status_code=response.status_code, content=_body(response), headers=headers)
+
+    @app.post("/predict-batch")
+    def predict_batch(batch_request: BatchRequest):
+        """
+        Predict several symbols, each on its own node, in parallel
+
+        Returns:
+            Dictionary of symbol to prediction, or to {"error", "status_code"}
+        """
+        def predict(symbol):
+            try:
+                _, response = router.forward(symbol, "/predict-stock", {"symbol": symbol})
+            except HTTPException as e:
+                return symbol, {"error": e.detail, "status_code": e.status_code}
+            if not response.ok:
+                return symbol, {"error": _body(response).get("detail"), "status_code": response.status_code}
+            return symbol, _body(response)
+
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in batch_request.symbols))
+        with ThreadPoolExecutor(max_workers=min(16, max(1, len(symbols)))) as pool:
+            return dict(pool.map(predict, symbols))
+
+    @app.get("/cluster")
+    def cluster():
+        """Nodes in the ring and the known symbols each one owns"""
+        return router.status()
+
+    @app.post("/cluster/nodes")
+    def join(url: str):
+        """Add a prediction node; the symbols it takes over are warmed on it"""
+        return {"moved": router.join(url)}
+
+    @app.delete("/cluster/nodes")
+    def leave(url: str):
+        """Remove a prediction node; its symbols are warmed on their new owners"""
+        return {"moved": router.leave(url)}
+
+    return app
+
+def main():
+    """
+    Run the router, optionally with local prediction nodes
+
+    With --local N, N main.py nodes are started on the ports after the
+    router's, so a whole cluster runs on one machine.
+    """
+    parser = argparse.ArgumentParser(description="Consistent-hash router in front of prediction nodes")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--nodes", nargs="*", default=[n for n in os.getenv("CLUSTER_NODES", "").split(",") if n],
+                        help="Prediction node URLs (default: CLUSTER_NODES)")
+    parser.add_argument("--local", type=int, default=0, help="Start this many local prediction nodes")
+    parser.add_argument("--symbols", nargs="*", default=[s for s in os.getenv("HOT_SYMBOLS", "").split(",") if s],
+                        help="Symbols to keep warm across the cluster (default: HOT_SYMBOLS)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    processes = []
+    nodes = list(args.nodes)
+    for i in range(1, args.local + 1):
+        port = args.port + i
+        # Each local node only warms the symbols the router assigns it
+        env = dict(os.environ, HOT_SYMBOLS="", WARMUP_SYMBOLS="")
+        processes.append(subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                                           "--port", str(port)], cwd=here, env=env))
+        nodes.append(f"http://127.0.0.1:{port}")
+
+    router = ClusterRouter(nodes, args.symbols)
+    if processes:
+        # Wait for the local nodes, then hand each its share of the symbols
+        deadline = time.time() + 300
+        while time.time() < deadline and not all(router.healthy(node) for node in nodes):
+            time.sleep(1)
+    router.warm_assignments()
+    try:
+        uvicorn.run(create_app(router), host=args.host, port=args.port)
+    finally:
+        for process in processes:
+            process.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import logging
+import os
+import sys
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+ROLES = ('serving', 'training')
+
+def parse_cpu_list(spec: str) -> List[int]:
+    """Parse a CPU list such as '0-3,6' into [0, 1, 2, 3, 6]"""
+    cpus = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return sorted(cpus)
+
+def available_cpus() -> List[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def cpu_plan() -> Dict[str, dict]:
+    """
+    CPU set and TensorFlow thread budget for each role
+
+    SERVING_CPUS and TRAINING_CPUS take CPU lists like '0-3'. By default the
+    available CPUs are split in two, serving taking the first half; with a
+    single CPU both roles share it and training only runs at a lower
+    priority. Serving runs each op on one thread, since its parallelism
+    comes from concurrent requests, while training gets its whole CPU set
+    for intra-op parallelism. {ROLE}_INTRA_OP_THREADS and
+    {ROLE}_INTER_OP_THREADS override the budgets and TRAINING_NICE sets the
+    training priority (default 10).
+    """
+    cpus = available_cpus()
+    split = max(1, (len(cpus) + 1) // 2)
+    defaults = {
+        'serving': cpus[:split],
+        'training': cpus[split:] or cpus
+    }
+
+    plan = {}
+    for role in ROLES:
+        prefix = role.upper()
+        role_cpus = parse_cpu_list(os.getenv(f'{prefix}_CPUS', '')) or defaults[role]
+        plan[role] = {
+            'cpus': role_cpus,
+            'intra_op_threads': int(os.getenv(f'{prefix}_INTRA_OP_THREADS', 1 if role == 'serving' else len(role_cpus))),
+            'inter_op_threads': int(os.getenv(f'{prefix}_INTER_OP_THREADS', len(role_cpus) if role == 'serving' else 2)),
+            'nice': int(os.getenv('TRAINING_NICE', '10')) if role == 'training' else 0
+        }
+    return plan
+
+def configure_process(role: str) -> dict:
+    """
+    Pin the current process to its role's CPUs and thread budget
+
+    Must run before TensorFlow executes its first op: the thread pool sizes
+    are passed through the TF_NUM_*_THREADS environment variables and, if
+    TensorFlow is already imported, through tf.config.threading. Affinity
+    and priority can be changed at any time.
+
+    Args:
+        role: 'serving' or 'training'
+
+    Returns:
+        The applied plan entry for the role
+    """
+    config = cpu_plan()[role]
+    if hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, config['cpus'])
+        except OSError as e:
+            logger.warning("Could not pin %s process to CPUs %s: %s", role, config['cpus'], e)
+    if config['nice']:
+        try:
+            os.nice(config['nice'])
+        except OSError as e:
+            logger.warning("Could not lower %s process priority: %s", role, e)
+
+    threads = str(config['intra_op_threads'])
+    os.environ['TF_NUM_INTRAOP_THREADS'] = threads
+    os.environ['TF_NUM_INTEROP_THREADS'] = str(config['inter_op_threads'])
+    os.environ['OMP_NUM_THREADS'] = threads
+    if 'tensorflow' in sys.modules:
+        import tensorflow as tf
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(config['intra_op_threads'])
+            tf.config.threading.set_inter_op_parallelism_threads(config['inter_op_threads'])
+        except RuntimeError as e:
+            logger.warning("TensorFlow already initialized, %s thread budget not applied: %s", role, e)
+
+    logger.info("Configured %s process %d: CPUs %s, %s intra-op / %s inter-op threads", role, os.getpid(),
+                config['cpus'], config['intra_op_threads'], config['inter_op_threads'])
+    return config
@@ -0,0 +1,145 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class _SymbolStats:
+    def __init__(self, version: str, window: int):
+        self.version = version
+        # Bar timestamp (ns) -> (close at that bar, predicted next close)
+        self.pending: Dict[int, tuple] = {}
+        self.errors = deque(maxlen=window)
+        self.directions = deque(maxlen=window)
+
+class DriftMonitor:
+    """
+    Tracks how served price predictions compare with the closes that follow
+    and schedules retraining for the symbols whose models drift
+
+    Each prediction is recorded against the bar it was made from. Once the
+    next bar is in the series, the prediction is scored: its absolute
+    percentage error and whether it called the direction of the move. A
+    symbol drifts when, over its last ``window`` scored predictions (and at
+    least ``min_samples``), the mean error exceeds ``max_error`` or the
+    directional accuracy falls below ``min_direction_accuracy``.
+
+    Drifted symbols are queued for ``retrain(symbol)``, which runs in a
+    background thread one symbol at a time. A symbol is not queued again
+    until ``cooldown`` seconds after its last retrain. Statistics restart
+    whenever the symbol's model version changes, so a retrained model is
+    judged on its own predictions only.
+
+    Args:
+        retrain: Callable retraining one symbol's model
+        window: Scored predictions kept per symbol
+        min_samples: Scored predictions needed before drift is judged
+        max_error: Largest allowed mean absolute percentage error (0.02 = 2%)
+        min_direction_accuracy: Smallest allowed share of correct directions
+        cooldown: Seconds between retrains of the same symbol
+    """
+
+    def __init__(self, retrain: Callable[[str], None], window: int = 100, min_samples: int = 30,
+                 max_error: float = 0.02, min_direction_accuracy: float = 0.45, cooldown: float = 6 * 3600):
+        self.retrain = retrain
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error = max_error
+        self.min_direction_accuracy = min_direction_accuracy
+        self.cooldown = cooldown
+        self._symbols: Dict[str, _SymbolStats] = {}
+        self._scheduled = set()
+        self._last_retrain: Dict[str, float] = {}
+        self._retrains: Dict[str, int] = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def record(self, symbol: str, version: str, df: pd.DataFrame, predicted_close: float):
+        """
+        Score the symbol's earlier predictions against df and record a new one
+
+        Args:
+            symbol: Stock symbol
+            version: Version of the model that made the prediction
+            df: Series the prediction was made from; its last bar is the
+                prediction's anchor
+            predicted_close: Predicted close of the bar after df's last
+        """
+        timestamps = df.index.asi8
+        closes = df['Close'].values
+        with self._lock:
+            stats = self._symbols.get(symbol)
+            if stats is None or stats.version != version:
+                stats = self._symbols[symbol] = _SymbolStats(version, self.window)
+
+            for anchor in [anchor for anchor in stats.pending if anchor < timestamps[-1]]:
+                last_close, predicted = stats.pending.pop(anchor)
+                following = np.searchsorted(timestamps, anchor, side='right')
+                if following == 0 or following == len(timestamps) or timestamps[following - 1] != anchor:
+                    # The anchor bar is gone from the series; the prediction cannot be scored
+                    continue
+                actual = closes[following]
+                stats.errors.append(abs(predicted - actual) / actual)
+                stats.directions.append((predicted - last_close) * (actual - last_close) > 0)
+            stats.pending.setdefault(int(timestamps[-1]), (float(closes[-1]), float(predicted_close)))
+
+            drifted = self._drifted(stats)
+            schedule = drifted and symbol not in self._scheduled \
+                and time.time() - self._last_retrain.get(symbol, 0) >= self.cooldown
+            if schedule:
+                self._scheduled.add(symbol)
+        if schedule:
+            logger.info("%s drifted (error %.4f, direction accuracy %.2f), scheduling retraining", symbol,
+                        np.mean(stats.errors), np.mean(stats.directions))
+            self._queue.put(symbol)
+            self._ensure_worker()
+
+    def _drifted(self, stats: _SymbolStats) -> bool:
+        if len(stats.errors) < self.min_samples:
+            return False
+        return bool(np.mean(stats.errors) > self.max_error or np.mean(stats.directions) < self.min_direction_accuracy)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="drift-retrain", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            symbol = self._queue.get()
+            began = time.time()
+            try:
+                self.retrain(symbol)
+                logger.info("Retrained drifted %s in %.1fs", symbol, time.time() - began)
+            except Exception as e:
+                logger.warning("Retraining drifted %s failed: %s", symbol, e)
+            with self._lock:
+                self._scheduled.discard(symbol)
+                self._last_retrain[symbol] = time.time()
+                self._retrains[symbol] = self._retrains.get(symbol, 0) + 1
+
+    def metrics(self) -> Dict[str, dict]:
+        """Rolling error, directional accuracy and retraining state per symbol"""
+        with self._lock:
+            return {
+                symbol: {
+                    "model_version": stats.version,
+                    "scored": len(stats.errors),
+                    "pending": len(stats.pending),
+                    "mean_abs_pct_error": float(np.mean(stats.errors)) if stats.errors else None,
+                    "direction_accuracy": float(np.mean(stats.directions)) if stats.directions else None,
+                    "drifted": self._drifted(stats),
+                    "retraining": symbol in self._scheduled,
+                    "retrains": self._retrains.get(symbol, 0),
+                    "last_retrain": self._last_retrain.get(symbol)
+                }
+                for symbol, stats in self._symbols.items()
+            }
@@ -0,0 +1,275 @@
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+FEATURE_COLUMNS = [
+    'Close',
+    'log_return',
+    'sma_10',
+    'sma_20',
+    'volatility_20',
+    'rsi_14',
+    'macd',
+    'macd_signal',
+    'macd_hist',
+    'log_volume',
+    'volume_ratio_20',
+    'hl_range'
+]
+
+RSI_ALPHA = 1 / 14
+FAST_ALPHA = 2 / (12 + 1)
+SLOW_ALPHA = 2 / (26 + 1)
+SIGNAL_ALPHA = 2 / (9 + 1)
+
+def compute_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute the feature matrix over a full OHLCV history in vectorized form
+
+    Args:
+        df: DataFrame with Open, High, Low, Close and Volume columns, sorted by time
+
+    Returns:
+        DataFrame indexed like df with FEATURE_COLUMNS. The first 20 rows
+        contain NaNs while the rolling windows fill up.
+    """
+    close = df['Close'].astype(float)
+    volume = df['Volume'].astype(float)
+
+    log_return = np.log(close).diff()
+    delta = close.diff()
+    avg_gain = delta.clip(lower=0).ewm(alpha=RSI_ALPHA, adjust=False).mean()
+    avg_loss = (-delta).clip(lower=0).ewm(alpha=RSI_ALPHA, adjust=False).mean()
+    total = avg_gain + avg_loss
+    rsi = (100 * avg_gain / total.where(total > 0)).fillna(50.0).where(delta.notna())
+
+    macd = close.ewm(alpha=FAST_ALPHA, adjust=False).mean() - close.ewm(alpha=SLOW_ALPHA, adjust=False).mean()
+    macd_signal = macd.ewm(alpha=SIGNAL_ALPHA, adjust=False).mean()
+
+    return pd.DataFrame({
+        'Close': close,
+        'log_return': log_return,
+        'sma_10': close.rolling(10).mean(),
+        'sma_20': close.rolling(20).mean(),
+        'volatility_20': log_return.rolling(20).std(),
+        'rsi_14': rsi,
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'macd_hist': macd - macd_signal,
+        'log_volume': np.log1p(volume),
+        'volume_ratio_20': volume / volume.rolling(20).mean(),
+        'hl_range': (df['High'] - df['Low']) / close
+    }, index=df.index)[FEATURE_COLUMNS]
+
+def make_windows(values: np.ndarray, look_back: int):
+    """
+    Build LSTM training windows as a strided view, without copying
+
+    Args:
+        values: Array of shape (n,) or (n, n_features)
+        look_back: Number of time steps per window
+
+    Returns:
+        Tuple (x, y_index) where x has shape (n - look_back, look_back, n_features)
+        and x[i] covers rows i .. i + look_back - 1, so its target row is
+        y_index[i] = i + look_back
+    """
+    if values.ndim == 1:
+        values = values.reshape(-1, 1)
+    windows = np.lib.stride_tricks.sliding_window_view(values, look_back, axis=0)
+    x = windows[:-1].transpose(0, 2, 1)
+    return x, np.arange(look_back, len(values))
+
+def scale_window(window: np.ndarray):
+    """
+    Min-max scale each feature of a single window to [0, 1]
+
+    Returns:
+        Tuple of (scaled window, per-feature minimum, per-feature range)
+    """
+    low = window.min(axis=0)
+    span = window.max(axis=0) - low
+    span[span == 0] = 1.0
+    return (window - low) / span, low, span
+
+def scale_windows(x: np.ndarray):
+    """
+    Min-max scale each feature of every window in a batch to [0, 1]
+
+    Args:
+        x: Windows of shape (n, look_back, n_features), e.g. from make_windows
+
+    Returns:
+        Tuple of (scaled windows, per-window minimum, per-window range); the
+        minimum and range have shape (n, 1, n_features)
+    """
+    low = x.min(axis=1, keepdims=True)
+    span = x.max(axis=1, keepdims=True) - low
+    span[span == 0] = 1.0
+    return (x - low) / span, low, span
+
+class RollingWindow:
+    """Fixed-size window with running sums for O(1) mean and sample std"""
+
+    def __init__(self, size: int, values=()):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.total_sq = 0.0
+        for value in values:
+            self.push(value)
+
+    def push(self, value: float):
+        if len(self.values) == self.size:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    def mean(self) -> float:
+        if len(self.values) < self.size:
+            return np.nan
+        return self.total / self.size
+
+    def std(self) -> float:
+        if len(self.values) < self.size:
+            return np.nan
+        variance = (self.total_sq - self.total * self.total / self.size) / (self.size - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+class FeatureState:
+    """
+    Rolling state needed to extend compute_features by one bar in O(1)
+
+    Build it with FeatureState.from_history(df); update(bar) then returns the
+    same feature row compute_features would produce for the appended bar.
+    """
+
+    def __init__(self):
+        self.last_close = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self.ema_fast = None
+        self.ema_slow = None
+        self.signal = None
+        self.close_10 = RollingWindow(10)
+        self.close_20 = RollingWindow(20)
+        self.return_20 = RollingWindow(20)
+        self.volume_20 = RollingWindow(20)
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame) -> 'FeatureState':
+        state = cls()
+        for row in df[['High', 'Low', 'Close', 'Volume']].tail(21).itertuples(index=False):
+            state.update(row.High, row.Low, row.Close, row.Volume)
+
+        # EMAs depend on the whole history, so take them from the vectorized pass
+        close = df['Close'].astype(float)
+        delta = close.diff()
+        state.avg_gain = float(delta.clip(lower=0).ewm(alpha=RSI_ALPHA, adjust=False).mean().iloc[-1])
+        state.avg_loss = float((-delta).clip(lower=0).ewm(alpha=RSI_ALPHA, adjust=False).mean().iloc[-1])
+        state.ema_fast = float(close.ewm(alpha=FAST_ALPHA, adjust=False).mean().iloc[-1])
+        state.ema_slow = float(close.ewm(alpha=SLOW_ALPHA, adjust=False).mean().iloc[-1])
+        macd = close.ewm(alpha=FAST_ALPHA, adjust=False).mean() - close.ewm(alpha=SLOW_ALPHA, adjust=False).mean()
+        state.signal = float(macd.ewm(alpha=SIGNAL_ALPHA, adjust=False).mean().iloc[-1])
+        return state
+
+    def update(self, high: float, low: float, close: float, volume: float) -> np.ndarray:
+        """Advance the state by one bar and return its feature row"""
+        if self.last_close is None:
+            log_return, delta = np.nan, np.nan
+            self.ema_fast = self.ema_slow = close
+            self.signal = 0.0
+        else:
+            log_return = float(np.log(close / self.last_close))
+            delta = close - self.last_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            if self.avg_gain is None:
+                self.avg_gain, self.avg_loss = gain, loss
+            else:
+                self.avg_gain += RSI_ALPHA * (gain - self.avg_gain)
+                self.avg_loss += RSI_ALPHA * (loss - self.avg_loss)
+            self.ema_fast += FAST_ALPHA * (close - self.ema_fast)
+            self.ema_slow += SLOW_ALPHA * (close - self.ema_slow)
+            self.signal += SIGNAL_ALPHA * ((self.ema_fast - self.ema_slow) - self.signal)
+            self.return_20.push(log_return)
+        self.last_close = close
+        self.close_10.push(close)
+        self.close_20.push(close)
+        self.volume_20.push(volume)
+
+        if self.avg_gain is None:
+            rsi = np.nan
+        elif self.avg_gain + self.avg_loss > 0:
+            rsi = 100 * self.avg_gain / (self.avg_gain + self.avg_loss)
+        else:
+            rsi = 50.0
+        macd = self.ema_fast - self.ema_slow
+        volume_mean = self.volume_20.mean()
+
+        return np.array([
+            close,
+            log_return,
+            self.close_10.mean(),
+            self.close_20.mean(),
+            self.return_20.std(),
+            rsi,
+            macd,
+            self.signal,
+            macd - self.signal,
+            np.log1p(volume),
+            volume / volume_mean if volume_mean else np.nan,
+            (high - low) / close
+        ])
+
+class FeatureEngine:
+    """
+    Per-symbol feature cache that serves the latest multivariate LSTM window
+
+    The first sync for a symbol computes features over the full history;
+    later syncs only feed the bars newer than the last one seen through
+    FeatureState.update, so a request costs O(new bars) instead of O(history).
+    """
+
+    def __init__(self, look_back: int = 60):
+        self.look_back = look_back
+        self._symbols: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def sync(self, symbol: str, df: pd.DataFrame):
+        """Bring the cached features for symbol up to the last bar of df"""
+        with self._lock:
+            entry = self._symbols.get(symbol)
+            last_seen = entry['last_timestamp'] if entry else None
+
+            if entry is None or last_seen not in df.index:
+                features = compute_features(df).dropna()
+                self._symbols[symbol] = {
+                    'state': FeatureState.from_history(df),
+                    'rows': deque(features.values[-self.look_back:], maxlen=self.look_back),
+                    'last_timestamp': df.index[-1]
+                }
+                return
+
+            new_bars = df.loc[df.index > last_seen]
+            for row in new_bars[['High', 'Low', 'Close', 'Volume']].itertuples(index=False):
+                entry['rows'].append(entry['state'].update(row.High, row.Low, row.Close, row.Volume))
+            if len(new_bars):
+                entry['last_timestamp'] = new_bars.index[-1]
+
+    def window(self, symbol: str) -> Optional[np.ndarray]:
+        """Latest (look_back, n_features) window for symbol, or None if not enough history"""
+        with self._lock:
+            entry = self._symbols.get(symbol)
+            if entry is None or len(entry['rows']) < self.look_back:
+                return None
+            return np.array(entry['rows'])
+
+    def invalidate(self, symbol: str):
+        with self._lock:
+            self._symbols.pop(symbol, None)
@@ -0,0 +1,169 @@
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
+from tensorflow.keras.models import Model
+
+from feature_engine import FEATURE_COLUMNS, FeatureEngine, compute_features, make_windows, scale_windows
+from inference_session import forward, latest_window, window_length
+from model_manager import ModelManager
+
+class FusedStockPredictor:
+    """
+    Per-symbol model with a shared LSTM trunk and two heads: a price
+    regression head and a rise/fall classification head.
+
+    Both heads are trained jointly and served by a single forward pass, so a
+    symbol needs one resident model instead of a price model plus the shared
+    trend model. Every window is min-max scaled on its own range, in training
+    and in serving alike, which keeps the model independent of any saved scaler.
+
+    Args:
+        model_dir: Directory the models are saved in
+        multivariate: Feed the engineered feature window instead of Close only
+        batcher: Optional InferenceBatcher to coalesce concurrent forward passes
+    """
+
+    def __init__(self, model_dir: str, multivariate: bool = False, batcher=None):
+        self.model_manager = ModelManager(model_dir)
+        # Trunk of new models; saved models keep the one they were trained with
+        self.architecture = self.model_manager.get_architecture('price')
+        self.look_back = self.architecture['look_back']
+        self.multivariate = multivariate
+        self.n_features = len(FEATURE_COLUMNS) if multivariate else 1
+        self.feature_engine = FeatureEngine(self.look_back)
+        # Symbol -> (model version, model)
+        self.models = {}
+        self.batcher = batcher
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def model_filename(symbol: str) -> str:
+        return f"{symbol}_fused_model.h5"
+
+    def create_model(self):
+        """Create the two-headed LSTM model, its trunk built like the registered price architecture"""
+        units, layers, dropout = self.architecture['units'], self.architecture['layers'], self.architecture['dropout']
+        inputs = Input(shape=(self.look_back, self.n_features))
+        trunk = inputs
+        for i in range(layers):
+            trunk = LSTM(units, return_sequences=i < layers - 1)(trunk)
+            if dropout:
+                trunk = Dropout(dropout)(trunk)
+        price = Dense(1, name='price')(trunk)
+        trend = Dense(1, activation='sigmoid', name='trend')(trunk)
+
+        model = Model(inputs=inputs, outputs=[price, trend])
+        model.compile(
+            optimizer='adam',
+            loss={'price': 'mean_squared_error', 'trend': 'binary_crossentropy'},
+            loss_weights={'price': 1.0, 'trend': 0.1}
+        )
+        return model
+
+    def _values(self, df: pd.DataFrame) -> np.ndarray:
+        if self.multivariate:
+            return compute_features(df).dropna().values
+        return df['Close'].values.reshape(-1, 1)
+
+    def prepare_data(self, df: pd.DataFrame):
+        """
+        Prepare windows and targets for both heads
+
+        Returns:
+            Tuple (x, y_price, y_trend); y_price is the next close in the
+            window's scale, y_trend is 1 if the next close is above the last one
+        """
+        values = self._values(df)
+        x, y_index = make_windows(values, self.look_back)
+        x_scaled, low, span = scale_windows(x)
+
+        # Close is the first column in both modes
+        next_close = values[y_index, 0]
+        last_close = values[y_index - 1, 0]
+        y_price = (next_close - low[:, 0, 0]) / span[:, 0, 0]
+        y_trend = (next_close > last_close).astype(np.float32)
+        return x_scaled, y_price, y_trend
+
+    def train_model(self, symbol: str, df: pd.DataFrame, epochs: int = 50, batch_size: int = 32):
+        """
+        Train and save the fused model for a symbol
+
+        Returns:
+            Training status and model details
+        """
+        model = self.create_model()
+        x, y_price, y_trend = self.prepare_data(df)
+        model.fit(x, {'price': y_price, 'trend': y_trend}, epochs=epochs, batch_size=batch_size)
+        filename = self.model_filename(symbol)
+        self.model_manager.save_model(model, filename)
+
+        with self._lock:
+            self.models[symbol] = (self.model_manager.get_model_version(filename), model)
+        self.feature_engine.invalidate(symbol)
+
+        return {
+            'status': 'success',
+            'symbol': symbol,
+            'message': f'Fused model trained successfully for {symbol}',
+            'epochs': epochs
+        }
+
+    def invalidate(self, symbol: str):
+        """Drop a symbol's resident model, e.g. after another process retrained it"""
+        with self._lock:
+            self.models.pop(symbol, None)
+        self.feature_engine.invalidate(symbol)
+
+    def has_model(self, symbol: str) -> bool:
+        return symbol in self.models or self.model_manager.get_model_version(self.model_filename(symbol)) != "untrained"
+
+    def get_model(self, symbol: str):
+        """
+        Return the resident model for symbol, loading it on first use
+
+        The model is reloaded whenever its file has changed, so a retrain in
+        another process (a training worker or another server worker) is
+        picked up without invalidate.
+        """
+        filename = self.model_filename(symbol)
+        version = self.model_manager.get_model_version(filename)
+        with self._lock:
+            cached = self.models.get(symbol)
+            if cached is None or cached[0] != version:
+                cached = self.models[symbol] = (version, self.model_manager.load_model(filename))
+            return cached[1]
+
+    def predict(self, symbol: str, df: pd.DataFrame):
+        """
+        Predict the next price and trend for a symbol in one forward pass
+
+        Returns:
+            Dictionary with predicted_price, prediction_date, trend, confidence
+            (probability of the predicted direction, in percent) and rise_probability
+        """
+        model = self.get_model(symbol)
+        window = latest_window(df, window_length(model), self.multivariate, symbol, self.feature_engine)
+
+        low = window.min(axis=0)
+        span = window.max(axis=0) - low
+        span[span == 0] = 1.0
+        x_input = ((window - low) / span)[np.newaxis]
+
+        if self.batcher is not None:
+            price_scaled, rise_probability = self.batcher.run(model, x_input)
+        else:
+            price_scaled, rise_probability = forward(model, x_input)
+        predicted_price = float(price_scaled[0][0]) * span[0] + low[0]
+        rise_probability = float(rise_probability[0][0])
+        trend = "rise" if rise_probability >= 0.5 else "fall"
+
+        return {
+            "predicted_price": float(predicted_price),
+            "prediction_date": (df.index[-1] + timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S"),
+            "trend": trend,
+            "confidence": (rise_probability if trend == "rise" else 1 - rise_probability) * 100,
+            "rise_probability": rise_probability
+        }
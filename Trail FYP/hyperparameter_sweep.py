@@ -0,0 +1,334 @@
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from cpu_config import configure_process, cpu_plan
+from feature_engine import compute_features, make_windows, scale_windows
+
+logger = logging.getLogger(__name__)
+
+# Values tried per hyperparameter unless others are given
+SEARCH_SPACE = {
+    'look_back': [30, 60, 90],
+    'units': [32, 50, 64],
+    'layers': [1, 2, 3],
+    'dropout': [0.0, 0.2]
+}
+
+def grid_trials(space: Dict[str, list]) -> List[dict]:
+    """Every combination of the values in space"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+def random_trials(space: Dict[str, list], count: int, seed: int = 0) -> List[dict]:
+    """count distinct combinations of the values in space, drawn at random"""
+    grid = grid_trials(space)
+    order = np.random.default_rng(seed).permutation(len(grid))[:count]
+    return [grid[i] for i in order]
+
+def load_series(symbols: List[str], multivariate: bool, interval: str) -> Dict[str, np.ndarray]:
+    """
+    Model input series per symbol
+
+    Price and trend models both scale every window on its own range, which
+    is done per trial, so the series are stored unscaled.
+
+    Returns:
+        Dictionary of symbol to float32 array of shape (n, n_features)
+
+    Raises:
+        ValueError: For intervals other than '1D', '5min', '15min', '30min' and '60min'
+    """
+    if interval not in ('1D', '5min', '15min', '30min', '60min'):
+        raise ValueError(f"Unsupported interval {interval}")
+    if interval == '1D':
+        from stock_trainer import StockTrainer
+        loader = StockTrainer(multivariate=multivariate)
+    else:
+        from stock_predictor import StockPredictor
+        loader = StockPredictor("models", multivariate=multivariate)
+
+    series = {}
+    for symbol in symbols:
+        df = loader.load_data(symbol, interval)
+        values = compute_features(df).dropna().values if multivariate else df[['Close']].values
+        series[symbol] = values.astype(np.float32)
+    return series
+
+class SharedSeries:
+    """
+    Series of several symbols packed into one shared memory block
+
+    Sweep workers attach to the block instead of receiving a pickled copy of
+    every series with each trial, so a symbol's data exists once however many
+    trials and processes use it.
+
+    Args:
+        series: Dictionary of symbol to array, as returned by load_series
+    """
+
+    def __init__(self, series: Dict[str, np.ndarray]):
+        size = sum(values.nbytes for values in series.values())
+        self.shm = SharedMemory(create=True, size=max(size, 1))
+        self.manifest = {}
+        offset = 0
+        for symbol, values in series.items():
+            view = np.ndarray(values.shape, dtype=np.float32, buffer=self.shm.buf, offset=offset)
+            view[:] = values
+            self.manifest[symbol] = {'offset': offset, 'shape': list(values.shape)}
+            offset += values.nbytes
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+# Set in each sweep process by _attach
+_shm = None
+_series: Dict[str, np.ndarray] = {}
+
+def _attach(name: str, manifest: dict):
+    global _shm, _series
+    _shm = SharedMemory(name=name)
+    _series = {
+        symbol: np.ndarray(tuple(entry['shape']), dtype=np.float32, buffer=_shm.buf, offset=entry['offset'])
+        for symbol, entry in manifest.items()
+    }
+
+def _detach():
+    global _shm, _series
+    _series = {}
+    if _shm is not None:
+        _shm.close()
+        _shm = None
+
+def _init_worker(name: str, manifest: dict):
+    configure_process('training')
+    _attach(name, manifest)
+
+def _run_trial(config: dict, symbol: str, validation_bars: int, epochs: int, batch_size: int, seed: int) -> dict:
+    """
+    Train one configuration on one symbol and score it on the symbol's last validation_bars bars
+
+    Windows are strided views into the shared series. Every configuration,
+    whatever its look_back, is scored on the same target bars.
+    """
+    import tensorflow as tf
+    from model_manager import build_lstm
+
+    values = _series[symbol]
+    x, y_index = make_windows(values, config['look_back'])
+    split = len(values) - validation_bars - config['look_back']
+    x_scaled, window_low, window_span = scale_windows(x)
+    window_low, window_span = window_low[:, 0, 0], window_span[:, 0, 0]
+    y = (values[y_index, 0] - window_low) / window_span
+    window_low, window_span = window_low[split:], window_span[split:]
+
+    tf.keras.utils.set_random_seed(seed)
+    model = build_lstm(n_features=values.shape[1], **config)
+    began = time.perf_counter()
+    history = model.fit(x_scaled[:split], y[:split], epochs=epochs, batch_size=batch_size, verbose=0)
+    train_seconds = time.perf_counter() - began
+    predicted = model.predict(x_scaled[split:], batch_size=1024, verbose=0)[:, 0]
+
+    val_mse = float(np.mean((predicted - y[split:]) ** 2))
+    # Back to prices for scale-free metrics comparable across symbols
+    predicted = window_low + predicted * window_span
+    actual = window_low + y[split:] * window_span
+    last_close = window_low + x_scaled[split:, -1, 0] * window_span
+    return {
+        'val_mse': val_mse,
+        'mape': float(np.mean(np.abs((predicted - actual) / actual)) * 100),
+        'directional_accuracy': float(np.mean((predicted > last_close) == (actual > last_close)) * 100),
+        'train_loss': float(history.history['loss'][-1]),
+        'train_seconds': train_seconds,
+        'params': int(model.count_params())
+    }
+
+def run_sweep(symbols: List[str], trials: List[dict], kind: str = 'price', multivariate: bool = False,
+              interval: str = '1D', epochs: int = 5, batch_size: int = 32, validation_split: float = 0.2,
+              workers: Optional[int] = None, seed: int = 0) -> dict:
+    """
+    Train and score every trial configuration on every symbol across a process pool
+
+    Each symbol's series is loaded once in this process and put into shared
+    memory unscaled; every (trial, symbol) pair is a separate job that
+    scales its own windows. Trials
+    are ranked by their mean absolute percentage error over the symbols.
+
+    Args:
+        symbols: Symbols to score the configurations on
+        trials: Configurations with look_back, units, layers and dropout,
+            e.g. from grid_trials or random_trials
+        kind: 'price' or 'trend', the model kind the configurations are for
+        multivariate: Feed the engineered features instead of Close only
+        interval: '1D' (daily, as StockTrainer) or an intraday interval resampled
+            from the 5-minute series (as StockPredictor)
+        epochs: Training epochs per trial
+        batch_size: Training batch size
+        validation_split: Share of each series' last bars held out for scoring
+        workers: Sweep processes (default: one per training CPU, see
+            cpu_config); 0 runs the trials in this process
+        seed: Random seed for weight initialization, equal for every trial
+
+    Returns:
+        Leaderboard dictionary with the sweep settings and the trials, best
+        first, each with its mean and per-symbol metrics
+
+    Raises:
+        ValueError: If a series is too short for the largest look_back
+    """
+    if workers is None:
+        workers = len(cpu_plan()['training']['cpus'])
+    series = load_series(symbols, multivariate, interval)
+    longest = max(trial['look_back'] for trial in trials)
+    validation_bars = {}
+    for symbol, values in series.items():
+        validation_bars[symbol] = max(1, int(len(values) * validation_split))
+        if len(values) - validation_bars[symbol] <= longest + batch_size:
+            raise ValueError(f"{symbol} has {len(values)} bars, too few for a look_back of {longest} "
+                             f"with {validation_bars[symbol]} held out")
+
+    shared = SharedSeries(series)
+    del series
+    results = [{} for _ in trials]
+    began = time.perf_counter()
+    try:
+        jobs = [(i, symbol) for i in range(len(trials)) for symbol in symbols]
+        if workers == 0:
+            _attach(shared.name, shared.manifest)
+            for i, symbol in jobs:
+                results[i][symbol] = _run_trial(trials[i], symbol, validation_bars[symbol], epochs, batch_size,
+                                                seed)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(shared.name, shared.manifest)) as pool:
+                futures = {pool.submit(_run_trial, trials[i], symbol, validation_bars[symbol], epochs,
+                                       batch_size, seed): (i, symbol) for i, symbol in jobs}
+                for done, future in enumerate(as_completed(futures), 1):
+                    i, symbol = futures[future]
+                    results[i][symbol] = future.result()
+                    logger.info("Trial %d/%d on %s done (%d/%d jobs)", i + 1, len(trials), symbol, done, len(jobs))
+    finally:
+        if workers == 0:
+            _detach()
+        shared.release()
+
+    ranked = []
+    for trial, per_symbol in zip(trials, results):
+        entry = {'config': trial}
+        for metric in ('mape', 'directional_accuracy', 'val_mse'):
+            entry[metric] = float(np.mean([result[metric] for result in per_symbol.values()]))
+        entry['train_seconds'] = float(sum(result['train_seconds'] for result in per_symbol.values()))
+        entry['params'] = next(iter(per_symbol.values()))['params']
+        entry['symbols'] = per_symbol
+        ranked.append(entry)
+    ranked.sort(key=lambda entry: entry['mape'])
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'kind': kind,
+        'multivariate': multivariate,
+        'interval': interval,
+        'symbols': list(symbols),
+        'epochs': epochs,
+        'batch_size': batch_size,
+        'validation_split': validation_split,
+        'workers': workers,
+        'seconds': time.perf_counter() - began,
+        'trials': ranked
+    }
+
+def promote(leaderboard: dict, model_manager, rank: int = 0) -> dict:
+    """
+    Register a leaderboard entry's configuration as the architecture for new
+    models of the sweep's kind
+
+    Args:
+        leaderboard: Result of run_sweep
+        model_manager: ModelManager whose registry is updated
+        rank: Position on the leaderboard, 0 for the best trial
+    """
+    entry = leaderboard['trials'][rank]
+    source = (f"sweep {leaderboard['created']} rank {rank} of {len(leaderboard['trials'])}: "
+              f"mape {entry['mape']:.3f}% on {','.join(leaderboard['symbols'])}")
+    return model_manager.set_architecture(leaderboard['kind'], source=source, **entry['config'])
+
+def print_leaderboard(leaderboard: dict, top: int = 10):
+    print(f"{'rank':>4} {'look_back':>9} {'units':>5} {'layers':>6} {'dropout':>7} "
+          f"{'mape %':>8} {'dir acc %':>9} {'params':>7} {'train s':>8}")
+    for rank, entry in enumerate(leaderboard['trials'][:top]):
+        config = entry['config']
+        print(f"{rank:>4} {config['look_back']:>9} {config['units']:>5} {config['layers']:>6} {config['dropout']:>7} "
+              f"{entry['mape']:>8.3f} {entry['directional_accuracy']:>9.1f} {entry['params']:>7} "
+              f"{entry['train_seconds']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep over the LSTM look_back and architecture")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run a grid or random search and write its leaderboard")
+    run.add_argument("symbols", nargs="+", help="Symbols to score the configurations on")
+    run.add_argument("--kind", choices=("price", "trend"), default="price", help="Model kind to tune")
+    run.add_argument("--search", choices=("grid", "random"), default="grid")
+    run.add_argument("--trials", type=int, default=20, help="Configurations to draw in a random search")
+    run.add_argument("--look-back", type=int, nargs="+", default=SEARCH_SPACE['look_back'])
+    run.add_argument("--units", type=int, nargs="+", default=SEARCH_SPACE['units'])
+    run.add_argument("--layers", type=int, nargs="+", default=SEARCH_SPACE['layers'])
+    run.add_argument("--dropout", type=float, nargs="+", default=SEARCH_SPACE['dropout'])
+    run.add_argument("--multivariate", action="store_true", help="Use the engineered OHLCV features")
+    run.add_argument("--interval", choices=("1D", "5min", "15min", "30min", "60min"), default="1D")
+    run.add_argument("--epochs", type=int, default=5, help="Training epochs per trial")
+    run.add_argument("--validation-split", type=float, default=0.2)
+    run.add_argument("--workers", type=int, default=None, help="Sweep processes (default: training CPUs)")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--output", default=None, help="Leaderboard path (default: models/sweeps/<kind>-<time>.json)")
+    run.add_argument("--promote", action="store_true", help="Register the best configuration for new models")
+
+    promote_parser = subparsers.add_parser("promote", help="Register a leaderboard entry for new models")
+    promote_parser.add_argument("leaderboard", help="Leaderboard JSON written by run")
+    promote_parser.add_argument("--rank", type=int, default=0, help="Leaderboard position to promote")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    from model_manager import ModelManager
+    model_manager = ModelManager("models")
+
+    if args.command == "promote":
+        with open(args.leaderboard) as f:
+            leaderboard = json.load(f)
+        print(json.dumps(promote(leaderboard, model_manager, args.rank), indent=2))
+        return
+
+    space = {'look_back': args.look_back, 'units': args.units, 'layers': args.layers, 'dropout': args.dropout}
+    trials = grid_trials(space) if args.search == "grid" else random_trials(space, args.trials, args.seed)
+    leaderboard = run_sweep([symbol.upper() for symbol in args.symbols], trials, args.kind, args.multivariate,
+                            args.interval, args.epochs, validation_split=args.validation_split,
+                            workers=args.workers, seed=args.seed)
+
+    output = args.output or os.path.join("models", "sweeps",
+                                         f"{args.kind}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(leaderboard, f, indent=2)
+    print_leaderboard(leaderboard)
+    print(f"{len(trials)} trials on {len(args.symbols)} symbols in {leaderboard['seconds']:.1f}s, "
+          f"leaderboard written to {output}")
+    if args.promote:
+        print(json.dumps(promote(leaderboard, model_manager), indent=2))
+
+if __name__ == "__main__":
+    main()
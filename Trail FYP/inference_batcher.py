@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+from inference_session import forward
+
+class _Request:
+    def __init__(self, x: np.ndarray):
+        self.x = np.asarray(x, dtype=np.float32)
+        self.enqueued = time.perf_counter()
+        self.done = False
+        self.result = None
+        self.error = None
+
+class InferenceBatcher:
+    """
+    Coalesces concurrent forward passes through the same model into batches
+
+    Callers block in ``run``. The first queued request for a model leads the
+    next batch: it waits up to ``max_wait`` seconds for more requests (or
+    until ``max_batch`` are queued), runs one batched forward pass and hands
+    every waiting caller its own rows. Only one batch per model runs at a
+    time, so requests arriving during a forward pass form the next batch
+    without waiting any longer than that pass. Requests are grouped by model
+    object: the shared trend model batches across symbols, a price model
+    across requests for its symbol.
+
+    Args:
+        max_batch: Largest number of requests in one forward pass
+        max_wait: Seconds the leader of a batch waits for more requests
+    """
+
+    def __init__(self, max_batch: int = 32, max_wait: float = 0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queues: Dict[object, deque] = {}
+        self._running = set()
+        self._condition = threading.Condition()
+        self._batches = 0
+        self._requests = 0
+        self._largest_batch = 0
+        self._batch_sizes = deque(maxlen=1024)
+        self._waits = deque(maxlen=1024)
+
+    def run(self, model, x: np.ndarray):
+        """
+        Forward x through model as part of a batch
+
+        Args:
+            model: Model accepted by inference_session.forward
+            x: Input of shape (1, look_back, n_features)
+
+        Returns:
+            The rows of the batched output that belong to x, shaped like
+            forward(model, x)
+        """
+        request = _Request(x)
+        with self._condition:
+            queue = self._queues.setdefault(model, deque())
+            queue.append(request)
+            self._condition.notify_all()
+
+            while not request.done:
+                if model in self._running or queue[0] is not request:
+                    self._condition.wait()
+                    continue
+
+                # This request leads the next batch, which includes itself
+                self._running.add(model)
+                deadline = request.enqueued + self.max_wait
+                while len(queue) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = [queue.popleft() for _ in range(min(self.max_batch, len(queue)))]
+                if not queue:
+                    del self._queues[model]
+
+                self._condition.release()
+                try:
+                    self._execute(model, batch)
+                finally:
+                    self._condition.acquire()
+                    self._running.discard(model)
+                    self._condition.notify_all()
+
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _execute(self, model, batch):
+        started = time.perf_counter()
+        try:
+            outputs = forward(model, np.concatenate([request.x for request in batch]))
+            offset = 0
+            for request in batch:
+                rows = slice(offset, offset + len(request.x))
+                offset += len(request.x)
+                request.result = [output[rows] for output in outputs] if isinstance(outputs, list) else outputs[rows]
+        except Exception as e:
+            for request in batch:
+                request.error = e
+
+        with self._condition:
+            self._batches += 1
+            self._requests += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+            self._batch_sizes.append(len(batch))
+            self._waits.extend(started - request.enqueued for request in batch)
+            for request in batch:
+                request.done = True
+
+    def metrics(self) -> dict:
+        """
+        Batching statistics
+
+        Returns:
+            Dictionary with the current queue depth, totals since start and
+            batch size and added latency (time queued before the forward
+            pass) over the most recent batches and requests
+        """
+        with self._condition:
+            waits = sorted(self._waits)
+            sizes = list(self._batch_sizes)
+            queue_depth = sum(len(queue) for queue in self._queues.values())
+            batches, requests, largest = self._batches, self._requests, self._largest_batch
+
+        def wait_percentile(p):
+            return waits[min(len(waits) - 1, int(p * len(waits)))] * 1000 if waits else None
+
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": queue_depth,
+            "batches": batches,
+            "requests": requests,
+            "largest_batch": largest,
+            "mean_batch_size": float(np.mean(sizes)) if sizes else None,
+            "added_latency_p50_ms": wait_percentile(0.50),
+            "added_latency_p99_ms": wait_percentile(0.99)
+        }
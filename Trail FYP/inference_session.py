@@ -0,0 +1,313 @@
+import threading
+import weakref
+from datetime import timedelta
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+from feature_engine import FeatureEngine, compute_features, scale_window
+from shared_model import SharedModel
+from streaming_lstm import StreamingLSTM
+from tflite_backend import TFLiteModel
+
+# Traced functions per model, without (False) and with (True) dropout active
+_serving_functions = {False: weakref.WeakKeyDictionary(), True: weakref.WeakKeyDictionary()}
+_serving_lock = threading.Lock()
+
+def _serving_function(model, training: bool = False):
+    """Traced inference function for a Keras model, built once per model"""
+    with _serving_lock:
+        function = _serving_functions[training].get(model)
+        if function is None:
+            # A weak reference, so the cached function does not keep replaced models alive
+            model_ref = weakref.ref(model)
+            spec = tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)
+            function = tf.function(lambda x: model_ref()(x, training=training), input_signature=[spec])
+            _serving_functions[training][model] = function
+        return function
+
+def forward(model, x: np.ndarray):
+    """
+    Run a forward pass without touching any state on the model
+
+    SharedModel and TFLiteModel have their own predict. Keras models run through a traced function
+    with a fixed input signature rather than model.predict, which builds and
+    caches a predict function on the model and is not safe to call from
+    several threads at once; an eager call would re-dispatch every LSTM step.
+
+    Returns:
+        Output array, or a list of arrays for models with several outputs
+    """
+    x = np.asarray(x, dtype=np.float32)
+    if isinstance(model, (SharedModel, TFLiteModel)):
+        return model.predict(x)
+    outputs = _serving_function(model)(x)
+    if isinstance(outputs, (list, tuple)):
+        return [np.asarray(output) for output in outputs]
+    return np.asarray(outputs)
+
+def forward_samples(model, x: np.ndarray, samples: int) -> np.ndarray:
+    """
+    Monte Carlo dropout: run one input through a Keras model `samples` times
+    with dropout active, as a single forward pass over a batch of copies
+
+    Args:
+        model: Keras model containing Dropout layers
+        x: Input of shape (1, look_back, n_features)
+        samples: Number of stochastic passes
+
+    Returns:
+        Output array with one row per pass
+    """
+    if isinstance(model, (SharedModel, TFLiteModel)):
+        raise TypeError("Monte Carlo dropout needs the Keras model; exported models have no dropout")
+    batch = np.repeat(np.asarray(x, dtype=np.float32), samples, axis=0)
+    return np.asarray(_serving_function(model, training=True)(batch))
+
+def window_length(model) -> int:
+    """Time steps per input window of a Keras, shared or TFLite model"""
+    if isinstance(model, (SharedModel, TFLiteModel)):
+        return model.input_shape[0]
+    return model.input_shape[1]
+
+def latest_window(df: pd.DataFrame, look_back: int, multivariate: bool, symbol: Optional[str] = None,
+                  feature_engine: Optional[FeatureEngine] = None) -> np.ndarray:
+    """
+    Latest (look_back, n_features) model input for a symbol, unscaled
+
+    Args:
+        df: Historical data for the symbol
+        look_back: Number of time steps per window
+        multivariate: Build the engineered feature window instead of Close only
+        symbol: Symbol of df, required with feature_engine
+        feature_engine: Optional incremental feature cache for the multivariate
+            window, used when its look_back covers the window
+
+    Raises:
+        ValueError: If df has too little history for one window
+    """
+    if not multivariate:
+        window = df['Close'].values[-look_back:].reshape(-1, 1)
+    elif feature_engine is not None and feature_engine.look_back >= look_back:
+        feature_engine.sync(symbol, df)
+        window = feature_engine.window(symbol)
+        if window is not None:
+            window = window[-look_back:]
+    else:
+        window = compute_features(df).dropna().values[-look_back:]
+
+    if window is None or len(window) < look_back:
+        raise ValueError(f"Not enough history to build a {look_back} step window for {symbol or 'the symbol'}")
+    return window
+
+def predict_price(model, window: np.ndarray, batcher=None) -> float:
+    """
+    Predict the next close from one window
+
+    The window is min-max scaled on its own range and the output mapped back
+    through the Close column's range, so no fitted scaler is involved.
+
+    Args:
+        model: Model to run
+        window: Unscaled (look_back, n_features) window
+        batcher: Optional InferenceBatcher to coalesce the forward pass with
+            concurrent calls for the same model
+    """
+    scaled, low, span = scale_window(window)
+    x = scaled[np.newaxis]
+    predicted_scaled = (batcher.run(model, x) if batcher is not None else forward(model, x))[0][0]
+    return float(predicted_scaled * span[0] + low[0])
+
+def predict_trend(model, window: np.ndarray, current_price: float, batcher=None, samples: int = 0,
+                  interval: float = 0.9) -> dict:
+    """
+    Predict whether the next close is above the current price
+
+    With samples, the prediction is repeated that many times with dropout
+    active (see forward_samples). The trend then comes with the share of
+    passes predicting a rise and a prediction interval of the price, and
+    confidence becomes the probability of the reported trend in percent.
+    Otherwise confidence is the predicted move in percent.
+
+    Args:
+        model: Trend model
+        window: Unscaled (look_back, n_features) window
+        current_price: Latest close
+        batcher: Optional InferenceBatcher (not used with samples)
+        samples: Number of Monte Carlo dropout passes, 0 for a single deterministic pass
+        interval: Coverage of the prediction interval
+
+    Returns:
+        Dictionary containing trend prediction and confidence, plus
+        rise_probability and prediction_interval with samples
+    """
+    if samples:
+        scaled, low, span = scale_window(window)
+        prices = forward_samples(model, scaled[np.newaxis], samples)[:, 0] * span[0] + low[0]
+        rise_probability = float(np.mean(prices > current_price))
+        lower, upper = np.quantile(prices, [(1 - interval) / 2, (1 + interval) / 2])
+        return {
+            "trend": "rise" if rise_probability > 0.5 else "fall",
+            "confidence": max(rise_probability, 1 - rise_probability) * 100,
+            "rise_probability": rise_probability,
+            "prediction_interval": [float(lower), float(upper)],
+            "interval": interval,
+            "samples": samples,
+            "predicted_price": float(prices.mean()),
+            "predicted_price_std": float(prices.std()),
+            "current_price": float(current_price)
+        }
+
+    predicted_price = predict_price(model, window, batcher)
+    trend = "rise" if predicted_price > current_price else "fall"
+    confidence = abs((predicted_price - current_price) / current_price) * 100
+
+    return {
+        "trend": trend,
+        "confidence": float(confidence),
+        "predicted_price": float(predicted_price),
+        "current_price": float(current_price)
+    }
+
+class InferenceSession:
+    """
+    Everything needed to serve one symbol: its price model and the trend
+    model, as they were when the session was resolved
+
+    A session holds no per-request state and is never mutated after it is
+    built, so any number of threads can predict through it at once. A
+    retrained model only reaches sessions resolved after it was saved.
+
+    Each model is fed windows as long as its own input, so models trained
+    before a different look_back was registered keep working.
+
+    Args:
+        symbol: Stock symbol the session serves
+        version: Version of the price model (see ModelManager.get_model_version)
+        backend: Serving backend the price model was loaded in (see ModelManager.get_backend)
+        price_model: Per-symbol price model (SharedModel, TFLiteModel or Keras model)
+        trend_model: Trend model (Keras model)
+        multivariate: Whether the models take the engineered feature window
+        batcher: Optional InferenceBatcher shared by all sessions
+        stream: Optional StreamingLSTM over price_model that advances the
+            price prediction one bar at a time
+        uncertainty_samples: Monte Carlo dropout passes for the trend, 0 for none
+    """
+
+    def __init__(self, symbol: str, version: str, backend: str, price_model, trend_model, multivariate: bool,
+                 batcher=None, stream: Optional[StreamingLSTM] = None, uncertainty_samples: int = 0):
+        self.symbol = symbol
+        self.version = version
+        self.backend = backend
+        self.price_model = price_model
+        self.trend_model = trend_model
+        self.look_back = window_length(price_model)
+        self.trend_look_back = window_length(trend_model)
+        self.multivariate = multivariate
+        self.batcher = batcher
+        self.stream = stream
+        self.uncertainty_samples = uncertainty_samples
+
+    def predict(self, df: pd.DataFrame, feature_engine: Optional[FeatureEngine] = None):
+        """
+        Predict the next price and trend from the latest window of df
+
+        Returns:
+            Tuple of (price result, trend result) dictionaries
+        """
+        window = latest_window(df, max(self.look_back, self.trend_look_back), self.multivariate, self.symbol,
+                               feature_engine)
+        price_window = window[-self.look_back:]
+        if self.stream is not None:
+            predicted_price = self.stream.predict(df.index.asi8[-self.look_back:], price_window)
+        else:
+            predicted_price = predict_price(self.price_model, price_window, self.batcher)
+        price_result = {
+            "predicted_price": predicted_price,
+            "prediction_date": (df.index[-1] + timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S")
+        }
+        trend_result = predict_trend(self.trend_model, window[-self.trend_look_back:], df['Close'].iloc[-1],
+                                     self.batcher, self.uncertainty_samples)
+        return price_result, trend_result
+
+class SessionRegistry:
+    """
+    Resolves symbols to inference sessions, rebuilding a session only when
+    its price model file, its selected backend or the trend model has changed
+
+    Price models come from the model manager's cache, so resolving a session
+    after a retrain costs one model load and every other lookup is a
+    dictionary hit.
+
+    Args:
+        model_manager: ModelManager holding the per-symbol price models
+        trend_predictor: StockTrendPredictor whose current model sessions use
+        multivariate: Whether the models take the engineered feature window
+        batcher: Optional InferenceBatcher that sessions run their forward passes through
+        streaming: Advance exported price models one bar at a time with a
+            StreamingLSTM per symbol instead of re-running the whole window
+        uncertainty_samples: Monte Carlo dropout passes for the trend, 0 for none
+    """
+
+    def __init__(self, model_manager, trend_predictor, multivariate: bool = False, batcher=None,
+                 streaming: bool = False, uncertainty_samples: int = 0):
+        self.model_manager = model_manager
+        self.trend_predictor = trend_predictor
+        self.multivariate = multivariate
+        self.batcher = batcher
+        self.streaming = streaming
+        self.uncertainty_samples = uncertainty_samples
+        self._sessions: Dict[str, InferenceSession] = {}
+        # Kept apart from sessions so a trend model retrain does not discard recurrent state
+        self._streams: Dict[str, StreamingLSTM] = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str) -> InferenceSession:
+        """
+        Current session for symbol
+
+        Raises:
+            FileNotFoundError: If no price model has been saved for the symbol
+        """
+        filename = f"{symbol}_model.h5"
+        version = self.model_manager.get_model_version(filename)
+        # Read from backends.json, so a switch made by any process or ModelManager is seen
+        backend = self.model_manager.get_backend(filename)
+        trend_model = self.trend_predictor.model
+        with self._lock:
+            session = self._sessions.get(symbol)
+        if session is not None and session.version == version and session.backend == backend \
+                and session.trend_model is trend_model:
+            return session
+
+        price_model = self.model_manager.get_model(filename)
+        stream = None
+        if self.streaming and isinstance(price_model, SharedModel):
+            with self._lock:
+                stream = self._streams.get(symbol)
+                if stream is None or stream.model is not price_model:
+                    stream = self._streams[symbol] = StreamingLSTM(price_model)
+
+        session = InferenceSession(symbol, version, backend, price_model, trend_model, self.multivariate,
+                                   self.batcher, stream, self.uncertainty_samples)
+        with self._lock:
+            self._sessions[symbol] = session
+        return session
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """Drop cached sessions and recurrent state for symbol (default: all symbols)"""
+        with self._lock:
+            if symbol is None:
+                self._sessions.clear()
+                self._streams.clear()
+            else:
+                self._sessions.pop(symbol, None)
+                self._streams.pop(symbol, None)
+
+    def streaming_metrics(self) -> Dict[str, dict]:
+        """Full recomputes and incremental steps per streamed symbol"""
+        with self._lock:
+            streams = dict(self._streams)
+        return {symbol: stream.metrics() for symbol, stream in streams.items()}
@@ -0,0 +1,166 @@
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+from dotenv import load_dotenv
+
+from alpha_vantage import fetch_bulk_quotes, fetch_intraday
+from prediction_scheduler import DEFAULT_HOT_SYMBOLS
+from series_store import BAR_DTYPE, INTERVAL_SECONDS, SeriesStore, market_now
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+class IngestionDaemon:
+    """
+    Keeps a universe of symbols current in the SeriesStore
+
+    Bars are assembled from REALTIME_BULK_QUOTES snapshots, so one API call
+    covers up to 100 symbols: the first snapshot in a bar is its open, the
+    extremes seen are its high and low, the last one its close, and volume
+    is the growth of the cumulative session volume. Closed bars are appended
+    at each bar boundary. When a symbol's stored series has a gap (first
+    run, restart, missed polls) it is backfilled from a compact
+    TIME_SERIES_INTRADAY call, which also replaces the snapshot
+    approximations of recent bars with the exchange's own bars.
+
+    Args:
+        symbols: Universe to keep current
+        store: Series store that StockPredictor.load_data reads from
+        interval: Bar interval
+        poll_interval: Seconds between bulk quote snapshots within a bar
+        reconcile_every: Backfill every symbol from the compact series after
+            this many bars even without a gap (0 disables)
+    """
+
+    def __init__(self, symbols: List[str], store: SeriesStore, interval: str = '5min',
+                 poll_interval: float = 60.0, reconcile_every: int = 12):
+        self.symbols = symbols
+        self.store = store
+        self.interval = interval
+        self.interval_seconds = INTERVAL_SECONDS[interval]
+        self.poll_interval = poll_interval
+        self.reconcile_every = reconcile_every
+        self.api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
+        self.api_calls = 0
+        self._building: Dict[str, dict] = {}
+        self._bars_since_backfill: Dict[str, int] = {}
+        self._last_volume: Dict[str, float] = {}
+
+    def backfill(self, symbol: str):
+        """Merge the latest compact series for symbol into the store"""
+        self.api_calls += 1
+        self.store.merge(symbol, self.interval, fetch_intraday(symbol, self.api_key, self.interval, 'compact'))
+        self._bars_since_backfill[symbol] = 0
+
+    def poll(self):
+        """Take one bulk quote snapshot and fold it into the bars being built"""
+        self.api_calls += (len(self.symbols) + 99) // 100
+        quotes = fetch_bulk_quotes(self.symbols, self.api_key)
+        for symbol, quote in quotes.items():
+            bar_start = quote['timestamp'] // self.interval_seconds * self.interval_seconds
+            previous_volume = self._last_volume.get(symbol, quote['volume'])
+            # Cumulative volume restarts each session
+            volume = quote['volume'] - previous_volume if quote['volume'] >= previous_volume else quote['volume']
+            self._last_volume[symbol] = quote['volume']
+
+            # Outside market hours the quote stops changing; its bar is already stored
+            last = self.store.last_timestamp(symbol, self.interval)
+            if last is not None and bar_start <= last:
+                continue
+
+            bar = self._building.get(symbol)
+            if bar is not None and bar['timestamp'] != bar_start:
+                self._close(symbol, bar)
+                bar = None
+            if bar is None:
+                self._building[symbol] = {'timestamp': bar_start, 'open': quote['price'], 'high': quote['price'],
+                                          'low': quote['price'], 'close': quote['price'], 'volume': volume}
+            else:
+                bar['high'] = max(bar['high'], quote['price'])
+                bar['low'] = min(bar['low'], quote['price'])
+                bar['close'] = quote['price']
+                bar['volume'] += volume
+
+    def close_due_bars(self):
+        """Close every bar whose interval has ended"""
+        current_bar = market_now() // self.interval_seconds * self.interval_seconds
+        for symbol, bar in list(self._building.items()):
+            if bar['timestamp'] < current_bar:
+                self._close(symbol, bar)
+                del self._building[symbol]
+
+    def _close(self, symbol: str, bar: dict):
+        last = self.store.last_timestamp(symbol, self.interval)
+        if last is not None and bar['timestamp'] <= last:
+            return
+        gap = last is None or bar['timestamp'] - last > self.interval_seconds
+        reconcile = self.reconcile_every and self._bars_since_backfill.get(symbol, 0) + 1 >= self.reconcile_every
+        if gap or reconcile:
+            try:
+                self.backfill(symbol)
+            except Exception as e:
+                logger.warning("Backfill of %s failed: %s", symbol, e)
+        record = np.array([tuple(bar[name] for name in BAR_DTYPE.names)], dtype=BAR_DTYPE)
+        # Only bars actually appended count towards the next reconcile
+        if self.store.append(symbol, self.interval, record):
+            self._bars_since_backfill[symbol] = self._bars_since_backfill.get(symbol, 0) + 1
+
+    def write_status(self, path: str):
+        status = {
+            'updated_at': time.time(),
+            'api_calls': self.api_calls,
+            'freshness': self.store.freshness(self.interval, self.symbols)
+        }
+        with open(path + '.tmp', 'w') as f:
+            json.dump(status, f)
+        os.replace(path + '.tmp', path)
+
+    def run_forever(self, status_path: str):
+        """Snapshot every poll_interval and close bars right after each boundary"""
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning("Bulk quote poll failed: %s", e)
+            self.close_due_bars()
+            self.write_status(status_path)
+
+            now = market_now()
+            next_boundary = (now // self.interval_seconds + 1) * self.interval_seconds
+            time.sleep(max(1.0, min(self.poll_interval, next_boundary + 1 - now)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a universe of symbols current in the local series store")
+    parser.add_argument("--symbols", default=os.getenv("INGEST_SYMBOLS", os.getenv("HOT_SYMBOLS", DEFAULT_HOT_SYMBOLS)),
+                        help="Comma-separated universe (default: INGEST_SYMBOLS, then HOT_SYMBOLS)")
+    parser.add_argument("--interval", default="5min", choices=sorted(INTERVAL_SECONDS))
+    parser.add_argument("--poll-interval", type=float, default=60.0, help="Seconds between bulk quote snapshots")
+    parser.add_argument("--reconcile-every", type=int, default=12, help="Bars between compact-series reconciliations")
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    if not symbols:
+        parser.error("no symbols to ingest; pass --symbols or set INGEST_SYMBOLS or HOT_SYMBOLS")
+    store = SeriesStore(args.data_dir)
+    daemon = IngestionDaemon(symbols, store, args.interval, args.poll_interval, args.reconcile_every)
+
+    for symbol in symbols:
+        if store.read(symbol, args.interval) is None:
+            try:
+                daemon.backfill(symbol)
+            except Exception as e:
+                logger.warning("Initial backfill of %s failed: %s", symbol, e)
+
+    logger.info("Ingesting %d symbols every %s", len(symbols), args.interval)
+    daemon.run_forever(os.path.join(args.data_dir, "ingest_status.json"))
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,39 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict
-from datetime import datetime
+from typing import Optional, List
 import requests
 import os
+import logging
+import threading
+import time
+import numpy as np
 from dotenv import load_dotenv
+from cpu_config import configure_process
+
+# Serving is pinned to its CPUs and thread budget before TensorFlow is imported
+load_dotenv()
+configure_process('serving')
 
 from stock_predictor import StockPredictor
-from stock_trainer import StockTrainer
 from model_manager import ModelManager
 from stock_trend_predictor import StockTrendPredictor
+from symbol_index import SymbolIndex
+from prediction_scheduler import PredictionCache, PredictionScheduler
+from fused_predictor import FusedStockPredictor
+from warmup import Warmup
+from inference_session import SessionRegistry, forward, window_length
+from inference_batcher import InferenceBatcher
+from admission import AdmissionController, AdmissionRejected
+from feature_engine import compute_features
+from tflite_backend import holdout_windows
+from training_pool import (TrainingPool, fine_tune_price_model, train_fused_model, train_intraday_price_model,
+                           train_price_model, train_trend_weights)
+from drift_monitor import DriftMonitor
+from prediction_journal import PredictionJournal
+from series_store import format_timestamp
 
-load_dotenv()
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
 app = FastAPI(
     title="Stock Market Prediction System",
@@ -30,18 +52,61 @@ app.add_middleware(
 )
 
 # Initialize components
-stock_predictor = StockPredictor("models")
-stock_trainer = StockTrainer()
+# MULTIVARIATE_FEATURES=1 feeds the engineered OHLCV features to the LSTMs
+# (existing Close-only models must be retrained after switching)
+multivariate = os.getenv('MULTIVARIATE_FEATURES', '0') == '1'
+stock_predictor = StockPredictor("models", multivariate=multivariate)
 model_manager = ModelManager("models")
-stock_trend_predictor = StockTrendPredictor()
+stock_trend_predictor = StockTrendPredictor(multivariate=multivariate)
+# FUSED_MODELS=1 makes /add-company and /train-model train one per-symbol price+trend model
+use_fused = os.getenv('FUSED_MODELS', '0') == '1'
+# Concurrent forward passes through the same model are coalesced into one batch
+inference_batcher = InferenceBatcher(max_batch=int(os.getenv('INFERENCE_MAX_BATCH', '32')),
+                                     max_wait=float(os.getenv('INFERENCE_BATCH_WAIT_MS', '2')) / 1000)
+fused_predictor = FusedStockPredictor("models", multivariate=multivariate, batcher=inference_batcher)
+symbol_index = SymbolIndex("data")
 
 # Create trend prediction model
 stock_trend_predictor.create_model()
 
+# Predictions run through immutable per-symbol sessions and can proceed in
+# parallel; only training, which replaces models, is serialized
+# STREAMING_INFERENCE=1 advances price models one bar at a time from kept LSTM state
+streaming = os.getenv('STREAMING_INFERENCE', '0') == '1'
+# TREND_UNCERTAINTY_SAMPLES=K runs the trend model K times with dropout active, in one batch,
+# for a rise probability and prediction interval
+uncertainty_samples = int(os.getenv('TREND_UNCERTAINTY_SAMPLES', '0'))
+inference_sessions = SessionRegistry(stock_predictor.model_manager, stock_trend_predictor, multivariate,
+                                     inference_batcher, streaming, uncertainty_samples)
+training_lock = threading.Lock()
+# Training runs in TRAINING_WORKERS separate processes pinned to the training
+# CPUs (see cpu_config), so it does not compete with serving for cores;
+# 0 trains in the server process. Every serve.py worker imports this module,
+# so a lock file keeps training to one job at a time across all of them
+training_pool = TrainingPool(int(os.getenv('TRAINING_WORKERS', '1')), lock_path=os.path.join("models", "training.lock"))
+# Expensive work is admitted through separate lanes so that e.g. a burst of
+# training cannot starve predictions. Queued requests hold a server thread,
+# so the lanes together stay well below the thread pool size (40).
+admission = AdmissionController()
+admission.add_lane("predict", max_concurrency=8, max_queue=16, queue_timeout=5.0, service_time=0.5)
+admission.add_lane("training", max_concurrency=1, max_queue=1, queue_timeout=2.0, service_time=60.0)
+admission.add_lane("upstream", max_concurrency=4, max_queue=4, queue_timeout=2.0, service_time=1.0)
+
+# Spilled to disk so that every worker process can serve the scheduler's predictions
+prediction_cache = PredictionCache(interval=300, cache_dir=os.path.join("data", "predictions"))
+# Every served prediction is appended to a columnar journal in the background
+# (PREDICTION_JOURNAL=0 turns it off)
+prediction_journal = None
+if os.getenv('PREDICTION_JOURNAL', '1') == '1':
+    prediction_journal = PredictionJournal(os.path.join("data", "journal"))
+
 class StockRequest(BaseModel):
     symbol: str
     date: Optional[str] = None
 
+class WarmRequest(BaseModel):
+    symbols: List[str]
+
 class CompanySearchRequest(BaseModel):
     query: str
 
@@ -52,6 +117,12 @@ class CompanyInfo(BaseModel):
     region: str
     matchScore: str
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request, exc: AdmissionRejected):
+    # Async so that rejections are answered without a server thread
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
 @app.get("/")
 def read_root():
     """Health check endpoint"""
@@ -61,11 +132,183 @@ def read_root():
         "version": "1.0.0"
     }
 
+def model_version(symbol: str):
+    """Version of the model that serves a symbol, preferring its fused model"""
+    if fused_predictor.has_model(symbol):
+        return model_manager.get_model_version(fused_predictor.model_filename(symbol))
+    return model_manager.get_model_version(f"{symbol}_model.h5")
+
+def compute_prediction(symbol: str):
+    """
+    Run the price and trend models for a symbol
+    
+    Symbols with a fused model are served by a single forward pass of that
+    model; the others go through the price model and the shared trend model.
+    
+    Args:
+        symbol: Stock symbol to predict
+        
+    Returns:
+        Tuple of (last bar timestamp, model version, prediction response)
+    """
+    if fused_predictor.has_model(symbol):
+        df = stock_predictor.load_data(symbol)
+        last_30_days = df.tail(30)
+        price_result = trend_result = fused_predictor.predict(symbol, df)
+    else:
+        df, last_30_days, price_result, trend_result = _predict_separately(symbol)
+        drift_monitor.record(symbol, model_version(symbol), df, price_result["predicted_price"])
+    
+    # Prepare response with historical data
+    result = {
+        "symbol": symbol,
+        "predicted_price": price_result["predicted_price"],
+        "prediction_date": price_result["prediction_date"],
+        "trend_prediction": trend_result["trend"],
+        "confidence": trend_result["confidence"],
+        "historical_dates": last_30_days.index.strftime("%Y-%m-%d %H:%M:%S").tolist(),
+        "historical_prices": last_30_days["Close"].tolist()
+    }
+    for key in ("rise_probability", "prediction_interval"):
+        if key in trend_result:
+            result[key] = trend_result[key]
+    bar_timestamp = df.index[-1].strftime("%Y-%m-%d %H:%M:%S")
+    return bar_timestamp, model_version(symbol), result
+
+def _predict_separately(symbol: str):
+    """Predict with the per-symbol price model and the shared trend model"""
+    # Load historical data
+    df = stock_predictor.load_data(symbol)
+    
+    # Resolve the symbol's session, training a model first if none exists
+    try:
+        session = inference_sessions.get(symbol)
+    except FileNotFoundError:
+        session = _train_missing_model(symbol, df)
+    
+    # Get last 30 days of data for visualization
+    last_30_days = df.tail(30)
+    
+    # Predict price and trend from the same window
+    price_result, trend_result = session.predict(df, stock_predictor.feature_engine)
+    
+    return df, last_30_days, price_result, trend_result
+
+def _retrain_drifted(symbol: str):
+    """Fine-tune a drifted price model on the symbol's latest history"""
+    df = stock_predictor.load_data(symbol)
+    with training_lock:
+        training_pool.run(fine_tune_price_model, symbol, df, drift_retrain_epochs, multivariate)
+    prediction_cache.invalidate(symbol)
+
+# Served price predictions are scored against the next bar's close; symbols
+# whose rolling error or directional accuracy drift past the thresholds are
+# fine-tuned for DRIFT_RETRAIN_EPOCHS epochs in the background
+drift_retrain_epochs = int(os.getenv('DRIFT_RETRAIN_EPOCHS', '10'))
+drift_monitor = DriftMonitor(_retrain_drifted,
+                             window=int(os.getenv('DRIFT_WINDOW', '100')),
+                             min_samples=int(os.getenv('DRIFT_MIN_SAMPLES', '30')),
+                             max_error=float(os.getenv('DRIFT_MAX_ERROR', '0.02')),
+                             min_direction_accuracy=float(os.getenv('DRIFT_MIN_DIRECTION_ACCURACY', '0.45')),
+                             cooldown=float(os.getenv('DRIFT_COOLDOWN_HOURS', '6')) * 3600)
+
+def _train_missing_model(symbol: str, df):
+    """Train and save a price model for a symbol that has none, once across threads"""
+    with training_lock:
+        # Another request may have trained it while this one waited
+        try:
+            return inference_sessions.get(symbol)
+        except FileNotFoundError:
+            pass
+        training_pool.run(train_intraday_price_model, symbol, df, 50, multivariate)
+    return inference_sessions.get(symbol)
+
+prediction_scheduler = PredictionScheduler(compute_prediction, prediction_cache,
+                                           lock_path=os.path.join("data", "scheduler.lock"))
+
+def warm_symbol(symbol: str):
+    """
+    Load a symbol's data and model and run a dummy forward pass so the first
+    real request does not pay for the fetch, the model load or graph tracing
+    
+    Returns:
+        Seconds spent in each step
+    """
+    steps = {}
+    began = time.perf_counter()
+    stock_predictor.load_data(symbol)
+    steps['data'] = time.perf_counter() - began
+    
+    began = time.perf_counter()
+    if fused_predictor.has_model(symbol):
+        model = fused_predictor.get_model(symbol)
+    else:
+        model = inference_sessions.get(symbol).price_model
+    steps['model_load'] = time.perf_counter() - began
+    
+    began = time.perf_counter()
+    # Each model is warmed with a window of its own length, which predates any newer registered look_back
+    dummy = np.zeros((1, window_length(model), stock_predictor.n_features), dtype=np.float32)
+    forward(model, dummy)
+    steps['forward'] = time.perf_counter() - began
+    return steps
+
+def warm_trend_model():
+    """Trace the shared trend model with a dummy forward pass"""
+    dummy = np.zeros((1, window_length(stock_trend_predictor.model), stock_trend_predictor.n_features),
+                     dtype=np.float32)
+    forward(stock_trend_predictor.model, dummy)
+
+warmup = Warmup(warm_symbol, warm_shared=warm_trend_model)
+
+@app.on_event("startup")
+def start_prediction_scheduler():
+    warmup.start()
+    prediction_scheduler.start()
+
+@app.on_event("shutdown")
+def stop_prediction_scheduler():
+    prediction_scheduler.stop()
+    training_pool.shutdown()
+    if prediction_journal is not None:
+        prediction_journal.close()
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness endpoint: 200 once warmup has finished, 503 while it is running
+    
+    Returns:
+        Warmup progress with per-symbol timings
+    """
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=warmup.status())
+
+@app.post("/warm")
+def warm(warm_request: WarmRequest):
+    """
+    Warm symbols in the background, e.g. ones this node took over in a cluster
+    
+    Args:
+        warm_request: Symbols to load data and models for
+        
+    Returns:
+        The accepted symbols; progress is reported by /ready
+    """
+    symbols = [symbol.strip().upper() for symbol in warm_request.symbols if symbol.strip()]
+    if symbols:
+        threading.Thread(target=warmup.run, args=(symbols,), name="warmup-takeover", daemon=True).start()
+    return {"status": "accepted", "symbols": symbols}
+
 @app.post("/predict-stock")
 def predict_stock(stock_request: StockRequest):
     """
     Get the predicted stock price and trend for a specific symbol
     
+    Predictions for the current bar are served from the prediction cache,
+    which the scheduler keeps warm for the hot symbols. Cache misses go
+    through the predict lane, or the training lane when the symbol has no
+    model yet and one will be trained first.
+    
     Args:
         stock_request: StockRequest object containing symbol
         
@@ -73,44 +316,152 @@ def predict_stock(stock_request: StockRequest):
         Predicted stock price information with historical data and trend prediction
     """
     try:
-        # Load historical data
-        df = stock_predictor.load_data(stock_request.symbol)
+        began = time.perf_counter()
+        symbol = stock_request.symbol
+        version = model_version(symbol)
+        # A prediction from an earlier bar is a miss once the series has a newer one
+        last_bar = stock_predictor.series_store.last_timestamp(symbol, '5min')
+        cached = prediction_cache.get(symbol, version, format_timestamp(last_bar) if last_bar is not None else None)
+        if cached is not None:
+            if prediction_journal is not None:
+                prediction_journal.record_response(cached, version, (time.perf_counter() - began) * 1000, cached=True)
+            return cached
         
-        # Train or load model if not exists
-        try:
-            stock_predictor.load_model(stock_request.symbol)
-        except:
-            # Train new model if it doesn't exist
-            stock_predictor.train_model(df, epochs=50)
-            stock_predictor.save_model(stock_request.symbol)
-        
-        # Get last 30 days of data for visualization
-        last_30_days = df.tail(30)
-        
-        # Predict price
-        price_result = stock_predictor.predict(stock_request.symbol)
-        
-        # Predict trend
-        trend_result = stock_trend_predictor.predict_trend(df)
+        lane = "predict" if version != "untrained" else "training"
+        with admission.admit(lane):
+            bar_timestamp, version, result = compute_prediction(symbol)
+        prediction_cache.put(symbol, bar_timestamp, version, result)
+        if prediction_journal is not None:
+            prediction_journal.record_response(result, version, (time.perf_counter() - began) * 1000)
+        return result
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/inference-metrics")
+def inference_metrics():
+    """
+    Report how concurrent forward passes are being batched and, with
+    STREAMING_INFERENCE=1, how often price models were stepped incrementally
+    
+    Returns:
+        Queue depth, batch counts and sizes, the latency added by waiting for
+        a batch, and full recomputes and incremental steps per streamed symbol
+    """
+    metrics = inference_batcher.metrics()
+    metrics["streaming"] = inference_sessions.streaming_metrics()
+    return metrics
+
+@app.get("/drift-metrics")
+def drift_metrics():
+    """
+    Report how served price predictions compare with the closes that followed
+    
+    Returns:
+        Rolling mean absolute percentage error, directional accuracy and
+        retraining state per symbol
+    """
+    return drift_monitor.metrics()
+
+@app.get("/prediction-journal")
+def prediction_journal_summary(symbols: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None):
+    """
+    Summarize the served predictions journaled for bars in [start, end)
+    
+    Args:
+        symbols: Optional comma-separated symbols (default: every journaled symbol)
+        start: Optional first bar time, e.g. 2026-01-02 or 2026-01-02T09:30
+        end: Optional bar time to stop before
         
-        # Prepare response with historical data
+    Returns:
+        Per symbol: prediction count, cache share, latency percentiles,
+        trend mix, and error and hit rate against the closes that followed
+    """
+    if prediction_journal is None:
+        raise HTTPException(status_code=404, detail="The prediction journal is turned off (PREDICTION_JOURNAL=0)")
+    try:
         return {
-            "symbol": stock_request.symbol,
-            "predicted_price": price_result["predicted_price"],
-            "prediction_date": price_result["prediction_date"],
-            "trend_prediction": trend_result["trend"],
-            "confidence": trend_result["confidence"],
-            "historical_dates": last_30_days.index.strftime("%Y-%m-%d %H:%M:%S").tolist(),
-            "historical_prices": last_30_days["Close"].tolist()
+            "journal": prediction_journal.metrics(),
+            "symbols": prediction_journal.aggregate(symbols.split(',') if symbols else None, start, end,
+                                                    stock_predictor.series_store, '5min')
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/admission-metrics")
+def admission_metrics():
+    """
+    Report the load on each admission lane
+    
+    Returns:
+        Active and queued requests, rejections and service time per lane
+    """
+    return admission.metrics()
+
+@app.get("/data-freshness")
+def data_freshness(symbols: Optional[str] = None):
+    """
+    Report how far behind the local series store is for each symbol
+    
+    Args:
+        symbols: Optional comma-separated symbols (default: every stored symbol)
+        
+    Returns:
+        Newest stored 5-minute bar and freshness lag in seconds per symbol
+    """
+    try:
+        return stock_predictor.series_store.freshness('5min', symbols.split(',') if symbols else None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/bars")
+def bars(symbol: str, interval: str = '5min', limit: int = 500):
+    """
+    Latest OHLCV bars of a symbol
+    
+    Intervals above 5 minutes are resampled from the stored 5-minute series
+    rather than fetched, so they match the bars the models predict from.
+    
+    Args:
+        symbol: Stock symbol
+        interval: '5min', '15min', '30min', '60min' or '1D'
+        limit: Number of most recent bars to return
+    
+    Returns:
+        Bar timestamps and their open, high, low, close and volume
+    """
+    if interval not in ('5min', '15min', '30min', '60min', '1D'):
+        raise HTTPException(status_code=400, detail=f"Unsupported interval {interval}")
+    symbol = symbol.upper()
+    try:
+        # Only a refetch from Alpha Vantage goes through the upstream lane
+        if stock_predictor.needs_fetch(symbol):
+            with admission.admit("upstream"):
+                df = stock_predictor.load_data(symbol, interval).tail(limit)
+        else:
+            df = stock_predictor.load_data(symbol, interval).tail(limit)
+        result = {"symbol": symbol, "interval": interval,
+                  "timestamps": df.index.strftime("%Y-%m-%d %H:%M:%S").tolist()}
+        for column in df.columns:
+            result[column.lower()] = df[column].tolist()
+        return result
+    except AdmissionRejected:
+        raise
+    except ValueError as e:
+        # No bars stored, or none upstream, for the symbol
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/search-company")
 def search_company(query: str):
     """
     Search for company information using a search query
     
+    Answered from the local symbol index; Alpha Vantage is only queried
+    when the index has no match.
+    
     Args:
         query: Search term to look for company names or symbols
         
@@ -118,6 +469,11 @@ def search_company(query: str):
         List of matching companies with their symbols and names
     """
     try:
+        symbol_index.refresh_if_stale()
+        results = symbol_index.search(query)
+        if results:
+            return results
+        
         url = 'https://www.alphavantage.co/query'
         params = {
             'function': 'SYMBOL_SEARCH',
@@ -125,7 +481,8 @@ def search_company(query: str):
             'apikey': os.getenv('ALPHA_VANTAGE_API_KEY')
         }
         
-        response = requests.get(url, params=params)
+        with admission.admit("upstream"):
+            response = requests.get(url, params=params)
         response.raise_for_status()
         data = response.json()
         
@@ -141,9 +498,12 @@ def search_company(query: str):
                 'region': match['4. region'],
                 'matchScore': match['9. matchScore']
             })
-            
+        
+        symbol_index.add(results)
         return results
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -159,37 +519,122 @@ def add_company(company_info: CompanyInfo):
         Status of the operation
     """
     try:
-        # Load data for the new company
-        df = stock_predictor.load_data(company_info.symbol)
-        
-        # Train model for the new company
-        stock_trainer.train_model(company_info.symbol, epochs=50)
-        
-        # Train trend prediction model
-        stock_trend_predictor.train_model(df, epochs=50)
-        
-        return {
-            "status": "success",
-            "message": f"Company {company_info.name} added successfully",
-            "symbol": company_info.symbol
-        }
+        with admission.admit("training"):
+            # Load data for the new company
+            df = stock_predictor.load_data(company_info.symbol)
+            
+            if use_fused:
+                # One per-symbol model covers price and trend; the shared trend model is untouched
+                training_pool.run(train_fused_model, company_info.symbol, df, 50, multivariate)
+                fused_predictor.invalidate(company_info.symbol)
+                prediction_cache.invalidate(company_info.symbol)
+                return {
+                    "status": "success",
+                    "message": f"Company {company_info.name} added successfully",
+                    "symbol": company_info.symbol
+                }
+            
+            # Train model for the new company
+            training_pool.run(train_price_model, company_info.symbol, 50, multivariate)
+            
+            # Train trend prediction model
+            with training_lock:
+                weights = training_pool.run(train_trend_weights, stock_trend_predictor.model.get_weights(),
+                                            df, 50, multivariate)
+                stock_trend_predictor.set_weights(weights)
+            
+            # The shared trend model changed, so every cached prediction is stale
+            prediction_cache.invalidate()
+            
+            return {
+                "status": "success",
+                "message": f"Company {company_info.name} added successfully",
+                "symbol": company_info.symbol
+            }
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/train-model")
-def train_model(symbol: str, epochs: int = 50):
+def train_model(symbol: str, epochs: int = 50, fused: bool = use_fused):
     """
     Train a new model for a specific stock symbol
     
     Args:
         symbol: Stock symbol to train
         epochs: Number of training epochs (default: 50)
+        fused: Train a fused price+trend model on intraday data instead
+            (default: FUSED_MODELS setting)
         
     Returns:
         Training status and model details
     """
     try:
-        result = stock_trainer.train_model(symbol, epochs)
+        with admission.admit("training"):
+            if fused:
+                result = training_pool.run(train_fused_model, symbol, stock_predictor.load_data(symbol),
+                                           epochs, multivariate)
+                fused_predictor.invalidate(symbol)
+            else:
+                result = training_pool.run(train_price_model, symbol, epochs, multivariate)
+            prediction_cache.invalidate(symbol)
+            return result
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/export-tflite")
+def export_tflite(symbol: str, quantization: str = "float16", max_error: float = 0.01, select: bool = True):
+    """
+    Export a symbol's price model as a quantized TFLite artifact
+    
+    The artifact is checked against the float model on the latest windows
+    of the symbol's intraday series and rejected if any output differs by
+    more than max_error (in the model's [0, 1] output scale).
+    
+    Args:
+        symbol: Stock symbol whose model to export
+        quantization: 'float16' or 'int8' (int8 weights, dynamic-range activations)
+        max_error: Largest absolute error allowed on the holdout windows
+        select: Serve the artifact if it passes
+        
+    Returns:
+        Parity report, including the artifact size
+    """
+    try:
+        with admission.admit("training"):
+            filename = f"{symbol}_model.h5"
+            df = stock_predictor.load_data(symbol)
+            values = compute_features(df).dropna().values if multivariate else df['Close'].values
+            model = model_manager.load_model(filename)
+            holdout = holdout_windows(values, window_length(model))
+            report = model_manager.export_tflite(model, filename, quantization, holdout, max_error)
+            if report["passed"] and select:
+                model_manager.set_backend(filename, f"tflite-{quantization}")
+                prediction_cache.invalidate(symbol)
+            return report
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/model-backend")
+def model_backend(symbol: str, backend: str):
+    """
+    Choose the backend that serves a symbol's price model
+    
+    Args:
+        symbol: Stock symbol
+        backend: 'auto', 'keras', 'shared', 'tflite-float16' or 'tflite-int8'
+        
+    Returns:
+        The selected backend
+    """
+    try:
+        result = model_manager.set_backend(f"{symbol}_model.h5", backend)
+        prediction_cache.invalidate(symbol)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,21 +1,71 @@
+import json
 import os
+import threading
 import tensorflow as tf
 
+from shared_model import SharedModel, export_shared
+from tflite_backend import QUANTIZATIONS, TFLiteModel, check_parity, convert_to_tflite, tflite_path
+
+# 'auto' serves the shared export when there is one, else the Keras model
+BACKENDS = ('auto', 'keras', 'shared') + tuple(f'tflite-{q}' for q in QUANTIZATIONS)
+
+# Architectures used until a sweep promotes another (see hyperparameter_sweep.py).
+# look_back is shared, since the price and trend models read the same window.
+DEFAULT_LOOK_BACK = 60
+DEFAULT_ARCHITECTURES = {
+    'price': {'units': 50, 'layers': 2, 'dropout': 0.0},
+    'trend': {'units': 50, 'layers': 3, 'dropout': 0.2}
+}
+
+def build_lstm(look_back, n_features, units, layers, dropout, **_):
+    """
+    Stacked LSTM regressor: layers LSTM(units), each followed by
+    Dropout(dropout) when dropout > 0, then Dense(1)
+
+    Extra keyword arguments (e.g. the rest of a registry entry) are ignored.
+    """
+    model = tf.keras.models.Sequential()
+    for i in range(layers):
+        if i == 0:
+            model.add(tf.keras.layers.LSTM(units, return_sequences=layers > 1, input_shape=(look_back, n_features)))
+        else:
+            model.add(tf.keras.layers.LSTM(units, return_sequences=i < layers - 1))
+        if dropout:
+            model.add(tf.keras.layers.Dropout(dropout))
+    model.add(tf.keras.layers.Dense(1))
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
 class ModelManager:
     def __init__(self, model_dir):
         self.model_dir = model_dir
         os.makedirs(self.model_dir, exist_ok=True)
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._backends_path = os.path.join(self.model_dir, 'backends.json')
+        self._backends = (None, {})
+        self._architectures_path = os.path.join(self.model_dir, 'architectures.json')
 
     def save_model(self, model, filename):
         """
         Save a TensorFlow model to disk
         
+        Sequential LSTM models are also exported as memory-mappable weights
+        that worker processes can share (see load_shared_model). The .h5
+        file, whose modification time is the model version, is replaced
+        last, so a process that sees the new version also finds the new
+        shared weights.
+        
         Args:
             model: TensorFlow model to save
             filename: Name of the file to save the model
         """
         model_path = os.path.join(self.model_dir, filename)
-        model.save(model_path)
+        export_shared(model, model_path)
+        # Keras picks the format from the extension, so the temporary file keeps .h5
+        tmp_path = f"{model_path}.{os.getpid()}.tmp.h5"
+        model.save(tmp_path)
+        os.replace(tmp_path, model_path)
         return {"status": "success", "message": f"Model saved to {model_path}"}
 
     def load_model(self, filename):
@@ -34,6 +84,210 @@ class ModelManager:
         
         return tf.keras.models.load_model(model_path)
 
+    def load_shared_model(self, filename):
+        """
+        Load the memory-mapped export of a saved model
+        
+        Args:
+            filename: Name of the .h5 file the model was saved as
+            
+        Returns:
+            SharedModel, or None if the model has no shared export
+        """
+        model_path = os.path.join(self.model_dir, filename)
+        if not SharedModel.exists(model_path):
+            return None
+        return SharedModel(model_path)
+
+    def load_tflite_model(self, filename, quantization):
+        """
+        Load the quantized TFLite artifact of a saved model
+        
+        Args:
+            filename: Name of the .h5 file the model was saved as
+            quantization: 'float16' or 'int8'
+            
+        Returns:
+            TFLiteModel, or None if there is no artifact that passed its
+            parity check against the current version of the model
+        """
+        path = tflite_path(os.path.join(self.model_dir, filename), quantization)
+        if not os.path.exists(path) or not os.path.exists(path + '.json'):
+            return None
+        with open(path + '.json') as f:
+            report = json.load(f)
+        if not report.get('passed') or report.get('source_version') != self.get_model_version(filename):
+            return None
+        return TFLiteModel(path)
+
+    def export_tflite(self, model, filename, quantization, holdout, max_error=0.01):
+        """
+        Convert a saved model to a quantized TFLite artifact, gated on parity
+        
+        The artifact is run against the float model on the holdout windows
+        and only written if no output differs by more than max_error. The
+        parity report is written beside it either way.
+        
+        Args:
+            model: The Keras model saved as filename
+            filename: Name of the .h5 file the model was saved as
+            quantization: 'float16' or 'int8'
+            holdout: Scaled windows of shape (n, look_back, n_features)
+            max_error: Largest absolute error allowed in the model's output scale
+            
+        Returns:
+            Parity report with the artifact size and path
+        """
+        path = tflite_path(os.path.join(self.model_dir, filename), quantization)
+        content = convert_to_tflite(model, quantization)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(content)
+        
+        serving_function = tf.function(lambda x: model(x, training=False))
+        report = check_parity(lambda x: serving_function(x).numpy(), TFLiteModel(path + '.tmp'), holdout, max_error)
+        report.update(quantization=quantization, size=len(content), path=path,
+                      source_version=self.get_model_version(filename))
+        if report['passed']:
+            os.replace(path + '.tmp', path)
+        else:
+            os.remove(path + '.tmp')
+        with open(path + '.json', 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def get_backend(self, filename):
+        """Serving backend selected for a model (see BACKENDS), 'auto' unless set"""
+        try:
+            mtime = os.stat(self._backends_path).st_mtime_ns
+        except FileNotFoundError:
+            return 'auto'
+        if self._backends[0] != mtime:
+            with open(self._backends_path) as f:
+                self._backends = (mtime, json.load(f))
+        return self._backends[1].get(filename, 'auto')
+
+    def set_backend(self, filename, backend):
+        """
+        Select the serving backend for a model
+        
+        Args:
+            filename: Name of the .h5 file the model was saved as
+            backend: One of BACKENDS; a TFLite backend must have an artifact
+                that passed its parity check
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend}, expected one of {BACKENDS}")
+        if backend.startswith('tflite-') and self.load_tflite_model(filename, backend[len('tflite-'):]) is None:
+            raise FileNotFoundError(f"No TFLite artifact that passed its parity check for {filename}")
+        with self._cache_lock:
+            self.get_backend(filename)
+            backends = dict(self._backends[1], **{filename: backend})
+            with open(self._backends_path + '.tmp', 'w') as f:
+                json.dump(backends, f, indent=2)
+            os.replace(self._backends_path + '.tmp', self._backends_path)
+        return {"status": "success", "model": filename, "backend": backend}
+
+    def get_architecture(self, kind):
+        """
+        Architecture new models of a kind are built with
+        
+        Args:
+            kind: 'price' or 'trend'
+            
+        Returns:
+            Dictionary with look_back, units, layers and dropout, plus the
+            sweep it was promoted from if any
+        """
+        if kind not in DEFAULT_ARCHITECTURES:
+            raise ValueError(f"Unknown model kind {kind}, expected one of {tuple(DEFAULT_ARCHITECTURES)}")
+        registry = {}
+        if os.path.exists(self._architectures_path):
+            with open(self._architectures_path) as f:
+                registry = json.load(f)
+        return dict(DEFAULT_ARCHITECTURES[kind], look_back=registry.get('look_back', DEFAULT_LOOK_BACK),
+                    **registry.get(kind, {}))
+        
+    def set_architecture(self, kind, look_back, units, layers, dropout, source=None):
+        """
+        Promote an architecture for a kind of model
+        
+        Only models built afterwards use it; models already saved keep theirs
+        until they are retrained. A new look_back applies to every kind.
+        
+        Args:
+            kind: 'price' or 'trend'
+            look_back: Number of time steps per window
+            units: LSTM units per layer
+            layers: Number of stacked LSTM layers
+            dropout: Dropout rate after each LSTM layer (0 for none)
+            source: Optional description of where the architecture came from
+        """
+        if kind not in DEFAULT_ARCHITECTURES:
+            raise ValueError(f"Unknown model kind {kind}, expected one of {tuple(DEFAULT_ARCHITECTURES)}")
+        with self._cache_lock:
+            registry = {}
+            if os.path.exists(self._architectures_path):
+                with open(self._architectures_path) as f:
+                    registry = json.load(f)
+            registry['look_back'] = int(look_back)
+            registry[kind] = {'units': int(units), 'layers': int(layers), 'dropout': float(dropout)}
+            if source is not None:
+                registry[kind]['source'] = source
+            with open(self._architectures_path + '.tmp', 'w') as f:
+                json.dump(registry, f, indent=2)
+            os.replace(self._architectures_path + '.tmp', self._architectures_path)
+        return {"status": "success", "kind": kind, "architecture": self.get_architecture(kind)}
+
+    def get_model(self, filename):
+        """
+        Get a model for serving, loading it only when it is not cached or
+        the file on disk or its selected backend has changed since it was cached
+        
+        Args:
+            filename: Name of the .h5 file the model was saved as
+            
+        Returns:
+            The model in its selected backend: a TFLiteModel, a SharedModel
+            or the Keras model. 'auto' serves the shared export if the model
+            has one, and a TFLite backend whose artifact is missing or stale
+            falls back to 'auto'.
+            
+        Raises:
+            FileNotFoundError: If the model file doesn't exist
+        """
+        version = self.get_model_version(filename)
+        backend = self.get_backend(filename)
+        with self._cache_lock:
+            cached = self._cache.get(filename)
+        if cached is not None and cached[0] == (version, backend):
+            return cached[1]
+        
+        model = None
+        if backend.startswith('tflite-'):
+            model = self.load_tflite_model(filename, backend[len('tflite-'):])
+        elif backend == 'keras':
+            model = self.load_model(filename)
+        model = model or self.load_shared_model(filename) or self.load_model(filename)
+        with self._cache_lock:
+            self._cache[filename] = ((version, backend), model)
+        return model
+
+    def get_model_version(self, filename):
+        """
+        Get a version tag for a saved model
+        
+        Args:
+            filename: Name of the model file
+            
+        Returns:
+            Modification time of the file in nanoseconds as a string,
+            or "untrained" if the file does not exist
+        """
+        model_path = os.path.join(self.model_dir, filename)
+        if not os.path.exists(model_path):
+            return "untrained"
+        return str(os.stat(model_path).st_mtime_ns)
+
     def list_models(self):
         """
         List all available models in the model directory
@@ -41,7 +295,7 @@ class ModelManager:
         Returns:
             List of model filenames
         """
-        return [f for f in os.listdir(self.model_dir) if f.endswith('.h5')]
+        return [f for f in os.listdir(self.model_dir) if f.endswith('.h5') and not f.endswith('.tmp.h5')]
 
     def delete_model(self, filename):
         """
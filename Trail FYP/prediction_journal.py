@@ -0,0 +1,393 @@
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# One raw little-endian file per column. Timestamps follow the series store:
+# bar_timestamp is the bar start in seconds on the exchange's wall clock.
+JOURNAL_COLUMNS = {
+    'served_at': np.dtype('<f8'),        # Unix time the prediction was served
+    'symbol': np.dtype('<u4'),           # Line of the symbol in the segment's symbols.txt
+    'bar_timestamp': np.dtype('<i8'),    # Bar the prediction was made from
+    'model_version': np.dtype('<i8'),    # ModelManager.get_model_version, -1 if not numeric
+    'predicted_price': np.dtype('<f4'),  # Predicted close of the next bar
+    'last_close': np.dtype('<f4'),       # Close of the bar the prediction was made from
+    'rise': np.dtype('u1'),              # Trend prediction, 1 for rise
+    'confidence': np.dtype('<f4'),
+    'latency_ms': np.dtype('<f4'),
+    'cached': np.dtype('u1')             # Served from the prediction cache
+}
+
+def _format(bar_timestamp: int, layout: str = "%Y-%m-%d %H:%M:%S") -> str:
+    return (datetime(1970, 1, 1) + timedelta(seconds=int(bar_timestamp))).strftime(layout)
+
+def _day(bar_timestamp: int) -> str:
+    """Partition (day directory) of a bar"""
+    return _format(bar_timestamp, "%Y-%m-%d")
+
+def _seconds(value) -> Optional[int]:
+    """A date, datetime or string as seconds since the epoch, like bar timestamps"""
+    if value is None:
+        return None
+    return int(pd.Timestamp(value).value // 1_000_000_000)
+
+def _read_symbols(segment: str) -> List[str]:
+    path = os.path.join(segment, 'symbols.txt')
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return f.read().split()
+
+class PredictionJournal:
+    """
+    Append-only columnar journal of served predictions
+
+    Rows are partitioned by the day of their bar. Each writing process has
+    its own segment in a day, a directory holding one raw file per column,
+    so uvicorn workers never interleave writes. Symbols are dictionary
+    encoded: the symbol column holds line numbers into the segment's
+    symbols.txt, so grouping by symbol is integer work. A query maps only
+    the columns it needs and only the days in its range.
+
+    record() only appends to an in-memory buffer. A background thread writes
+    the buffer out every ``flush_interval`` seconds, or sooner once
+    ``batch_size`` rows are waiting. If more than ``max_pending`` rows are
+    waiting, e.g. because the disk stalls, new rows are dropped and counted
+    rather than holding up requests. A segment whose columns were left at
+    different lengths by a crash is truncated to its complete rows.
+
+    Args:
+        journal_dir: Directory the journal is kept in
+        flush_interval: Seconds between background writes
+        batch_size: Waiting rows that trigger an early write
+        max_pending: Largest number of rows kept waiting
+    """
+
+    def __init__(self, journal_dir: str = os.path.join('data', 'journal'), flush_interval: float = 1.0,
+                 batch_size: int = 4096, max_pending: int = 200_000):
+        self.journal_dir = journal_dir
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.writer = f"{socket.gethostname()}-{os.getpid()}"
+        self.written = 0
+        self.dropped = 0
+        self._pending: List[tuple] = []
+        # Segment path -> symbol -> code, for the segments this process writes
+        self._segments: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker = None
+        os.makedirs(journal_dir, exist_ok=True)
+
+    def record(self, symbol: str, bar_timestamp: int, model_version: str, predicted_price: float,
+               last_close: float, trend: str, confidence: float, latency_ms: float, cached: bool = False):
+        """
+        Queue one served prediction for the journal
+
+        Args:
+            symbol: Stock symbol
+            bar_timestamp: Bar the prediction was made from, seconds since the epoch
+            model_version: Version of the model that made the prediction
+            predicted_price: Predicted close of the next bar
+            last_close: Close of the bar the prediction was made from
+            trend: 'rise' or 'fall'
+            confidence: Trend confidence in percent
+            latency_ms: Time taken to serve the request
+            cached: Whether the prediction came from the prediction cache
+        """
+        row = (time.time(), symbol, int(bar_timestamp), int(model_version) if str(model_version).isdigit() else -1,
+               predicted_price, last_close, trend == 'rise', confidence, latency_ms, cached)
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append(row)
+            waiting = len(self._pending)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="prediction-journal", daemon=True)
+                self._worker.start()
+        if waiting >= self.batch_size:
+            self._wake.set()
+
+    def record_response(self, response: dict, model_version: str, latency_ms: float, cached: bool = False):
+        """Queue a /predict-stock response; its last historical bar is the one predicted from"""
+        self.record(response['symbol'], _seconds(response['historical_dates'][-1]), model_version,
+                    response['predicted_price'], response['historical_prices'][-1], response['trend_prediction'],
+                    response['confidence'], latency_ms, cached)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("Could not write the prediction journal: %s", e)
+                # Re-check the segments' column lengths before the next write
+                self._segments.clear()
+            except Exception:
+                # E.g. a row that does not convert to the column types; keep the writer alive
+                logger.exception("Dropped a prediction journal batch that could not be written")
+                self._segments.clear()
+
+    def flush(self) -> int:
+        """
+        Write the waiting rows out now; returns how many were written
+
+        Rows of a batch that fails to write are counted as dropped.
+        """
+        with self._write_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+            except Exception:
+                with self._lock:
+                    self.dropped += len(rows)
+                raise
+            self.written += len(rows)
+            return len(rows)
+
+    def _write(self, rows: List[tuple]):
+        fields = list(zip(*rows))
+        symbols = np.array(fields[1], dtype=object)
+        columns = {name: np.array(values, dtype=dtype)
+                   for (name, dtype), values in zip(JOURNAL_COLUMNS.items(), fields) if name != 'symbol'}
+        day_numbers = columns['bar_timestamp'] // 86400
+        for day_number in np.unique(day_numbers):
+            mask = day_numbers == day_number
+            self._append(_day(day_number * 86400), symbols[mask],
+                         {name: values[mask] for name, values in columns.items()})
+
+    def _segment(self, day: str) -> str:
+        path = os.path.join(self.journal_dir, day, self.writer)
+        if path not in self._segments:
+            os.makedirs(path, exist_ok=True)
+            rows = self._complete_rows(path)
+            for name, dtype in JOURNAL_COLUMNS.items():
+                column_path = os.path.join(path, f"{name}.bin")
+                if os.path.exists(column_path) and os.path.getsize(column_path) != rows * dtype.itemsize:
+                    os.truncate(column_path, rows * dtype.itemsize)
+            self._segments[path] = {symbol: code for code, symbol in enumerate(_read_symbols(path))}
+        return path
+
+    def _append(self, day: str, symbols: np.ndarray, columns: Dict[str, np.ndarray]):
+        path = self._segment(day)
+        dictionary = self._segments[path]
+        new = [symbol for symbol in dict.fromkeys(symbols) if symbol not in dictionary]
+        if new:
+            # The dictionary is written before any row that refers to it
+            with open(os.path.join(path, 'symbols.txt'), 'a') as f:
+                f.write(''.join(f"{symbol}\n" for symbol in new))
+            for symbol in new:
+                dictionary[symbol] = len(dictionary)
+        columns['symbol'] = np.array([dictionary[symbol] for symbol in symbols], dtype=JOURNAL_COLUMNS['symbol'])
+        for name, values in columns.items():
+            with open(os.path.join(path, f"{name}.bin"), 'ab') as f:
+                f.write(np.ascontiguousarray(values).tobytes())
+
+    @staticmethod
+    def _complete_rows(segment: str) -> int:
+        """Rows present in every column of a segment"""
+        sizes = []
+        for name, dtype in JOURNAL_COLUMNS.items():
+            path = os.path.join(segment, f"{name}.bin")
+            sizes.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        return min(sizes)
+
+    def close(self):
+        """Stop the background writer and write out the waiting rows"""
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+        self.flush()
+
+    def _read(self, symbols: Optional[List[str]], start, end, columns: List[str]):
+        """
+        Rows in range with symbols coded against one sorted symbol list
+
+        Returns:
+            Tuple of (sorted symbol names, dictionary of column name to array)
+        """
+        start, end = _seconds(start), _seconds(end)
+        needed = list(dict.fromkeys(columns + ['symbol', 'bar_timestamp']))
+        first_day = _day(start) if start is not None else None
+        last_day = _day(end) if end is not None else None
+
+        segments = []
+        for day in sorted(os.listdir(self.journal_dir)):
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            day_dir = os.path.join(self.journal_dir, day)
+            for writer in sorted(os.listdir(day_dir)):
+                segment = os.path.join(day_dir, writer)
+                rows = self._complete_rows(segment)
+                if rows:
+                    segments.append((segment, rows, _read_symbols(segment)))
+        names = np.array(sorted({symbol for _, _, dictionary in segments for symbol in dictionary}), dtype=str)
+
+        parts = {name: [] for name in needed}
+        for segment, rows, dictionary in segments:
+            for name in needed:
+                values = np.memmap(os.path.join(segment, f"{name}.bin"), dtype=JOURNAL_COLUMNS[name], mode='r',
+                                   shape=(rows,))
+                if name == 'symbol':
+                    # Segment codes to positions in the sorted names
+                    values = np.searchsorted(names, dictionary).astype(np.int64)[values]
+                parts[name].append(values)
+        result = {name: np.concatenate(parts[name]) if parts[name] else
+                  np.empty(0, dtype=np.int64 if name == 'symbol' else JOURNAL_COLUMNS[name]) for name in needed}
+
+        mask = np.ones(len(result['bar_timestamp']), dtype=bool)
+        if start is not None:
+            mask &= result['bar_timestamp'] >= start
+        if end is not None:
+            mask &= result['bar_timestamp'] < end
+        if symbols:
+            selected = np.isin(names, symbols)
+            mask &= selected[result['symbol']]
+        if not mask.all():
+            result = {name: values[mask] for name, values in result.items()}
+        return names, result
+
+    def query(self, symbols: Optional[List[str]] = None, start=None, end=None,
+              columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Journal rows for symbols with bars in [start, end)
+
+        Only the days in range are visited and only the requested columns
+        (plus those needed to filter) are mapped. Rows still waiting to be
+        written are not included.
+
+        Args:
+            symbols: Symbols to select (default: all)
+            start: First bar time, e.g. '2026-01-02' or '2026-01-02 09:30' (default: unbounded)
+            end: Bar time to stop before (default: unbounded)
+            columns: Columns to return (default: all, see JOURNAL_COLUMNS)
+
+        Returns:
+            Dictionary of column name to array, rows in write order per
+            segment; the symbol column holds the symbols as strings
+        """
+        columns = list(columns or JOURNAL_COLUMNS)
+        names, result = self._read(symbols, start, end, columns)
+        if 'symbol' in columns:
+            result['symbol'] = names[result['symbol']]
+        return {name: result[name] for name in columns}
+
+    def aggregate(self, symbols: Optional[List[str]] = None, start=None, end=None, series_store=None,
+                  interval: str = '5min') -> Dict[str, dict]:
+        """
+        Per-symbol summary of the predictions served with bars in [start, end)
+
+        With a series store, each prediction is also scored against the close
+        of the bar after its own, giving the error and directional hit rate
+        without re-running any model. Predictions whose next bar is not
+        stored yet are left unscored.
+
+        Args:
+            symbols: Symbols to summarize (default: all)
+            start: First bar time (default: unbounded)
+            end: Bar time to stop before (default: unbounded)
+            series_store: Optional SeriesStore to score predictions against
+            interval: Series interval the predictions were made on
+
+        Returns:
+            Dictionary of symbol to prediction count, cache share, model
+            versions, latency percentiles, mean confidence, rise share and
+            bar range, plus scored count, mean absolute percentage error and
+            hit rate with a series store
+        """
+        names, rows = self._read(symbols, start, end, list(JOURNAL_COLUMNS))
+        if not len(rows['symbol']):
+            return {}
+        # Drop the symbols with no rows in range so every group is non-empty
+        present = np.bincount(rows['symbol'], minlength=len(names)) > 0
+        names, inverse = names[present], (np.cumsum(present) - 1)[rows['symbol']]
+
+        counts = np.bincount(inverse)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        # Latencies sorted within each symbol through one int64 key of symbol
+        # and latency bits (non-negative float32 bit patterns order like the
+        # floats), decoded back from the sorted keys
+        latency_bits = np.maximum(rows['latency_ms'], 0).astype(np.float32).view(np.uint32)
+        latency = (np.sort((inverse << 32) | latency_bits) & 0xFFFFFFFF).astype(np.uint32).view(np.float32)
+        # Rows ordered by symbol, then bar, the same way
+        bar_offsets = rows['bar_timestamp'] - rows['bar_timestamp'].min()
+        order = np.argsort((inverse << 32) | bar_offsets)
+        bars = rows['bar_timestamp'][order]
+
+        def per_symbol_mean(values):
+            return np.bincount(inverse, weights=values, minlength=len(names)) / counts
+
+        def percentile(q):
+            return latency[starts + np.floor(q * (counts - 1)).astype(np.int64)]
+
+        # Distinct (symbol, version) pairs, counted per symbol
+        version_names = np.unique(rows['model_version'])
+        pairs = np.unique(inverse * len(version_names) + np.searchsorted(version_names, rows['model_version']))
+        summary = {
+            'predictions': counts,
+            'cached_share': per_symbol_mean(rows['cached']),
+            'model_versions': np.bincount(pairs // len(version_names), minlength=len(names)),
+            'latency_ms_mean': per_symbol_mean(rows['latency_ms']),
+            'latency_ms_p50': percentile(0.5),
+            'latency_ms_p95': percentile(0.95),
+            'latency_ms_p99': percentile(0.99),
+            'mean_confidence': per_symbol_mean(rows['confidence']),
+            'rise_share': per_symbol_mean(rows['rise'])
+        }
+        first_bar = bars[starts]
+        last_bar = bars[starts + counts - 1]
+
+        result = {}
+        for i, symbol in enumerate(names.tolist()):
+            entry = {key: values[i].item() for key, values in summary.items()}
+            entry['first_bar'] = _format(first_bar[i])
+            entry['last_bar'] = _format(last_bar[i])
+            if series_store is not None:
+                rows_of_symbol = order[starts[i]:starts[i] + counts[i]]
+                entry.update(self._score(series_store, symbol, interval, bars[starts[i]:starts[i] + counts[i]],
+                                         rows['predicted_price'][rows_of_symbol], rows['last_close'][rows_of_symbol]))
+            result[symbol] = entry
+        return result
+
+    @staticmethod
+    def _score(series_store, symbol: str, interval: str, bar_timestamps: np.ndarray, predicted: np.ndarray,
+               last_close: np.ndarray) -> dict:
+        bars = series_store.read(symbol, interval)
+        if bars is None:
+            return {'scored': 0, 'mean_abs_pct_error': None, 'hit_rate': None}
+        timestamps = bars['timestamp']
+        following = np.searchsorted(timestamps, bar_timestamps, side='right')
+        valid = (following > 0) & (following < len(timestamps))
+        valid[valid] &= timestamps[following[valid] - 1] == bar_timestamps[valid]
+        if not valid.any():
+            return {'scored': 0, 'mean_abs_pct_error': None, 'hit_rate': None}
+        actual = bars['close'][following[valid]].astype(np.float64)
+        predicted = predicted[valid].astype(np.float64)
+        last_close = last_close[valid].astype(np.float64)
+        return {
+            'scored': int(valid.sum()),
+            'mean_abs_pct_error': float(np.mean(np.abs(predicted - actual) / actual)),
+            'hit_rate': float(np.mean((predicted > last_close) == (actual > last_close)))
+        }
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {'pending': len(self._pending), 'written': self.written, 'dropped': self.dropped,
+                    'writer': self.writer}
@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from series_store import in_session, market_now
+
+logger = logging.getLogger(__name__)
+
+# No symbols are precomputed unless HOT_SYMBOLS names them: each hot symbol
+# costs a series refresh per bar and, without a model, a training run
+DEFAULT_HOT_SYMBOLS = ""
+
+def next_bar_close(interval: int, now: Optional[float] = None) -> float:
+    """Epoch time at which the bar currently in progress closes"""
+    now = time.time() if now is None else now
+    return (int(now) // interval + 1) * interval
+
+class PredictionCache:
+    """
+    Thread-safe cache of computed predictions keyed by
+    (symbol, bar timestamp, model version).
+
+    Each entry expires when the next bar has closed and the scheduler has had
+    ``delay`` seconds to recompute it, so a hit is never older than one bar.
+    With a ``cache_dir`` every entry is also written there as JSON, which lets
+    worker processes serve predictions computed by another worker.
+    """
+
+    def __init__(self, interval: int = 300, delay: float = 30.0, cache_dir: Optional[str] = None):
+        self.interval = interval
+        self.delay = delay
+        self.cache_dir = cache_dir
+        self._entries: Dict[Tuple[str, str, str], Tuple[float, dict]] = {}
+        self._latest: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.cache_dir, f"{symbol}.json")
+
+    def _remember(self, symbol: str, bar_timestamp: str, model_version: str, expires_at: float, result: dict):
+        with self._lock:
+            self._entries[(symbol, bar_timestamp, model_version)] = (expires_at, result)
+            previous = self._latest.get(symbol)
+            if previous is not None and previous != (bar_timestamp, model_version):
+                self._entries.pop((symbol,) + previous, None)
+            self._latest[symbol] = (bar_timestamp, model_version)
+
+    def put(self, symbol: str, bar_timestamp: str, model_version: str, result: dict):
+        expires_at = next_bar_close(self.interval) + self.delay
+        self._remember(symbol, bar_timestamp, model_version, expires_at, result)
+        if self.cache_dir:
+            tmp_path = f"{self._path(symbol)}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'bar_timestamp': bar_timestamp,
+                    'model_version': model_version,
+                    'expires_at': expires_at,
+                    'result': result
+                }, f)
+            os.replace(tmp_path, self._path(symbol))
+
+    def _load(self, symbol: str, model_version: str, bar_timestamp: Optional[str] = None) -> Optional[dict]:
+        try:
+            with open(self._path(symbol)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry['model_version'] != model_version or time.time() >= entry['expires_at']:
+            return None
+        if bar_timestamp is not None and entry['bar_timestamp'] != bar_timestamp:
+            return None
+        self._remember(symbol, entry['bar_timestamp'], model_version, entry['expires_at'], entry['result'])
+        return entry['result']
+
+    def get(self, symbol: str, model_version: str, bar_timestamp: Optional[str] = None) -> Optional[dict]:
+        """
+        Return the newest unexpired prediction for symbol made with model_version
+
+        With bar_timestamp (e.g. the series' last bar), a prediction made
+        from an earlier bar is a miss even before it expires.
+        """
+        with self._lock:
+            latest = self._latest.get(symbol)
+            if latest is not None and latest[1] == model_version:
+                expires_at, result = self._entries[(symbol,) + latest]
+                if time.time() < expires_at:
+                    return result if bar_timestamp is None or latest[0] == bar_timestamp else None
+        if self.cache_dir:
+            return self._load(symbol, model_version, bar_timestamp)
+        return None
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """Drop cached predictions for one symbol, or for every symbol"""
+        with self._lock:
+            symbols = [symbol] if symbol is not None else list(self._latest)
+            for s in symbols:
+                latest = self._latest.pop(s, None)
+                if latest is not None:
+                    self._entries.pop((s,) + latest, None)
+        if self.cache_dir:
+            if symbol is None:
+                symbols = [f[:-len('.json')] for f in os.listdir(self.cache_dir) if f.endswith('.json')]
+            for s in symbols:
+                try:
+                    os.remove(self._path(s))
+                except FileNotFoundError:
+                    pass
+
+class PredictionScheduler:
+    """
+    Background thread that recomputes predictions for a hot set of symbols
+    shortly after every bar close and stores them in a PredictionCache.
+    Outside the regular trading session no new bars close, so it idles.
+
+    Args:
+        compute: Callable that takes a symbol and returns a tuple of
+            (bar timestamp, model version, prediction result)
+        cache: Cache to fill
+        symbols: Hot symbols; defaults to the HOT_SYMBOLS environment
+            variable (comma separated), or none
+        lock_path: Optional lock file; when several worker processes share
+            a cache directory, only the one holding the lock runs the scheduler
+    """
+
+    def __init__(self, compute: Callable[[str], Tuple[str, str, dict]], cache: PredictionCache,
+                 symbols: Optional[List[str]] = None, lock_path: Optional[str] = None):
+        if symbols is None:
+            symbols = os.getenv('HOT_SYMBOLS', DEFAULT_HOT_SYMBOLS).split(',')
+        self.symbols = [s.strip().upper() for s in symbols if s.strip()]
+        self.compute = compute
+        self.cache = cache
+        self.lock_path = lock_path
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _acquire_leadership(self) -> bool:
+        if self.lock_path is None or fcntl is None:
+            return True
+        self._lock_file = open(self.lock_path, 'w')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+        return True
+
+    def start(self):
+        if self._thread is None and self.symbols and self._acquire_leadership():
+            self._thread = threading.Thread(target=self._run, name="prediction-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh(self):
+        """Recompute and cache predictions for every hot symbol once"""
+        for symbol in self.symbols:
+            if self._stop.is_set():
+                return
+            try:
+                bar_timestamp, model_version, result = self.compute(symbol)
+                self.cache.put(symbol, bar_timestamp, model_version, result)
+            except Exception as e:
+                logger.warning("Precomputing prediction for %s failed: %s", symbol, e)
+
+    def _run(self):
+        while not self._stop.is_set():
+            # The session's last bar closes one interval after the session ends
+            if in_session(market_now(), self.cache.interval + int(self.cache.delay)):
+                started = time.time()
+                self.refresh()
+                logger.info("Precomputed %d hot symbols in %.1fs", len(self.symbols), time.time() - started)
+            wake_at = next_bar_close(self.cache.interval) + self.cache.delay
+            self._stop.wait(max(0.0, wake_at - time.time()))
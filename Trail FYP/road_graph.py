@@ -0,0 +1,457 @@
+import argparse
+import heapq
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_M = 6371000.0
+HOURS_PER_WEEK = 168
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in metres; accepts scalars or arrays"""
+    lat1, lng1, lat2, lng2 = (np.radians(v) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def parse_lat_lng(text: str) -> Tuple[float, float]:
+    """
+    Parse a 'lat,lng' location
+
+    Raises:
+        ValueError: If text is not two comma-separated numbers
+    """
+    parts = text.split(',')
+    if len(parts) != 2:
+        raise ValueError(f"Expected a 'lat,lng' location, got {text!r}")
+    return float(parts[0]), float(parts[1])
+
+def hour_of_week(when: datetime) -> int:
+    return when.weekday() * 24 + when.hour
+
+def congestion_factors(predictions: np.ndarray, congestion_weight: float) -> np.ndarray:
+    """Travel-time multipliers for traffic predictions; negative predictions count as free flow"""
+    return 1 + congestion_weight * np.maximum(np.asarray(predictions, dtype=np.float32), 0)
+
+class RoadGraph:
+    """
+    Directed road graph in compressed sparse row form
+
+    The outgoing edges of node u are ``indptr[u]:indptr[u + 1]``; for each
+    edge ``targets`` holds the head node, ``length_m`` its length and
+    ``speed_kmh`` its free-flow speed. Every array is a flat NumPy array,
+    so a city graph takes tens of bytes per edge and loads from a single
+    .npz file.
+    """
+
+    def __init__(self, node_lat: np.ndarray, node_lng: np.ndarray, indptr: np.ndarray,
+                 targets: np.ndarray, length_m: np.ndarray, speed_kmh: np.ndarray):
+        self.node_lat = np.asarray(node_lat, dtype=np.float64)
+        self.node_lng = np.asarray(node_lng, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.length_m = np.asarray(length_m, dtype=np.float32)
+        self.speed_kmh = np.asarray(speed_kmh, dtype=np.float32)
+        # Free-flow seconds per edge, and each edge's tail node
+        self.free_flow_s = self.length_m / (self.speed_kmh / 3.6)
+        self.sources = np.repeat(np.arange(self.n_nodes, dtype=np.int32), np.diff(self.indptr))
+        self.max_speed_mps = float(self.speed_kmh.max()) / 3.6 if len(self.speed_kmh) else 1.0
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_lat)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.targets)
+
+    @classmethod
+    def from_edges(cls, node_lat, node_lng, sources, targets, length_m, speed_kmh) -> 'RoadGraph':
+        """Build the CSR arrays from an edge list in any order"""
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(len(node_lat) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(node_lat)), out=indptr[1:])
+        return cls(node_lat, node_lng, indptr, np.asarray(targets)[order],
+                   np.asarray(length_m)[order], np.asarray(speed_kmh)[order])
+
+    @classmethod
+    def from_csv(cls, nodes_path: str, edges_path: str, default_speed_kmh: float = 50.0) -> 'RoadGraph':
+        """
+        Build a graph from an OSM extract flattened to two CSV files
+
+        Args:
+            nodes_path: CSV with columns id, lat, lng (OSM node ids)
+            edges_path: CSV with columns from, to and optionally length_m
+                (default: straight-line length), speed_kmh (default:
+                default_speed_kmh, e.g. for ways without maxspeed) and
+                oneway (default 1; 0 adds the reverse edge)
+        """
+        nodes = pd.read_csv(nodes_path)
+        edges = pd.read_csv(edges_path)
+        index = pd.Series(np.arange(len(nodes)), index=nodes['id'].values)
+        sources = index.loc[edges['from'].values].values
+        targets = index.loc[edges['to'].values].values
+        lat, lng = nodes['lat'].values, nodes['lng'].values
+
+        if 'length_m' in edges:
+            length = edges['length_m'].values
+        else:
+            length = haversine_m(lat[sources], lng[sources], lat[targets], lng[targets])
+        speed = edges['speed_kmh'].fillna(default_speed_kmh).values if 'speed_kmh' in edges \
+            else np.full(len(edges), default_speed_kmh)
+        two_way = edges['oneway'].values == 0 if 'oneway' in edges else np.zeros(len(edges), dtype=bool)
+
+        return cls.from_edges(lat, lng,
+                              np.concatenate([sources, targets[two_way]]),
+                              np.concatenate([targets, sources[two_way]]),
+                              np.concatenate([length, length[two_way]]),
+                              np.concatenate([speed, speed[two_way]]))
+
+    @classmethod
+    def load(cls, path: str) -> 'RoadGraph':
+        with np.load(path) as data:
+            return cls(data['node_lat'], data['node_lng'], data['indptr'], data['targets'],
+                       data['length_m'], data['speed_kmh'])
+
+    def save(self, path: str):
+        np.savez(path, node_lat=self.node_lat, node_lng=self.node_lng, indptr=self.indptr,
+                 targets=self.targets, length_m=self.length_m, speed_kmh=self.speed_kmh)
+
+    def nearest_node(self, lat: float, lng: float) -> int:
+        return int(np.argmin(haversine_m(lat, lng, self.node_lat, self.node_lng)))
+
+    def edge_midpoints(self) -> Tuple[np.ndarray, np.ndarray]:
+        return ((self.node_lat[self.sources] + self.node_lat[self.targets]) / 2,
+                (self.node_lng[self.sources] + self.node_lng[self.targets]) / 2)
+
+class EdgeTraffic:
+    """
+    Congestion factor of every edge for each hour of the week
+
+    Traffic predictions depend only on (hour, weekday, latitude, longitude),
+    so one batched prediction at every edge midpoint gives the factors of
+    all edges for a whole hour of the week. Profiles are computed on first
+    use and the most recently used ``max_profiles`` are kept.
+
+    An edge entered at time t takes ``free_flow_s * (1 + congestion_weight
+    * prediction)`` seconds, with negative predictions clipped to zero so
+    that no edge is faster than free flow.
+
+    Args:
+        graph: Road graph
+        predict_batch: Callable scoring an (n, 4) array of [hour, weekday,
+            lat, lng] rows, as returned by traffic_grid.batch_predictor
+        congestion_weight: Slowdown per unit of predicted traffic
+        max_profiles: Hour-of-week profiles kept in memory
+        chunk_edges: Largest number of edges scored in one call
+    """
+
+    def __init__(self, graph: RoadGraph, predict_batch: Callable[[np.ndarray], np.ndarray],
+                 congestion_weight: float = 1.0, max_profiles: int = HOURS_PER_WEEK,
+                 chunk_edges: int = 1_000_000):
+        self.graph = graph
+        self.predict_batch = predict_batch
+        self.congestion_weight = congestion_weight
+        self.max_profiles = max_profiles
+        self.chunk_edges = chunk_edges
+        self._midpoints = graph.edge_midpoints()
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def factors(self, how: int) -> np.ndarray:
+        """Travel-time multiplier of every edge entered during hour-of-week how"""
+        how %= HOURS_PER_WEEK
+        with self._lock:
+            profile = self._profiles.get(how)
+            if profile is not None:
+                self._profiles.move_to_end(how)
+                return profile
+
+        lat, lng = self._midpoints
+        features = np.empty((self.graph.n_edges, 4), dtype=np.float32)
+        features[:, 0] = how % 24
+        features[:, 1] = how // 24
+        features[:, 2] = lat
+        features[:, 3] = lng
+        predictions = np.concatenate([
+            np.asarray(self.predict_batch(features[i:i + self.chunk_edges]), dtype=np.float32).reshape(-1)
+            for i in range(0, len(features), self.chunk_edges)
+        ]) if len(features) else np.zeros(0, dtype=np.float32)
+        profile = congestion_factors(predictions, self.congestion_weight)
+
+        with self._lock:
+            self._profiles[how] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile
+
+    def invalidate(self):
+        """Drop every profile, e.g. after the traffic model changed"""
+        with self._lock:
+            self._profiles.clear()
+
+def route(graph: RoadGraph, traffic: EdgeTraffic, origin: int, destination: int,
+          departure: datetime) -> Optional[dict]:
+    """
+    Fastest path between two nodes for a departure time (time-dependent A*)
+
+    Each edge costs its travel time at the moment it is entered, from the
+    congestion profile of that hour of the week. The heuristic is the
+    straight-line distance at the graph's top free-flow speed, which never
+    overestimates because congestion only slows edges down.
+
+    Args:
+        graph: Road graph
+        traffic: Congestion profiles of graph
+        origin, destination: Node indices
+        departure: Departure time at origin
+
+    Returns:
+        Dictionary with the node and edge path, arrival offsets per node,
+        distance and duration, or None if destination is unreachable
+    """
+    # Hour-of-week at elapsed seconds is start_how + (offset + elapsed) // 3600
+    start_how = hour_of_week(departure)
+    offset = departure.minute * 60 + departure.second + departure.microsecond / 1e6
+    remaining = haversine_m(graph.node_lat, graph.node_lng, graph.node_lat[destination],
+                            graph.node_lng[destination]) / graph.max_speed_mps
+
+    best = {origin: 0.0}
+    parent = {}
+    heap = [(0.0, 0.0, origin)]
+    while heap:
+        _, elapsed, u = heapq.heappop(heap)
+        if u == destination:
+            break
+        if elapsed > best[u]:
+            continue
+        first, last = graph.indptr[u], graph.indptr[u + 1]
+        if first == last:
+            continue
+        factors = traffic.factors(start_how + int((offset + elapsed) // 3600))
+        arrivals = elapsed + graph.free_flow_s[first:last] * factors[first:last]
+        heads = graph.targets[first:last]
+        for edge, v, arrival, h in zip(range(first, last), heads.tolist(), arrivals.tolist(),
+                                       remaining[heads].tolist()):
+            if arrival < best.get(v, np.inf):
+                best[v] = arrival
+                parent[v] = edge
+                heapq.heappush(heap, (arrival + h, arrival, v))
+    else:
+        return None
+
+    edges = []
+    node = destination
+    while node != origin:
+        edge = parent[node]
+        edges.append(edge)
+        node = int(graph.sources[edge])
+    edges.reverse()
+    nodes = [origin] + [int(graph.targets[edge]) for edge in edges]
+
+    return {
+        'nodes': nodes,
+        'edges': edges,
+        'arrival_offsets_s': [best[node] for node in nodes],
+        'distance_m': float(graph.length_m[edges].sum()) if edges else 0.0,
+        'duration_s': best[destination],
+        'free_flow_duration_s': float(graph.free_flow_s[edges].sum()) if edges else 0.0
+    }
+
+def sweep_departures(graph: RoadGraph, paths: List[List[int]], departures: List[datetime],
+                     predict_batch: Callable[[np.ndarray], np.ndarray], congestion_weight: float) -> np.ndarray:
+    """
+    Travel time of fixed paths for each of several departure times
+
+    The predictions for every (edge, hour) pair the departures can reach
+    are made in one predict_batch call: each distinct edge of the paths
+    at each hour from the first departure until a horizon long enough for
+    the slowest path. The arrival times are then propagated edge by edge,
+    vectorized over the departures. A path that runs past the horizon
+    extends it with one more call.
+
+    Args:
+        graph: Road graph
+        paths: Edge index lists, each a path from origin to destination
+        departures: Departure times, ascending
+        predict_batch: Batched traffic predictor
+        congestion_weight: Slowdown per unit of predicted traffic
+
+    Returns:
+        Array of shape (len(paths), len(departures)) of travel times in seconds
+    """
+    first_hour = departures[0].replace(minute=0, second=0, microsecond=0)
+    first_how = hour_of_week(first_hour)
+    starts = np.array([(departure - first_hour).total_seconds() for departure in departures])
+
+    edges = np.unique(np.concatenate([np.asarray(path, dtype=np.int64) for path in paths]))
+    column = {edge: i for i, edge in enumerate(edges.tolist())}
+    lat, lng = ((graph.node_lat[graph.sources[edges]] + graph.node_lat[graph.targets[edges]]) / 2,
+                (graph.node_lng[graph.sources[edges]] + graph.node_lng[graph.targets[edges]]) / 2)
+    slowest = max(float(graph.free_flow_s[path].sum()) for path in paths) * (1 + max(congestion_weight, 0))
+    factors = np.zeros((0, len(edges)), dtype=np.float32)
+
+    def extend(hours: int):
+        # Factor rows for hours len(factors) .. hours - 1 after first_hour
+        nonlocal factors
+        hows = (first_how + np.arange(len(factors), hours)) % HOURS_PER_WEEK
+        features = np.empty((len(hows), len(edges), 4), dtype=np.float32)
+        features[..., 0] = (hows % 24)[:, None]
+        features[..., 1] = (hows // 24)[:, None]
+        features[..., 2] = lat
+        features[..., 3] = lng
+        predictions = np.asarray(predict_batch(features.reshape(-1, 4)), dtype=np.float32)
+        factors = np.vstack([factors, congestion_factors(predictions, congestion_weight).reshape(len(hows), -1)])
+
+    extend(int((starts[-1] + slowest) // 3600) + 1)
+    durations = np.empty((len(paths), len(departures)))
+    for p, path in enumerate(paths):
+        t = starts.copy()
+        for edge in path:
+            hour = (t // 3600).astype(np.int64)
+            if hour.max() >= len(factors):
+                extend(int(hour.max()) + 1 + int(slowest // 3600))
+            t += graph.free_flow_s[edge] * factors[hour, column[edge]]
+        durations[p] = t - starts
+    return durations
+
+class LocalRouteOptimizer:
+    """
+    Offline replacement for RouteOptimizer.get_optimal_route
+
+    Routes between 'lat,lng' locations on a local road graph with edge
+    costs from traffic predictions, with no external service.
+
+    Args:
+        graph: Road graph
+        predict_batch: Batched traffic predictor (see EdgeTraffic)
+        congestion_weight: Slowdown per unit of predicted traffic
+    """
+
+    def __init__(self, graph: RoadGraph, predict_batch: Callable[[np.ndarray], np.ndarray],
+                 congestion_weight: float = 1.0):
+        self.graph = graph
+        self.predict_batch = predict_batch
+        self.congestion_weight = congestion_weight
+        self.traffic = EdgeTraffic(graph, predict_batch, congestion_weight)
+
+    def get_optimal_route(self, origin: str, destination: str, departure_time: Optional[datetime] = None) -> dict:
+        """
+        Fastest route between two locations
+
+        Args:
+            origin: 'lat,lng' start location
+            destination: 'lat,lng' end location
+            departure_time: Departure time (defaults to current time)
+
+        Returns:
+            Route summary with the path as [lat, lng] points
+
+        Raises:
+            ValueError: If a location is malformed or no route exists
+        """
+        if departure_time is None:
+            departure_time = datetime.now()
+        start = self.graph.nearest_node(*parse_lat_lng(origin))
+        end = self.graph.nearest_node(*parse_lat_lng(destination))
+
+        result = route(self.graph, self.traffic, start, end, departure_time)
+        if result is None:
+            raise ValueError(f"No route from {origin} to {destination}")
+
+        return {
+            'origin': origin,
+            'destination': destination,
+            'departure_time': departure_time.isoformat(),
+            'arrival_time': (departure_time + timedelta(seconds=result['duration_s'])).isoformat(),
+            'duration_seconds': result['duration_s'],
+            'free_flow_duration_seconds': result['free_flow_duration_s'],
+            'distance_meters': result['distance_m'],
+            'path': [[float(self.graph.node_lat[node]), float(self.graph.node_lng[node])]
+                     for node in result['nodes']]
+        }
+
+    def sweep_departures(self, origin: str, destination: str, window_start: datetime, window_end: datetime,
+                         step: timedelta) -> dict:
+        """
+        Travel-time curve over a departure window, and the best slot
+
+        The fastest routes for departures at the start, middle and end of
+        the window are the candidates. Each is evaluated for every departure
+        slot with sweep_departures, so the whole window costs three route
+        searches and one batched prediction. The curve is the best of the
+        candidates per slot, which can be slower than a search for that
+        exact slot would find.
+
+        Args:
+            origin: 'lat,lng' start location
+            destination: 'lat,lng' end location
+            window_start: Earliest departure
+            window_end: Latest departure
+            step: Time between candidate departures
+
+        Returns:
+            Dictionary with the curve (fastest duration per slot), the best
+            slot and the route to take then
+
+        Raises:
+            ValueError: If a location is malformed or no route exists
+        """
+        departures = []
+        departure = window_start
+        while departure <= window_end:
+            departures.append(departure)
+            departure += step
+        start = self.graph.nearest_node(*parse_lat_lng(origin))
+        end = self.graph.nearest_node(*parse_lat_lng(destination))
+
+        candidates = {}
+        for departure in (departures[0], departures[len(departures) // 2], departures[-1]):
+            result = route(self.graph, self.traffic, start, end, departure)
+            if result is None:
+                raise ValueError(f"No route from {origin} to {destination}")
+            candidates[tuple(result['edges'])] = result
+        paths = [list(edges) for edges in candidates]
+        durations = sweep_departures(self.graph, paths, departures, self.predict_batch, self.congestion_weight)
+
+        fastest = durations.argmin(axis=0)
+        curve = durations[fastest, np.arange(len(departures))]
+        best = int(curve.argmin())
+        path = list(candidates)[fastest[best]]
+        result = candidates[path]
+        return {
+            'origin': origin,
+            'destination': destination,
+            'curve': [{
+                'departure_time': departure.isoformat(),
+                'arrival_time': (departure + timedelta(seconds=float(duration))).isoformat(),
+                'duration_seconds': float(duration)
+            } for departure, duration in zip(departures, curve)],
+            'best': {
+                'departure_time': departures[best].isoformat(),
+                'arrival_time': (departures[best] + timedelta(seconds=float(curve[best]))).isoformat(),
+                'duration_seconds': float(curve[best]),
+                'free_flow_duration_seconds': result['free_flow_duration_s'],
+                'distance_meters': result['distance_m'],
+                'path': [[float(self.graph.node_lat[node]), float(self.graph.node_lng[node])]
+                         for node in result['nodes']]
+            }
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert an OSM-derived node/edge CSV pair to a road graph file")
+    parser.add_argument("nodes", help="CSV with columns id, lat, lng")
+    parser.add_argument("edges", help="CSV with columns from, to[, length_m, speed_kmh, oneway]")
+    parser.add_argument("output", help="Output .npz path")
+    args = parser.parse_args()
+
+    graph = RoadGraph.from_csv(args.nodes, args.edges)
+    graph.save(args.output)
+    print(f"Saved {graph.n_nodes} nodes and {graph.n_edges} edges to {args.output}")
+
+if __name__ == "__main__":
+    main()
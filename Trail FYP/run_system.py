@@ -2,6 +2,10 @@ import subprocess
 import time
 import os
 import sys
+import requests
+
+SERVER_URL = "http://127.0.0.1:8000"
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", "300"))
 
 def start_server():
     """
@@ -16,6 +20,37 @@ def start_server():
         print(f"Error starting server: {str(e)}")
         sys.exit(1)
 
+def wait_until_ready(server_process, timeout=READY_TIMEOUT):
+    """
+    Poll the server's readiness endpoint until warmup has finished
+    
+    Args:
+        server_process: Server process, checked so a crash is reported at once
+        timeout: Seconds to wait before giving up
+        
+    Returns:
+        True if the server reported ready, False if the deadline passed
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server_process.poll() is not None:
+            print("Server exited during startup")
+            sys.exit(1)
+        try:
+            response = requests.get(f"{SERVER_URL}/ready", timeout=2)
+            status = response.json()
+            if response.status_code == 200:
+                print(f"Server ready: {len(status['warmed'])}/{len(status['symbols'])} symbols warmed "
+                      f"in {status['duration']:.1f}s")
+                for symbol, error in status['failed'].items():
+                    print(f"  warmup failed for {symbol}: {error}")
+                return True
+            print(f"Warming up... {len(status['warmed'])}/{len(status['symbols'])} symbols")
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+        time.sleep(1)
+    return False
+
 def start_gui():
     """
     Start the GUI application in a new process
@@ -38,9 +73,10 @@ def main():
     # Start server
     server_process = start_server()
     
-    # Wait a few seconds for the server to start
+    # Wait for the server to finish warming up
     print("Waiting for server to initialize...")
-    time.sleep(5)
+    if not wait_until_ready(server_process):
+        print(f"Server not ready after {READY_TIMEOUT:.0f}s, starting GUI anyway")
     
     # Start GUI
     gui_process = start_gui()
@@ -0,0 +1,329 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+BAR_DTYPE = np.dtype([
+    ('timestamp', '<i8'),  # Bar start, seconds since the epoch (exchange local time)
+    ('open', '<f4'),
+    ('high', '<f4'),
+    ('low', '<f4'),
+    ('close', '<f4'),
+    ('volume', '<f4')
+])
+
+INTERVAL_SECONDS = {
+    '1min': 60,
+    '5min': 300,
+    '15min': 900,
+    '30min': 1800,
+    '60min': 3600,
+    '1D': 86400
+}
+
+# Finest stored granularity; coarser intervals are resampled from it
+BASE_INTERVAL = '5min'
+
+# Regular trading session, seconds after midnight exchange time. Daily bars
+# resampled from intraday bars use only these, like the exchange's daily bars.
+REGULAR_SESSION = (9 * 3600 + 30 * 60, 16 * 3600)
+
+EXCHANGE_TIMEZONE = ZoneInfo('America/New_York')
+
+def market_now() -> int:
+    """Current time as seconds since the epoch on the exchange's wall clock, like bar timestamps"""
+    now = datetime.now(EXCHANGE_TIMEZONE).replace(tzinfo=None)
+    return int((now - datetime(1970, 1, 1)).total_seconds())
+
+def in_session(timestamp: int, grace: int = 0) -> bool:
+    """Whether an exchange-time timestamp falls on a weekday within the regular session, plus grace seconds"""
+    # 1970-01-01 was a Thursday
+    weekday = (timestamp // 86400 + 3) % 7
+    seconds = timestamp % 86400
+    return weekday < 5 and REGULAR_SESSION[0] <= seconds < REGULAR_SESSION[1] + grace
+
+def format_timestamp(timestamp: int) -> str:
+    """Bar timestamp as the 'YYYY-MM-DD HH:MM:SS' string the API responses use"""
+    return (datetime(1970, 1, 1) + timedelta(seconds=timestamp)).strftime("%Y-%m-%d %H:%M:%S")
+
+COLUMNS = {
+    'open': 'Open',
+    'high': 'High',
+    'low': 'Low',
+    'close': 'Close',
+    'volume': 'Volume'
+}
+
+def resample(bars: np.ndarray, interval: str) -> np.ndarray:
+    """
+    Aggregate ascending bars into interval bars aligned to the clock
+
+    Each output bar takes the first open, highest high, lowest low, last
+    close and summed volume of the input bars starting in it. For '1D'
+    only bars within the regular session are used.
+
+    Args:
+        bars: BAR_DTYPE records of a finer interval, ascending
+        interval: Target interval (a key of INTERVAL_SECONDS)
+
+    Returns:
+        BAR_DTYPE records, one per interval holding at least one input bar
+    """
+    step = INTERVAL_SECONDS[interval]
+    if interval == '1D' and len(bars):
+        seconds = bars['timestamp'] % step
+        bars = bars[(seconds >= REGULAR_SESSION[0]) & (seconds < REGULAR_SESSION[1])]
+    if not len(bars):
+        return np.empty(0, dtype=BAR_DTYPE)
+
+    buckets = bars['timestamp'] // step * step
+    starts = np.flatnonzero(np.concatenate([[True], buckets[1:] != buckets[:-1]]))
+    ends = np.append(starts[1:], len(bars)) - 1
+    result = np.empty(len(starts), dtype=BAR_DTYPE)
+    result['timestamp'] = buckets[starts]
+    result['open'] = bars['open'][starts]
+    result['high'] = np.maximum.reduceat(bars['high'], starts)
+    result['low'] = np.minimum.reduceat(bars['low'], starts)
+    result['close'] = bars['close'][ends]
+    result['volume'] = np.add.reduceat(bars['volume'].astype(np.float64), starts)
+    return result
+
+class SeriesStore:
+    """
+    On-disk store of OHLCV bars, one flat binary file per (symbol, interval)
+
+    Files are fixed-size records read through np.memmap, so every worker
+    process reading the same series shares one copy through the OS page
+    cache. Writers replace files atomically; readers that already mapped
+    the old file keep a consistent view of it. Writers of the same series
+    (write, append, merge) are serialized across processes with a lock
+    file, so a rewrite cannot drop bars appended to the file it replaces.
+
+    Only the finest interval (BASE_INTERVAL) has to be stored per symbol;
+    load serves the coarser intervals resampled from it.
+    """
+
+    def __init__(self, data_dir: str = 'data'):
+        self.series_dir = os.path.join(data_dir, 'series')
+        self.derived_dir = os.path.join(self.series_dir, 'derived')
+        os.makedirs(self.derived_dir, exist_ok=True)
+        self._derive_lock = threading.Lock()
+
+    def path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.series_dir, f"{symbol}_{interval}.bars")
+
+    def read(self, symbol: str, interval: str) -> Optional[np.ndarray]:
+        """Memory-mapped bars for symbol in ascending time order, or None if not stored"""
+        path = self.path(symbol, interval)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        return np.memmap(path, dtype=BAR_DTYPE, mode='r')
+
+    def load(self, symbol: str, interval: str, base_interval: str = BASE_INTERVAL) -> Optional[np.ndarray]:
+        """
+        Bars for symbol at interval, resampled from the stored base series
+
+        Complete resampled bars are cached under derived/ and extended
+        incrementally: each call only resamples the base bars after the
+        last cached bar, and the bar still in progress is rebuilt on every
+        call. The cache is rebuilt when the base series was rewritten
+        (merge or write) rather than appended to.
+
+        '1D' bars are the stored daily history with every day the base
+        series covers replaced by the day resampled from it, so daily
+        training data and intraday serving data agree on recent days.
+        Intervals that are not a multiple of the base interval, or symbols
+        without a base series, are read as stored.
+
+        Returns:
+            Bars in ascending time order, or None if nothing is stored
+        """
+        step, base_step = INTERVAL_SECONDS[interval], INTERVAL_SECONDS[base_interval]
+        if step == base_step or step % base_step:
+            return self.read(symbol, interval)
+        with self._derive_lock:
+            derived = self._derive(symbol, interval, base_interval)
+        if derived is None:
+            return self.read(symbol, interval)
+        bars, base_start = derived
+        if interval != '1D':
+            return bars
+
+        history = self.read(symbol, '1D')
+        # The base series' first day counts only if it starts by the session open
+        first_day = base_start // step * step
+        if base_start % step > REGULAR_SESSION[0]:
+            first_day += step
+        bars = bars[bars['timestamp'] >= first_day]
+        if history is None:
+            return bars
+        # Resampled days win over stored ones; stored days missing from the base series are kept
+        bars = np.concatenate([bars, history])
+        _, first = np.unique(bars['timestamp'], return_index=True)
+        return bars[first]
+
+    def _derive(self, symbol: str, interval: str, base_interval: str):
+        base_path = self.path(symbol, base_interval)
+        if not os.path.exists(base_path):
+            return None
+        # Stat before mapping, so a rewrite in between is caught on the next call
+        stat = os.stat(base_path)
+        base = self.read(symbol, base_interval)
+        if base is None:
+            return None
+
+        path = os.path.join(self.derived_dir, f"{symbol}_{interval}.bars")
+        meta_path = f"{path}.json"
+        cached = None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            consumed = meta['base_size'] // BAR_DTYPE.itemsize
+            # An append keeps the inode and every earlier bar; a rewrite does not
+            if meta['base_inode'] == stat.st_ino and 0 < consumed <= len(base) \
+                    and base[consumed - 1].tobytes().hex() == meta['base_last_bar']:
+                cached = np.fromfile(path, dtype=BAR_DTYPE)
+        except (OSError, ValueError, KeyError):
+            cached = None
+
+        step = INTERVAL_SECONDS[interval]
+        start = 0
+        if cached is not None and len(cached):
+            start = int(np.searchsorted(base['timestamp'], cached['timestamp'][-1] + step))
+        fresh = resample(base[start:], interval)
+        # The last bar may still be in progress, so it is never cached
+        complete, partial = fresh[:-1], fresh[-1:]
+
+        if cached is None or len(complete):
+            cached = complete if cached is None else np.concatenate([cached, complete])
+            consumed = min(stat.st_size // BAR_DTYPE.itemsize, len(base))
+            tmp_suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+            cached.tofile(f"{path}.{tmp_suffix}")
+            os.replace(f"{path}.{tmp_suffix}", path)
+            with open(f"{meta_path}.{tmp_suffix}", 'w') as f:
+                json.dump({'base_interval': base_interval, 'base_inode': stat.st_ino,
+                           'base_size': consumed * BAR_DTYPE.itemsize,
+                           'base_last_bar': base[consumed - 1].tobytes().hex()}, f)
+            os.replace(f"{meta_path}.{tmp_suffix}", meta_path)
+        return np.concatenate([cached, partial]), int(base['timestamp'][0])
+
+    def age(self, symbol: str, interval: str) -> Optional[float]:
+        """Seconds since the series was last written, or None if not stored"""
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        return time.time() - os.path.getmtime(path)
+
+    @contextmanager
+    def lock(self, symbol: str, interval: str):
+        """Hold the series' writer lock (a no-op where fcntl is unavailable)"""
+        if fcntl is None:
+            yield
+            return
+        # flock belongs to the open file, so threads of one process exclude each other too
+        with open(f"{self.path(symbol, interval)}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def write(self, symbol: str, interval: str, bars: np.ndarray):
+        """Atomically replace the stored series with bars (BAR_DTYPE, ascending)"""
+        with self.lock(symbol, interval):
+            self._write(symbol, interval, bars)
+
+    def _write(self, symbol: str, interval: str, bars: np.ndarray):
+        path = self.path(symbol, interval)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        np.ascontiguousarray(bars, dtype=BAR_DTYPE).tofile(tmp_path)
+        os.replace(tmp_path, path)
+
+    def append(self, symbol: str, interval: str, bars: np.ndarray):
+        """
+        Append bars newer than the last stored one in O(len(bars))
+
+        Bars at or before the last stored timestamp are ignored; use merge
+        to correct existing bars.
+
+        Returns:
+            Number of bars appended
+        """
+        bars = np.ascontiguousarray(bars, dtype=BAR_DTYPE)
+        with self.lock(symbol, interval):
+            last = self.last_timestamp(symbol, interval)
+            if last is not None:
+                bars = bars[bars['timestamp'] > last]
+            if len(bars):
+                with open(self.path(symbol, interval), 'ab') as f:
+                    f.write(bars.tobytes())
+        return len(bars)
+
+    def merge(self, symbol: str, interval: str, bars: np.ndarray):
+        """Upsert bars by timestamp, with the new bars winning, and rewrite the series"""
+        bars = np.ascontiguousarray(bars, dtype=BAR_DTYPE)
+        with self.lock(symbol, interval):
+            stored = self.read(symbol, interval)
+            if stored is not None:
+                bars = np.concatenate([bars, stored])
+            # np.unique keeps the first occurrence, which is the new bar
+            _, first = np.unique(bars['timestamp'], return_index=True)
+            self._write(symbol, interval, bars[first])
+
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        """Timestamp of the newest stored bar, read without mapping the whole file"""
+        path = self.path(symbol, interval)
+        if not os.path.exists(path) or os.path.getsize(path) < BAR_DTYPE.itemsize:
+            return None
+        with open(path, 'rb') as f:
+            f.seek(-BAR_DTYPE.itemsize, os.SEEK_END)
+            return int(np.frombuffer(f.read(BAR_DTYPE.itemsize), dtype=BAR_DTYPE)['timestamp'][0])
+
+    def symbols(self, interval: str) -> List[str]:
+        suffix = f"_{interval}.bars"
+        return sorted(f[:-len(suffix)] for f in os.listdir(self.series_dir) if f.endswith(suffix))
+
+    def freshness(self, interval: str = '5min', symbols: Optional[List[str]] = None) -> Dict[str, dict]:
+        """
+        Freshness lag per stored symbol
+
+        Returns:
+            Mapping of symbol to the newest bar's timestamp and the seconds
+            between that bar's close and now (exchange time)
+        """
+        now = market_now()
+        result = {}
+        for symbol in symbols or self.symbols(interval):
+            last = self.last_timestamp(symbol, interval)
+            if last is None:
+                result[symbol] = {'last_bar': None, 'lag_seconds': None}
+                continue
+            result[symbol] = {
+                'last_bar': format_timestamp(last),
+                'lag_seconds': max(0, now - (last + INTERVAL_SECONDS[interval]))
+            }
+        return result
+
+    @staticmethod
+    def from_frame(df: pd.DataFrame) -> np.ndarray:
+        """Convert a load_data style DataFrame to bar records"""
+        bars = np.empty(len(df), dtype=BAR_DTYPE)
+        bars['timestamp'] = df.index.values.astype('datetime64[s]').astype(np.int64)
+        for field, column in COLUMNS.items():
+            bars[field] = df[column].values
+        return bars
+
+    @staticmethod
+    def to_frame(bars: np.ndarray) -> pd.DataFrame:
+        """Convert bar records to a DataFrame shaped like load_data's output"""
+        index = pd.DatetimeIndex(bars['timestamp'].astype('datetime64[s]').astype('datetime64[ns]'))
+        return pd.DataFrame({column: bars[field].astype(float) for field, column in COLUMNS.items()}, index=index)
@@ -0,0 +1,31 @@
+import argparse
+import os
+
+import uvicorn
+
+def main():
+    """
+    Production launcher: N uvicorn worker processes behind one port
+
+    Workers share model weights and cached price series through the
+    memory-mapped files under models/ and data/series/, so adding workers
+    does not multiply resident model memory.
+
+    Each worker imports main.py and so has its own training pool and
+    training admission lane. The pools share models/training.lock, so only
+    one training job runs at a time across all workers; a worker's training
+    requests wait for the lock after passing its lane.
+    """
+    parser = argparse.ArgumentParser(description="Run the Stock Market Prediction API with multiple workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                        help="Number of worker processes (default: WEB_CONCURRENCY or CPU count)")
+    args = parser.parse_args()
+
+    # Workers import main:app from this directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import json
+import os
+
+import numpy as np
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0)
+}
+
+def shared_paths(model_path: str):
+    """Manifest and weight file paths that sit next to a saved .h5 model"""
+    base = os.path.splitext(model_path)[0]
+    return base + '.shared.json', base + '.shared.bin'
+
+def export_shared(model, model_path: str):
+    """
+    Write a Sequential LSTM/Dropout/Dense model as a flat float32 weight file
+    plus a JSON manifest, so processes can memory-map one copy of the weights
+
+    Args:
+        model: Keras Sequential model
+        model_path: Path of the model's .h5 file; the shared files are written beside it
+
+    Returns:
+        True if the model was exported, False if it has unsupported layers
+    """
+    layers, arrays, offset = [], [], 0
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == 'Dropout':
+            continue
+        if kind not in ('LSTM', 'Dense'):
+            return False
+        config = layer.get_config()
+        if kind == 'LSTM' and (config.get('activation') != 'tanh' or config.get('recurrent_activation') != 'sigmoid'):
+            return False
+        if kind == 'Dense' and config.get('activation') not in ACTIVATIONS:
+            return False
+
+        entry = {'type': kind, 'weights': []}
+        if kind == 'LSTM':
+            entry['units'] = config['units']
+            entry['return_sequences'] = config['return_sequences']
+        else:
+            entry['activation'] = config['activation']
+        for weight in layer.get_weights():
+            weight = np.ascontiguousarray(weight, dtype=np.float32)
+            entry['weights'].append({'offset': offset, 'shape': list(weight.shape)})
+            arrays.append(weight)
+            offset += weight.nbytes
+        layers.append(entry)
+
+    manifest_path, weights_path = shared_paths(model_path)
+    with open(weights_path + '.tmp', 'wb') as f:
+        for weight in arrays:
+            f.write(weight.tobytes())
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump({'input_shape': list(model.input_shape[1:]), 'layers': layers}, f)
+    os.replace(weights_path + '.tmp', weights_path)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return True
+
+class SharedModel:
+    """
+    NumPy implementation of the forward pass of an exported model
+
+    The weights are read-only views into a memory-mapped file, so every
+    worker process that loads the same model shares one copy of them in
+    the OS page cache. ``predict`` mirrors Keras' ``model.predict`` for
+    inference.
+    """
+
+    def __init__(self, model_path: str):
+        manifest_path, weights_path = shared_paths(model_path)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        self.input_shape = tuple(manifest['input_shape'])
+        self._buffer = np.memmap(weights_path, dtype=np.uint8, mode='r')
+        self.layers = []
+        for entry in manifest['layers']:
+            weights = []
+            for spec in entry['weights']:
+                count = int(np.prod(spec['shape']))
+                weights.append(np.frombuffer(self._buffer, dtype=np.float32, count=count,
+                                             offset=spec['offset']).reshape(spec['shape']))
+            self.layers.append((entry, weights))
+
+    @staticmethod
+    def exists(model_path: str) -> bool:
+        manifest_path, weights_path = shared_paths(model_path)
+        return os.path.exists(manifest_path) and os.path.exists(weights_path)
+
+    @staticmethod
+    def _lstm(x, kernel, recurrent_kernel, bias, units, return_sequences):
+        # Input projections for every time step at once; Keras gate order is i, f, c, o
+        projected = x @ kernel + bias
+        h = np.zeros((x.shape[0], units), dtype=np.float32)
+        c = np.zeros_like(h)
+        outputs = []
+        for t in range(x.shape[1]):
+            z = projected[:, t] + h @ recurrent_kernel
+            i = 1 / (1 + np.exp(-z[:, :units]))
+            f = 1 / (1 + np.exp(-z[:, units:2 * units]))
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = 1 / (1 + np.exp(-z[:, 3 * units:]))
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            if return_sequences:
+                outputs.append(h)
+        return np.stack(outputs, axis=1) if return_sequences else h
+
+    def predict(self, x, **kwargs):
+        """Run the forward pass on a batch of shape (batch, look_back, n_features)"""
+        out = np.asarray(x, dtype=np.float32)
+        for entry, weights in self.layers:
+            if entry['type'] == 'LSTM':
+                out = self._lstm(out, *weights, entry['units'], entry['return_sequences'])
+            else:
+                kernel, bias = weights
+                out = ACTIVATIONS[entry['activation']](out @ kernel + bias)
+        return out
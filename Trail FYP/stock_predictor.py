@@ -1,111 +1,103 @@
 import pandas as pd
-import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
-import requests
-from datetime import datetime, timedelta
+from datetime import timedelta
 import os
 from dotenv import load_dotenv
-import tensorflow as tf
 
-load_dotenv()
+from feature_engine import FEATURE_COLUMNS, FeatureEngine, compute_features, make_windows, scale_windows
+from inference_session import latest_window, predict_price, window_length
+from model_manager import ModelManager, build_lstm
+from series_store import SeriesStore
+from alpha_vantage import fetch_intraday
 
-class ModelManager:
-    def __init__(self, model_dir):
-        self.model_dir = model_dir
-        os.makedirs(self.model_dir, exist_ok=True)
-        
-    def save_model(self, model, filename):
-        model.save(os.path.join(self.model_dir, filename))
-        
-    def load_model(self, filename):
-        return tf.keras.models.load_model(os.path.join(self.model_dir, filename))
+load_dotenv()
 
 class StockPredictor:
-    def __init__(self, model_dir):
+    def __init__(self, model_dir, multivariate: bool = False):
         self.model = None
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
-        self.look_back = 60  # Number of previous days to consider
-        self.api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
         self.model_manager = ModelManager(model_dir)
+        self.architecture = self.model_manager.get_architecture('price')
+        self.look_back = self.architecture['look_back']  # Number of previous bars to consider
+        self.multivariate = multivariate  # Use the engineered OHLCV features instead of Close only
+        self.n_features = len(FEATURE_COLUMNS) if multivariate else 1
+        self.feature_engine = FeatureEngine(self.look_back)
+        self.api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
         self.model_initialized = False
+        self.series_store = SeriesStore("data")
+        self.max_data_age = 300  # Refetch once a new 5 minute bar may exist
         
     def create_model(self):
-        """Create LSTM model for stock prediction"""
-        self.model = Sequential([
-            LSTM(50, return_sequences=True, input_shape=(self.look_back, 1)),
-            LSTM(50),
-            Dense(1)
-        ])
-        
-        self.model.compile(optimizer='adam', loss='mean_squared_error')
+        """Create LSTM model for stock prediction with the registered price architecture"""
+        self.model = build_lstm(**dict(self.architecture, look_back=self.look_back), n_features=self.n_features)
         self.model_initialized = True
         
     def load_model(self, symbol: str):
-        """Load a pre-trained model for a specific symbol"""
-        try:
-            self.model = self.model_manager.load_model(f"{symbol}_model.h5")
-            self.model_initialized = True
-        except:
-            self.create_model()
-            self.model_initialized = True
+        """
+        Load a pre-trained model for a specific symbol
+        
+        Models are cached by the model manager until their file changes. The
+        memory-mapped shared export is preferred, so worker processes serving
+        the same symbol share its weights.
+        
+        Raises:
+            FileNotFoundError: If no model has been saved for the symbol
+        """
+        self.model = self.model_manager.get_model(f"{symbol}_model.h5")
+        self.model_initialized = True
             
     def save_model(self, symbol: str):
         """Save the trained model"""
         if self.model_initialized:
             self.model_manager.save_model(self.model, f"{symbol}_model.h5")
             
-    def load_data(self, symbol: str):
-        """
-        Load stock data from Alpha Vantage API
+    def load_data(self, symbol: str, interval: str = '5min'):
         """
-        url = 'https://www.alphavantage.co/query'
-        params = {
-            'function': 'TIME_SERIES_INTRADAY',
-            'symbol': symbol,
-            'apikey': self.api_key,
-            'interval': '5min',
-            'outputsize': 'full'
-        }
-        
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if 'Time Series (5min)' not in data:
-            raise ValueError(f"No data found for symbol {symbol}")
-            
-        df = pd.DataFrame(data['Time Series (5min)']).T
-        df = df.rename(columns={
-            '1. open': 'Open',
-            '2. high': 'High',
-            '3. low': 'Low',
-            '4. close': 'Close',
-            '5. volume': 'Volume'
-        })
+        Load stock data from the local series store, refreshing it from the
+        Alpha Vantage API when it is older than one bar
         
-        df = df.astype(float)
-        df.index = pd.to_datetime(df.index)
-        df = df.sort_index()
+        The ingestion daemon (ingest_daemon.py) keeps the store current for
+        its universe, in which case no API call is made here. Only the
+        5-minute series is fetched; other intervals are resampled from it
+        (SeriesStore.load).
         
-        return df
+        Args:
+            symbol: Stock symbol
+            interval: '5min', '15min', '30min', '60min' or '1D'
+        
+        Raises:
+            ValueError: If no bars are stored for the symbol at interval
+        """
+        if self.needs_fetch(symbol):
+            # Merge rather than replace, so bars older than the upstream window
+            # (or appended by the ingestion daemon) are kept
+            self.series_store.merge(symbol, '5min', fetch_intraday(symbol, self.api_key))
+        bars = self.series_store.load(symbol, interval)
+        if bars is None:
+            raise ValueError(f"No {interval} bars stored for {symbol}")
+        return SeriesStore.to_frame(bars)
+        
+    def needs_fetch(self, symbol: str) -> bool:
+        """Whether load_data will call the Alpha Vantage API for symbol"""
+        age = self.series_store.age(symbol, '5min')
+        return age is None or age >= self.max_data_age
         
     def prepare_data(self, df: pd.DataFrame):
         """
         Prepare data for LSTM model
-        """
-        close_prices = df['Close'].values.reshape(-1, 1)
-        scaled_data = self.scaler.fit_transform(close_prices)
         
-        x, y = [], []
-        for i in range(self.look_back, len(scaled_data)):
-            x.append(scaled_data[i-self.look_back:i, 0])
-            y.append(scaled_data[i, 0])
+        Every window is min-max scaled on its own range and its target is the
+        next close in that scale, matching how predict_price scales the latest
+        window at inference time.
+        """
+        if self.multivariate:
+            values = compute_features(df).dropna().values
+        else:
+            values = df['Close'].values.reshape(-1, 1)
         
-        x, y = np.array(x), np.array(y)
-        x = np.reshape(x, (x.shape[0], x.shape[1], 1))
+        x, y_index = make_windows(values, self.look_back)
+        x_scaled, low, span = scale_windows(x)
         
-        return x, y
+        # Close is the first column in both modes
+        return x_scaled, (values[y_index, 0] - low[:, 0, 0]) / span[:, 0, 0]
         
     def train_model(self, df: pd.DataFrame, epochs: int = 50, batch_size: int = 32, validation_split: float = 0.2):
         """
@@ -121,6 +113,8 @@ class StockPredictor:
         """
         Predict stock price for a given symbol
         
+        Safe to call from several threads: no instance state is modified.
+        
         Args:
             symbol: Stock symbol to predict
             date: Optional date for prediction (default: today)
@@ -132,21 +126,16 @@ class StockPredictor:
             # Load data
             df = self.load_data(symbol)
             
-            # Load or create model
-            self.load_model(symbol)
-            
-            # Get the latest data point
-            latest_data = df['Close'].values[-self.look_back:].reshape(-1, 1)
-            
-            # Scale the data
-            scaled_data = self.scaler.fit_transform(latest_data)
+            # The model is a local reference from the model cache, so concurrent
+            # predictions for other symbols cannot swap it out underneath this one
+            model = self.model_manager.get_model(f"{symbol}_model.h5")
             
-            # Prepare input for prediction
-            x_input = scaled_data.reshape(1, self.look_back, 1)
+            # In multivariate mode only the bars added since the last request are run through the indicators
+            # The window matches the model's own input, which may predate the registered look_back
+            window = latest_window(df, window_length(model), self.multivariate, symbol, self.feature_engine)
             
-            # Make prediction
-            predicted_price_scaled = self.model.predict(x_input)
-            predicted_price = self.scaler.inverse_transform(predicted_price_scaled)[0][0]
+            # The window is scaled on its own range; Close is the first column
+            predicted_price = predict_price(model, window)
             
             # Get prediction date
             if date is None:
@@ -172,16 +161,3 @@ class StockPredictor:
         x, y = self.prepare_data(df)
         loss = self.model.evaluate(x, y)
         return loss
-
-    def save_model(self, filename: str):
-        """
-        Save the trained LSTM model
-        """
-        if self.model_initialized:
-            self.model_manager.save_model(self.model, filename)
-
-    def load_model(self, filename: str):
-        """
-        Load a trained LSTM model
-        """
-        self.model = self.model_manager.load_model(filename)
@@ -1,83 +1,95 @@
 import pandas as pd
-import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
-import requests
-from datetime import datetime
 import os
 from dotenv import load_dotenv
 
+from alpha_vantage import fetch_daily
+from feature_engine import FEATURE_COLUMNS, compute_features, make_windows, scale_windows
+from model_manager import ModelManager, build_lstm
+from tflite_backend import holdout_windows
+from series_store import BASE_INTERVAL, SeriesStore
+
 load_dotenv()
 
 class StockTrainer:
-    def __init__(self):
+    def __init__(self, multivariate: bool = False):
         self.model = None
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
-        self.look_back = 60  # Number of previous days to consider
+        self.model_manager = ModelManager('models')
+        self.architecture = self.model_manager.get_architecture('price')
+        self.look_back = self.architecture['look_back']  # Number of previous days to consider
+        self.multivariate = multivariate  # Use the engineered OHLCV features instead of Close only
+        self.n_features = len(FEATURE_COLUMNS) if multivariate else 1
         self.api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
+        self.series_store = SeriesStore('data')
+        self.max_data_age = 24 * 60 * 60
+        # TFLITE_EXPORT=float16|int8 exports every trained model and serves it if it passes parity
+        self.tflite_quantization = os.getenv('TFLITE_EXPORT') or None
+        self.tflite_max_error = float(os.getenv('TFLITE_MAX_ERROR', '0.01'))
         
     def load_data(self, symbol: str, interval: str = '1D'):
         """
-        Load stock data from Alpha Vantage API
-        """
-        url = f'https://www.alphavantage.co/query'
-        params = {
-            'function': 'TIME_SERIES_DAILY_ADJUSTED',
-            'symbol': symbol,
-            'apikey': self.api_key,
-            'outputsize': 'full'
-        }
+        Load stock data from the local series store, refreshing the daily
+        history from the Alpha Vantage API once a day
         
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if 'Time Series (Daily)' not in data:
-            raise ValueError(f"No data found for symbol {symbol}")
-            
-        df = pd.DataFrame(data['Time Series (Daily)']).T
-        df = df.rename(columns={
-            '1. open': 'Open',
-            '2. high': 'High',
-            '3. low': 'Low',
-            '4. close': 'Close',
-            '5. adjusted close': 'Adj Close',
-            '6. volume': 'Volume'
-        })
-        
-        df = df.astype(float)
-        df.index = pd.to_datetime(df.index)
-        df = df.sort_index()
+        Days covered by the stored 5-minute series are resampled from it
+        (SeriesStore.load), so the models train on the same bars the server
+        predicts from. While that series is current and the daily history
+        still reaches back to it, the history is not refetched.
+        """
+        age = self.series_store.age(symbol, '1D')
+        if age is None or (age >= self.max_data_age and not self._intraday_covers(symbol)):
+            self.series_store.write(symbol, '1D', fetch_daily(symbol, self.api_key))
         
-        return df
+        bars = self.series_store.load(symbol, interval)
+        if bars is None:
+            raise ValueError(f"No {interval} bars stored for {symbol}")
+        return SeriesStore.to_frame(bars)
+    
+    def _intraday_covers(self, symbol: str) -> bool:
+        """Whether a current intraday series continues the stored daily history"""
+        age = self.series_store.age(symbol, BASE_INTERVAL)
+        if age is None or age >= self.max_data_age:
+            return False
+        base = self.series_store.read(symbol, BASE_INTERVAL)
+        last_day = self.series_store.last_timestamp(symbol, '1D')
+        return last_day >= base['timestamp'][0] // 86400 * 86400
+    
+    def export_tflite(self, symbol: str, df: pd.DataFrame):
+        """
+        Export the trained model as a quantized TFLite artifact and serve it
+        if it passes the parity check on the latest windows of df
+        """
+        values = compute_features(df).dropna().values if self.multivariate else df['Close'].values
+        filename = f'{symbol}_model.h5'
+        report = self.model_manager.export_tflite(self.model, filename, self.tflite_quantization,
+                                                  holdout_windows(values, self.look_back), self.tflite_max_error)
+        if report['passed']:
+            self.model_manager.set_backend(filename, f'tflite-{self.tflite_quantization}')
+        return report
     
     def create_model(self):
         """
-        Create LSTM model for stock prediction
+        Create LSTM model for stock prediction with the registered price architecture
         """
-        self.model = Sequential()
-        self.model.add(LSTM(units=50, return_sequences=True, input_shape=(self.look_back, 1)))
-        self.model.add(LSTM(units=50))
-        self.model.add(Dense(1))
-        
-        self.model.compile(optimizer='adam', loss='mean_squared_error')
+        self.model = build_lstm(**dict(self.architecture, look_back=self.look_back), n_features=self.n_features)
     
     def prepare_data(self, df: pd.DataFrame):
         """
         Prepare data for LSTM model
-        """
-        close_prices = df['Close'].values.reshape(-1, 1)
-        scaled_data = self.scaler.fit_transform(close_prices)
         
-        X, y = [], []
-        for i in range(self.look_back, len(scaled_data)):
-            X.append(scaled_data[i-self.look_back:i, 0])
-            y.append(scaled_data[i, 0])
+        Every window is min-max scaled on its own range and its target is the
+        next close in that scale, matching how predict_price scales the latest
+        window at inference time.
+        """
+        if self.multivariate:
+            values = compute_features(df).dropna().values
+        else:
+            values = df['Close'].values.reshape(-1, 1)
         
-        X, y = np.array(X), np.array(y)
-        X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+        X, y_index = make_windows(values, self.look_back)
+        X_scaled, low, span = scale_windows(X)
         
-        return X, y
+        # Close is the first column in both modes
+        return X_scaled, (values[y_index, 0] - low[:, 0, 0]) / span[:, 0, 0]
     
     def train_model(self, symbol: str, epochs: int = 50):
         """
@@ -97,14 +109,17 @@ class StockTrainer:
             self.model.fit(X, y, epochs=epochs, batch_size=32)
             
             # Save model
-            self.model.save(f'models/{symbol}_model.h5')
+            self.model_manager.save_model(self.model, f'{symbol}_model.h5')
             
-            return {
+            result = {
                 'status': 'success',
                 'symbol': symbol,
                 'message': f'Model trained successfully for {symbol}',
                 'epochs': epochs
             }
+            if self.tflite_quantization:
+                result['tflite'] = self.export_tflite(symbol, df)
+            return result
             
         except Exception as e:
             raise Exception(f"Error training model: {str(e)}")
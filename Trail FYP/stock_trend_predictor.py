@@ -1,77 +1,83 @@
 import numpy as np
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
-from sklearn.preprocessing import MinMaxScaler
+import tensorflow as tf
 import pandas as pd
 
+from feature_engine import FEATURE_COLUMNS, compute_features, make_windows, scale_windows
+from inference_session import latest_window, predict_trend, window_length
+from model_manager import ModelManager, build_lstm
+
 class StockTrendPredictor:
-    def __init__(self):
+    def __init__(self, multivariate: bool = False, model_dir: str = "models"):
         self.model = None
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
-        self.look_back = 60
+        self.architecture = ModelManager(model_dir).get_architecture('trend')
+        self.look_back = self.architecture['look_back']
+        self.multivariate = multivariate
+        self.n_features = len(FEATURE_COLUMNS) if multivariate else 1
         
     def create_model(self):
-        """Create an LSTM model for trend prediction"""
-        self.model = Sequential([
-            LSTM(50, return_sequences=True, input_shape=(self.look_back, 1)),
-            Dropout(0.2),
-            LSTM(50, return_sequences=True),
-            Dropout(0.2),
-            LSTM(50),
-            Dropout(0.2),
-            Dense(1)
-        ])
-        
-        self.model.compile(optimizer='adam', loss='mean_squared_error')
+        """Create an LSTM model for trend prediction with the registered trend architecture"""
+        self.model = build_lstm(**dict(self.architecture, look_back=self.look_back), n_features=self.n_features)
         
     def prepare_data(self, df: pd.DataFrame):
-        """Prepare data for trend prediction"""
-        close_prices = df['Close'].values.reshape(-1, 1)
-        scaled_data = self.scaler.fit_transform(close_prices)
+        """
+        Prepare data for trend prediction
         
-        x, y = [], []
-        for i in range(self.look_back, len(scaled_data)):
-            x.append(scaled_data[i-self.look_back:i, 0])
-            y.append(scaled_data[i, 0])
+        Every window is min-max scaled on its own range and its target is the
+        next close in that scale, matching how predict_trend scales the latest
+        window, so no fitted scaler is needed at inference time.
+        """
+        if self.multivariate:
+            values = compute_features(df).dropna().values
+        else:
+            values = df['Close'].values.reshape(-1, 1)
         
-        x, y = np.array(x), np.array(y)
-        x = np.reshape(x, (x.shape[0], x.shape[1], 1))
+        x, y_index = make_windows(values, self.look_back)
+        x_scaled, low, span = scale_windows(x)
         
-        return x, y
+        # Close is the first column in both modes
+        return x_scaled, (values[y_index, 0] - low[:, 0, 0]) / span[:, 0, 0]
         
     def train_model(self, df: pd.DataFrame, epochs: int = 50):
-        """Train the trend prediction model"""
+        """
+        Train the trend prediction model
+        
+        Training runs on a copy of the current model that replaces it when
+        done, so inference sessions still holding the old model never see
+        half-updated weights.
+        """
+        model = tf.keras.models.clone_model(self.model)
+        model.set_weights(self.model.get_weights())
+        model.compile(optimizer='adam', loss='mean_squared_error')
+        
         x, y = self.prepare_data(df)
-        self.model.fit(x, y, epochs=epochs, batch_size=32)
+        model.fit(x, y, epochs=epochs, batch_size=32)
+        self.model = model
         
-    def predict_trend(self, df: pd.DataFrame):
+    def set_weights(self, weights: list):
+        """
+        Replace the model with a copy carrying weights, e.g. ones trained in
+        a training process, without touching the model sessions still hold
+        """
+        model = tf.keras.models.clone_model(self.model)
+        model.set_weights(weights)
+        model.compile(optimizer='adam', loss='mean_squared_error')
+        self.model = model
+        
+    def predict_trend(self, df: pd.DataFrame, window: np.ndarray = None, samples: int = 0):
         """
         Predict stock trend (rise or fall)
         
+        Args:
+            df: Historical data for the symbol
+            window: Optional precomputed (look_back, n_features) feature window,
+                e.g. from a FeatureEngine; only used in multivariate mode
+            samples: Monte Carlo dropout passes, run as one batch, for a rise
+                probability and prediction interval (0 for a single pass)
+        
         Returns:
             Dictionary containing trend prediction and confidence
         """
-        # Get the latest 60 data points
-        latest_data = df['Close'].values[-self.look_back:].reshape(-1, 1)
-        scaled_data = self.scaler.transform(latest_data)
-        
-        # Prepare input for prediction
-        x_input = scaled_data.reshape(1, self.look_back, 1)
-        
-        # Make prediction
-        predicted_price_scaled = self.model.predict(x_input)
-        predicted_price = self.scaler.inverse_transform(predicted_price_scaled)[0][0]
-        
-        # Get current price
-        current_price = df['Close'].iloc[-1]
-        
-        # Calculate trend and confidence
-        trend = "rise" if predicted_price > current_price else "fall"
-        confidence = abs((predicted_price - current_price) / current_price) * 100
+        if window is None or not self.multivariate:
+            window = latest_window(df, window_length(self.model), self.multivariate)
         
-        return {
-            "trend": trend,
-            "confidence": float(confidence),
-            "predicted_price": float(predicted_price),
-            "current_price": float(current_price)
-        }
+        return predict_trend(self.model, window, df['Close'].iloc[-1], samples=samples)
@@ -0,0 +1,173 @@
+import threading
+
+import numpy as np
+
+from shared_model import ACTIVATIONS, SharedModel
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+class StreamingLSTM:
+    """
+    Advances an exported LSTM model one bar at a time instead of re-running
+    it over the whole window for every prediction
+
+    The hidden and cell vectors of every LSTM layer are kept for one symbol,
+    anchored at the last bar they have consumed. A prediction after new bars
+    only runs those bars through the recurrence, so a 60-step window costs
+    one step per new bar instead of 60.
+
+    The state comes from a full recompute over a window scaled on that
+    window's range, and new bars are scaled with the same range. Stepping
+    only continues while the current window still has exactly that range,
+    so the inputs match the full recompute's and the prediction differs only
+    by the few bars of context before the window that the state has seen. A
+    full recompute runs again when:
+
+    - there is no state, or it was invalidated;
+    - the anchor bar is no longer in the window (a gap) or its values
+      changed (the series was corrected);
+    - a new bar leaves the anchored [low, high] range, or the bar holding
+      the low or high drops out of the window;
+    - ``max_steps`` bars have been stepped since the anchor.
+
+    A recompute due to ``max_steps`` is also a check: the streamed prediction
+    is computed as well and compared with the full one. When they differ by
+    more than ``tolerance`` (relative), ``max_steps`` is halved, down to a
+    full recompute for every bar.
+
+    Args:
+        model: Exported model to step
+        max_steps: Bars to step before a full recompute (default: 8)
+        tolerance: Allowed relative deviation of a streamed prediction from
+            the full recompute
+    """
+
+    def __init__(self, model: SharedModel, max_steps: int = 8, tolerance: float = 0.001):
+        self.model = model
+        self.look_back = model.input_shape[0]
+        self.max_steps = max_steps
+        self.tolerance = tolerance
+        self.full_recomputes = 0
+        self.incremental_steps = 0
+        self.checks = 0
+        self.tolerance_breaches = 0
+        self.max_checked_deviation = 0.0
+        self._state = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._state = None
+
+    def _step(self, x: np.ndarray, hs, cs) -> np.ndarray:
+        """Feed one scaled input row through every layer, updating hs and cs in place"""
+        out = x[np.newaxis].astype(np.float32)
+        layer = 0
+        for entry, weights in self.model.layers:
+            if entry['type'] == 'LSTM':
+                kernel, recurrent_kernel, bias = weights
+                units = entry['units']
+                # Keras gate order is i, f, c, o
+                z = out @ kernel + hs[layer] @ recurrent_kernel + bias
+                i = _sigmoid(z[:, :units])
+                f = _sigmoid(z[:, units:2 * units])
+                g = np.tanh(z[:, 2 * units:3 * units])
+                o = _sigmoid(z[:, 3 * units:])
+                cs[layer] = f * cs[layer] + i * g
+                hs[layer] = o * np.tanh(cs[layer])
+                out = hs[layer]
+                layer += 1
+            else:
+                kernel, bias = weights
+                out = ACTIVATIONS[entry['activation']](out @ kernel + bias)
+        return out
+
+    def _recompute(self, timestamps: np.ndarray, window: np.ndarray) -> float:
+        low = window.min(axis=0)
+        high = window.max(axis=0)
+        span = high - low
+        span[span == 0] = 1.0
+        scaled = (window - low) / span
+
+        hs = [np.zeros((1, entry['units']), dtype=np.float32)
+              for entry, _ in self.model.layers if entry['type'] == 'LSTM']
+        cs = [np.zeros_like(h) for h in hs]
+        for row in scaled:
+            out = self._step(row, hs, cs)
+
+        self.full_recomputes += 1
+        self._state = {
+            'timestamp': timestamps[-1], 'row': window[-1].copy(), 'low': low, 'high': high, 'span': span,
+            'hs': hs, 'cs': cs, 'steps': 0, 'output': float(out[0][0])
+        }
+        return float(self._state['output'] * span[0] + low[0])
+
+    def predict(self, timestamps: np.ndarray, window: np.ndarray) -> float:
+        """
+        Predict the next close after the last bar of window
+
+        Args:
+            timestamps: Bar timestamps of the window rows, ascending
+            window: Unscaled (look_back, n_features) window; Close is the first column
+
+        Returns:
+            Predicted close in price units
+        """
+        with self._lock:
+            state = self._state
+            if state is None:
+                return self._recompute(timestamps, window)
+
+            anchor = np.searchsorted(timestamps, state['timestamp'])
+            if anchor == len(timestamps) or timestamps[anchor] != state['timestamp'] \
+                    or not np.array_equal(window[anchor], state['row']):
+                return self._recompute(timestamps, window)
+
+            if not (np.array_equal(window.min(axis=0), state['low'])
+                    and np.array_equal(window.max(axis=0), state['high'])):
+                return self._recompute(timestamps, window)
+
+            new_rows = window[anchor + 1:]
+            if len(new_rows) > self.max_steps:
+                return self._recompute(timestamps, window)
+
+            # Step copies, so a failure part-way leaves the anchored state intact
+            hs, cs = list(state['hs']), list(state['cs'])
+            out = None
+            for row in (new_rows - state['low']) / state['span']:
+                out = self._step(row, hs, cs)
+            if out is None:
+                return float(state['output'] * state['span'][0] + state['low'][0])
+
+            if state['steps'] + len(new_rows) > self.max_steps:
+                streamed = float(out[0][0] * state['span'][0] + state['low'][0])
+                full = self._recompute(timestamps, window)
+                self._check(streamed, full)
+                return full
+
+            self.incremental_steps += len(new_rows)
+            state.update(timestamp=timestamps[-1], row=window[-1].copy(), hs=hs, cs=cs,
+                         steps=state['steps'] + len(new_rows), output=float(out[0][0]))
+            return float(state['output'] * state['span'][0] + state['low'][0])
+
+    def _check(self, streamed: float, full: float):
+        """Compare a streamed prediction with the full recompute, stepping less often if it is off"""
+        deviation = abs(streamed - full) / max(abs(full), 1e-12)
+        self.checks += 1
+        self.max_checked_deviation = max(self.max_checked_deviation, deviation)
+        if deviation > self.tolerance:
+            self.tolerance_breaches += 1
+            self.max_steps = max(1, self.max_steps // 2)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "full_recomputes": self.full_recomputes,
+                "incremental_steps": self.incremental_steps,
+                "steps_since_anchor": self._state['steps'] if self._state else None,
+                "max_steps": self.max_steps,
+                "checks": self.checks,
+                "tolerance_breaches": self.tolerance_breaches,
+                "max_checked_deviation": self.max_checked_deviation
+            }
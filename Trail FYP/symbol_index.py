@@ -0,0 +1,187 @@
+import bisect
+import csv
+import io
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ASSET_TYPES = {
+    'Stock': 'Equity',
+    'ETF': 'ETF'
+}
+
+class SymbolIndex:
+    """
+    In-memory typeahead index over the Alpha Vantage listing of active symbols.
+
+    Symbols and the words of each company name are kept in sorted lists so a
+    prefix lookup is a pair of binary searches. A trigram index catches typos
+    and mid-word matches when no prefix matches. The listing is cached on disk
+    and refreshed in the background once it is older than ``refresh_interval``.
+    """
+
+    def __init__(self, data_dir: str = 'data', refresh_interval: float = 24 * 60 * 60, max_results: int = 10):
+        self.listing_path = os.path.join(data_dir, 'listing_status.csv')
+        self.refresh_interval = refresh_interval
+        self.max_results = max_results
+        self.api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
+        self.loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        os.makedirs(data_dir, exist_ok=True)
+
+        self._build([])
+        if os.path.exists(self.listing_path):
+            with open(self.listing_path, newline='') as f:
+                self._build(self._parse_listing(f.read()))
+            self.loaded_at = os.path.getmtime(self.listing_path)
+
+    @staticmethod
+    def _parse_listing(text: str) -> List[Dict[str, str]]:
+        """Parse the LISTING_STATUS csv into records shaped like /search-company results"""
+        records = []
+        for row in csv.DictReader(io.StringIO(text)):
+            if not row.get('symbol') or not row.get('name'):
+                continue
+            records.append({
+                'symbol': row['symbol'],
+                'name': row['name'],
+                'type': ASSET_TYPES.get(row.get('assetType'), row.get('assetType') or ''),
+                'region': 'United States'
+            })
+        return records
+
+    @staticmethod
+    def _trigrams(text: str):
+        padded = f"  {text} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _build(self, records: List[Dict[str, str]]):
+        """Build the lookup tables and swap them in as one unit"""
+        symbols, words, grams = [], [], {}
+        for idx, record in enumerate(records):
+            symbols.append((record['symbol'].upper(), idx))
+            name = record['name'].lower()
+            for word in set(name.split()):
+                words.append((word, idx))
+            for gram in self._trigrams(name):
+                grams.setdefault(gram, []).append(idx)
+        symbols.sort()
+        words.sort()
+        self._index = (records, symbols, words, grams)
+
+    def add(self, records: List[Dict[str, str]]):
+        """Merge records (e.g. upstream search hits) into the index"""
+        current = self._index[0]
+        known = {r['symbol'] for r in current}
+        new = [r for r in records if r['symbol'] not in known]
+        if new:
+            self._build(current + [{k: r[k] for k in ('symbol', 'name', 'type', 'region')} for r in new])
+
+    def refresh(self):
+        """Download the current listing, persist it and rebuild the index"""
+        url = 'https://www.alphavantage.co/query'
+        params = {
+            'function': 'LISTING_STATUS',
+            'apikey': self.api_key
+        }
+
+        response = requests.get(url, params=params)
+        response.raise_for_status()
+        records = self._parse_listing(response.text)
+        if not records:
+            raise ValueError("Empty listing returned by LISTING_STATUS")
+
+        tmp_path = self.listing_path + '.tmp'
+        with open(tmp_path, 'w', newline='') as f:
+            f.write(response.text)
+        os.replace(tmp_path, self.listing_path)
+
+        self._build(records)
+        self.loaded_at = time.time()
+
+    def refresh_if_stale(self):
+        """Start a background refresh when the listing is missing or too old"""
+        if time.time() - self.loaded_at < self.refresh_interval:
+            return
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Symbol listing refresh failed: %s", e)
+                # Back off for a while instead of retrying on every query
+                self.loaded_at = time.time() - self.refresh_interval + 15 * 60
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    @staticmethod
+    def _prefix_range(entries, prefix: str):
+        start = bisect.bisect_left(entries, (prefix,))
+        end = bisect.bisect_left(entries, (prefix + '\uffff',))
+        return entries[start:end]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Rank listed companies against a typeahead query
+
+        Args:
+            query: Partial symbol or company name
+            limit: Maximum number of results (default: max_results)
+
+        Returns:
+            List of matches in the /search-company shape, best first, with
+            ``matchScore`` formatted like Alpha Vantage's (e.g. "0.8000")
+        """
+        limit = limit or self.max_results
+        records, symbols, words, grams = self._index
+        q = query.strip()
+        if not q or not records:
+            return []
+
+        upper, lower = q.upper(), q.lower()
+        scores: Dict[int, float] = {}
+
+        def offer(idx: int, score: float):
+            if score > scores.get(idx, 0.0):
+                scores[idx] = score
+
+        for symbol, idx in self._prefix_range(symbols, upper):
+            offer(idx, len(upper) / len(symbol))
+
+        first_word = lower.split()[0]
+        for word, idx in self._prefix_range(words, first_word):
+            name = records[idx]['name'].lower()
+            if name.startswith(lower):
+                offer(idx, 0.5 + 0.4 * len(lower) / len(name))
+            elif lower in name:
+                offer(idx, 0.3 + 0.3 * len(lower) / len(name))
+
+        if len(scores) < limit:
+            query_grams = self._trigrams(lower)
+            counts: Dict[int, int] = {}
+            for gram in query_grams:
+                for idx in grams.get(gram, ()):
+                    counts[idx] = counts.get(idx, 0) + 1
+            for idx, shared in counts.items():
+                similarity = shared / len(query_grams)
+                if similarity >= 0.5:
+                    offer(idx, 0.5 * similarity)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(records[item[0]]['symbol'])))[:limit]
+        return [dict(records[idx], matchScore=f"{score:.4f}") for idx, score in ranked]
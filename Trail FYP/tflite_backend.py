@@ -0,0 +1,128 @@
+import os
+import threading
+
+import numpy as np
+import tensorflow as tf
+
+from feature_engine import make_windows, scale_windows
+
+try:
+    from ai_edge_litert.interpreter import Interpreter
+except ImportError:  # LiteRT is optional; TensorFlow still ships the interpreter
+    Interpreter = tf.lite.Interpreter
+
+QUANTIZATIONS = ('float16', 'int8')
+
+def tflite_path(model_path: str, quantization: str) -> str:
+    """Path of a model's quantized artifact, beside its .h5 file"""
+    return f"{os.path.splitext(model_path)[0]}.{quantization}.tflite"
+
+def convert_to_tflite(model, quantization: str) -> bytes:
+    """
+    Convert a Keras model to a quantized TFLite flatbuffer
+
+    The model is rewrapped with a fixed batch size of one, which lets the
+    converter lower the LSTM loops to builtin ops.
+
+    Args:
+        model: Keras model
+        quantization: 'float16' for float16 weights, or 'int8' for int8
+            weights with dynamic-range quantized activations
+
+    Returns:
+        The TFLite model as bytes
+    """
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {quantization}, expected one of {QUANTIZATIONS}")
+    inputs = tf.keras.Input(batch_shape=(1,) + tuple(model.input_shape[1:]))
+    fixed = tf.keras.Model(inputs, model(inputs))
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(fixed)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+def holdout_windows(values: np.ndarray, look_back: int, count: int = 256) -> np.ndarray:
+    """
+    The latest windows of a series, scaled the way they are served, for parity checks
+
+    Args:
+        values: Array of shape (n,) or (n, n_features)
+        look_back: Number of time steps per window
+        count: Number of windows to take from the end of the series
+    """
+    x, _ = make_windows(values, look_back)
+    return scale_windows(x[-count:])[0].astype(np.float32)
+
+def check_parity(reference, candidate, x: np.ndarray, max_error: float) -> dict:
+    """
+    Compare a candidate model's outputs against the float model's
+
+    Args:
+        reference: Callable returning the float model's outputs for a batch
+        candidate: Model with a predict(x) method
+        x: Holdout inputs of shape (n, look_back, n_features)
+        max_error: Largest absolute error allowed on any holdout output
+
+    Returns:
+        Dictionary with max_abs_error, mean_abs_error, max_error, holdout_windows and passed
+    """
+    expected = np.asarray(reference(x), dtype=np.float64).reshape(len(x), -1)
+    actual = np.asarray(candidate.predict(x), dtype=np.float64).reshape(len(x), -1)
+    errors = np.abs(actual - expected)
+    return {
+        'max_abs_error': float(errors.max()),
+        'mean_abs_error': float(errors.mean()),
+        'max_error': max_error,
+        'holdout_windows': len(x),
+        'passed': bool(errors.max() <= max_error)
+    }
+
+class TFLiteModel:
+    """
+    Quantized TFLite model with the same predict interface as SharedModel
+
+    Interpreters are not thread safe, so each concurrent caller borrows one
+    from a pool that grows to the peak concurrency seen. Each interpreter
+    runs single-threaded; parallelism comes from concurrent requests.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._content = f.read()
+        self.path = path
+        self.size = len(self._content)
+        self._pool = []
+        self._lock = threading.Lock()
+        interpreter = self._interpreter()
+        self.input_shape = tuple(interpreter.get_input_details()[0]['shape'][1:])
+        self._release(interpreter)
+
+    def _interpreter(self):
+        with self._lock:
+            if self._pool:
+                return self._pool.pop()
+        interpreter = Interpreter(model_content=self._content, num_threads=1)
+        interpreter.allocate_tensors()
+        return interpreter
+
+    def _release(self, interpreter):
+        with self._lock:
+            self._pool.append(interpreter)
+
+    def predict(self, x, **kwargs):
+        """Run the model on a batch of shape (batch, look_back, n_features), one row per invocation"""
+        x = np.asarray(x, dtype=np.float32)
+        interpreter = self._interpreter()
+        try:
+            input_index = interpreter.get_input_details()[0]['index']
+            output_index = interpreter.get_output_details()[0]['index']
+            outputs = []
+            for row in x:
+                interpreter.set_tensor(input_index, row[np.newaxis])
+                interpreter.invoke()
+                outputs.append(interpreter.get_tensor(output_index)[0].copy())
+            return np.stack(outputs)
+        finally:
+            self._release(interpreter)
@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 168
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def _tile_bits(precision: int) -> Tuple[int, int]:
+    """Latitude and longitude bits of a geohash with precision characters"""
+    bits = 5 * precision
+    return bits // 2, bits - bits // 2
+
+def tile_indices(lat, lng, precision: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row and column of the geohash cells containing each point"""
+    lat_bits, lng_bits = _tile_bits(precision)
+    rows = np.floor((np.asarray(lat, dtype=np.float64) + 90) / 180 * (1 << lat_bits)).astype(np.int64)
+    cols = np.floor((np.asarray(lng, dtype=np.float64) + 180) / 360 * (1 << lng_bits)).astype(np.int64)
+    return np.clip(rows, 0, (1 << lat_bits) - 1), np.clip(cols, 0, (1 << lng_bits) - 1)
+
+def tile_centres(rows: np.ndarray, cols: np.ndarray, precision: int) -> Tuple[np.ndarray, np.ndarray]:
+    lat_bits, lng_bits = _tile_bits(precision)
+    return (rows + 0.5) * 180 / (1 << lat_bits) - 90, (cols + 0.5) * 360 / (1 << lng_bits) - 180
+
+def geohash_ids(rows: np.ndarray, cols: np.ndarray, precision: int) -> np.ndarray:
+    """Geohash of each cell as an integer, interleaving longitude and latitude bits"""
+    lat_bits, lng_bits = _tile_bits(precision)
+    ids = np.zeros(np.shape(rows), dtype=np.int64)
+    for i in range(lat_bits + lng_bits):
+        if i % 2 == 0:
+            ids = (ids << 1) | ((cols >> (lng_bits - 1 - i // 2)) & 1)
+        else:
+            ids = (ids << 1) | ((rows >> (lat_bits - 1 - i // 2)) & 1)
+    return ids
+
+def geohash(lat: float, lng: float, precision: int = 6) -> str:
+    """Geohash string of a point"""
+    rows, cols = tile_indices(lat, lng, precision)
+    value = int(geohash_ids(rows, cols, precision))
+    return ''.join(BASE32[(value >> shift) & 31] for shift in range(5 * (precision - 1), -1, -5))
+
+class TileCache:
+    """
+    Cache of traffic predictions per geohash tile and hour of the week
+
+    Predictions depend only on (hour, weekday, latitude, longitude). Every
+    point is therefore answered with the prediction at the centre of its
+    geohash tile for that hour of the week, computed once. A precision-6
+    tile is about 1.2 x 0.6 km, so points are quantized to that.
+
+    Lookups are vectorized. The rows of a batch are reduced to their
+    distinct (tile, hour) keys, and all misses are scored in one
+    predict_batch call. The cache holds at most ``max_entries`` keys, with
+    the least recently used evicted first. It is cleared when ``version()``
+    changes, e.g. when the traffic model file is saved again; listeners
+    registered with add_listener are called then, so that derived caches
+    can be cleared too.
+
+    Args:
+        predict_batch: Callable scoring an (n, 4) array of [hour, weekday,
+            lat, lng] rows
+        precision: Geohash characters per tile
+        max_entries: Largest number of cached (tile, hour) predictions
+        version: Callable returning the traffic model version
+        version_check_interval: Seconds between version checks
+    """
+
+    def __init__(self, predict_batch: Callable[[np.ndarray], np.ndarray], precision: int = 6,
+                 max_entries: int = 1_000_000, version: Optional[Callable[[], str]] = None,
+                 version_check_interval: float = 1.0):
+        self.predict_batch = predict_batch
+        self.precision = precision
+        self.max_entries = max_entries
+        self.version = version
+        self.version_check_interval = version_check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._current_version = version() if version else None
+        self._version_checked = time.monotonic()
+
+    def add_listener(self, callback: Callable[[], None]):
+        """Call callback whenever the cache is invalidated"""
+        self._listeners.append(callback)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+        for callback in self._listeners:
+            callback()
+        logger.info("Traffic tile cache invalidated")
+
+    def _check_version(self):
+        if self.version is None or time.monotonic() - self._version_checked < self.version_check_interval:
+            return
+        self._version_checked = time.monotonic()
+        version = self.version()
+        if version != self._current_version:
+            self._current_version = version
+            self.invalidate()
+
+    def _keys(self, features: np.ndarray):
+        rows, cols = tile_indices(features[:, 2], features[:, 3], self.precision)
+        hours = features[:, 1].astype(np.int64) * 24 + features[:, 0].astype(np.int64)
+        return geohash_ids(rows, cols, self.precision) * HOURS_PER_WEEK + hours, rows, cols, hours
+
+    def __call__(self, features: np.ndarray) -> np.ndarray:
+        """
+        Predictions for an (n, 4) array of [hour, weekday, lat, lng] rows
+
+        Returns:
+            float32 array of n predictions, each the one for the row's tile centre
+        """
+        self._check_version()
+        features = np.asarray(features, dtype=np.float64).reshape(-1, 4)
+        keys, rows, cols, hours = self._keys(features)
+        unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+        values = np.empty(len(unique), dtype=np.float32)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(unique.tolist()):
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    values[i] = value
+            self.hits += len(unique) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            missing = np.array(missing)
+            values[missing] = self._score(rows[first[missing]], cols[first[missing]], hours[first[missing]])
+            self._store(unique[missing], values[missing])
+        return values[inverse]
+
+    def _score(self, rows: np.ndarray, cols: np.ndarray, hours: np.ndarray) -> np.ndarray:
+        lat, lng = tile_centres(rows, cols, self.precision)
+        features = np.column_stack([hours % 24, hours // 24, lat, lng]).astype(np.float32)
+        return np.asarray(self.predict_batch(features), dtype=np.float32).reshape(-1)
+
+    def _store(self, keys: np.ndarray, values: np.ndarray):
+        with self._lock:
+            for key, value in zip(keys.tolist(), values.tolist()):
+                self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def precompute(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                   hours: int, start: Optional[datetime] = None, chunk_rows: int = 1_000_000) -> int:
+        """
+        Fill the cache for every tile of a service area over the next hours
+
+        Args:
+            min_lat, min_lng, max_lat, max_lng: Service area in degrees
+            hours: Number of hours from start to cover
+            start: First hour (defaults to the current hour)
+            chunk_rows: Largest number of predictions per predict_batch call
+
+        Returns:
+            Number of (tile, hour) predictions computed
+        """
+        start = (start or datetime.now()).replace(minute=0, second=0, microsecond=0)
+        first_rows, first_cols = tile_indices(min_lat, min_lng, self.precision)
+        last_rows, last_cols = tile_indices(max_lat, max_lng, self.precision)
+        rows, cols = np.meshgrid(np.arange(first_rows, last_rows + 1), np.arange(first_cols, last_cols + 1),
+                                 indexing='ij')
+        rows, cols = rows.ravel(), cols.ravel()
+        slots = sorted({(start + timedelta(hours=h)).weekday() * 24 + (start + timedelta(hours=h)).hour
+                        for h in range(hours)})
+
+        total = len(rows) * len(slots)
+        if total > self.max_entries:
+            logger.warning("Precomputing %d tile predictions into a cache of %d; the oldest will be evicted",
+                           total, self.max_entries)
+        tile_ids = geohash_ids(rows, cols, self.precision)
+        for how in slots:
+            for i in range(0, len(rows), chunk_rows):
+                chunk = slice(i, i + chunk_rows)
+                hour_column = np.full(len(rows[chunk]), how, dtype=np.int64)
+                values = self._score(rows[chunk], cols[chunk], hour_column)
+                self._store(tile_ids[chunk] * HOURS_PER_WEEK + how, values)
+        logger.info("Precomputed %d tiles x %d hours of traffic predictions", len(rows), len(slots))
+        return total
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "precision": self.precision,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "model_version": self._current_version
+            }
@@ -0,0 +1,140 @@
+import math
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+# Each cell is scored from [hour, weekday, latitude, longitude], the feature
+# order of FYP.py's /traffic-prediction
+N_FEATURES = 4
+
+def grid_axes(min_lat: float, min_lng: float, max_lat: float, max_lng: float, resolution: float):
+    """
+    Cell-centre coordinates of a bounding box divided into square cells
+
+    Args:
+        min_lat, min_lng, max_lat, max_lng: Bounding box in degrees
+        resolution: Cell size in degrees
+
+    Returns:
+        Tuple of (latitudes, longitudes), ascending
+    """
+    if resolution <= 0:
+        raise ValueError("resolution must be positive")
+    if max_lat <= min_lat or max_lng <= min_lng:
+        raise ValueError("Bounding box must have max_lat > min_lat and max_lng > min_lng")
+    lats = np.arange(min_lat, max_lat, resolution) + resolution / 2
+    lngs = np.arange(min_lng, max_lng, resolution) + resolution / 2
+    lats, lngs = lats[lats < max_lat], lngs[lngs < max_lng]
+    if not len(lats) or not len(lngs):
+        raise ValueError("Bounding box is smaller than half a cell; use a finer resolution")
+    return lats, lngs
+
+def time_axis(start: datetime, end: datetime, step: timedelta) -> List[datetime]:
+    """Times from start to end inclusive, step apart"""
+    if step <= timedelta(0):
+        raise ValueError("step must be positive")
+    if end < start:
+        raise ValueError("end must not be before start")
+    times = []
+    while start <= end:
+        times.append(start)
+        start += step
+    return times
+
+def grid_shape(min_lat: float, min_lng: float, max_lat: float, max_lng: float, resolution: float,
+               start: datetime, end: datetime, step: timedelta) -> Tuple[int, int, int]:
+    """
+    Number of (times, latitudes, longitudes) that time_axis and grid_axes
+    would build, computed without building them
+
+    Lets a request be checked against a size limit before anything is
+    allocated. The cell counts can differ by one from grid_axes' through
+    floating point rounding at the box edge.
+
+    Raises:
+        ValueError: For the arguments grid_axes or time_axis reject, and
+            for a box smaller than half a cell
+    """
+    if resolution <= 0:
+        raise ValueError("resolution must be positive")
+    if max_lat <= min_lat or max_lng <= min_lng:
+        raise ValueError("Bounding box must have max_lat > min_lat and max_lng > min_lng")
+    if step <= timedelta(0):
+        raise ValueError("step must be positive")
+    if end < start:
+        raise ValueError("end must not be before start")
+    # Cell centres sit half a cell in, and only those inside the box are kept
+    n_lats = max(0, math.ceil((max_lat - min_lat) / resolution - 0.5))
+    n_lngs = max(0, math.ceil((max_lng - min_lng) / resolution - 0.5))
+    if not n_lats or not n_lngs:
+        raise ValueError("Bounding box is smaller than half a cell; use a finer resolution")
+    return (end - start) // step + 1, n_lats, n_lngs
+
+def grid_features(times: List[datetime], lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """
+    Feature tensor for every (time, latitude, longitude) cell
+
+    Built by broadcasting the per-axis columns against each other, so no
+    Python loop runs per cell.
+
+    Returns:
+        Array of shape (len(times), len(lats), len(lngs), 4)
+    """
+    shape = (len(times), len(lats), len(lngs))
+    hours = np.array([t.hour for t in times], dtype=np.float32)[:, None, None]
+    weekdays = np.array([t.weekday() for t in times], dtype=np.float32)[:, None, None]
+    columns = [hours, weekdays, np.asarray(lats, dtype=np.float32)[None, :, None],
+               np.asarray(lngs, dtype=np.float32)[None, None, :]]
+    return np.stack([np.broadcast_to(column, shape) for column in columns], axis=-1)
+
+def predict_grid(predict_batch: Callable[[np.ndarray], np.ndarray], times: List[datetime],
+                 lats: np.ndarray, lngs: np.ndarray, max_chunk_bytes: int = 64 * 1024 * 1024) -> np.ndarray:
+    """
+    Score every cell of a time x latitude x longitude grid
+
+    Features are materialized a block of time steps at a time (whole
+    latitude rows when a single time step is too large), so peak memory
+    stays around max_chunk_bytes however large the grid is.
+
+    Args:
+        predict_batch: Callable scoring an (n, 4) feature array, returning n scores
+        times, lats, lngs: Grid axes
+        max_chunk_bytes: Largest feature block passed to predict_batch
+
+    Returns:
+        float32 array of shape (len(times), len(lats), len(lngs))
+    """
+    grid = np.empty((len(times), len(lats), len(lngs)), dtype=np.float32)
+    row_bytes = len(lngs) * N_FEATURES * 4
+    rows_per_chunk = max(1, max_chunk_bytes // row_bytes)
+    times_per_chunk = max(1, rows_per_chunk // max(1, len(lats)))
+
+    for t0 in range(0, len(times), times_per_chunk):
+        t1 = min(len(times), t0 + times_per_chunk)
+        if times_per_chunk > 1 or rows_per_chunk >= len(lats):
+            block = grid_features(times[t0:t1], lats, lngs)
+            grid[t0:t1] = np.asarray(predict_batch(block.reshape(-1, N_FEATURES))).reshape(block.shape[:3])
+            continue
+        for r0 in range(0, len(lats), rows_per_chunk):
+            r1 = min(len(lats), r0 + rows_per_chunk)
+            block = grid_features(times[t0:t1], lats[r0:r1], lngs)
+            grid[t0:t1, r0:r1] = np.asarray(predict_batch(block.reshape(-1, N_FEATURES))).reshape(block.shape[:3])
+    return grid
+
+def batch_predictor(traffic_predictor) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Batched scoring function for a TrafficPredictor
+
+    Uses its predict_batch method when it has one, otherwise falls back to
+    calling predict_traffic once per row.
+    """
+    predict_batch = getattr(traffic_predictor, 'predict_batch', None)
+    if predict_batch is not None:
+        return lambda features: np.asarray(predict_batch(features), dtype=np.float32).reshape(-1)
+    return lambda features: np.array([float(traffic_predictor.predict_traffic(list(row))) for row in features],
+                                     dtype=np.float32)
+
+def encode_grid(grid: np.ndarray) -> bytes:
+    """Little-endian float16 bytes of grid in C order (time, latitude, longitude)"""
+    return grid.astype('<f2').tobytes()
@@ -0,0 +1,117 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from cpu_config import configure_process
+
+logger = logging.getLogger(__name__)
+
+# Jobs run in the worker processes. They import the model modules lazily so
+# that TensorFlow starts after configure_process has set the thread budget.
+
+def train_price_model(symbol: str, epochs: int, multivariate: bool) -> dict:
+    """Train and save a symbol's daily price model (StockTrainer.train_model)"""
+    from stock_trainer import StockTrainer
+    return StockTrainer(multivariate=multivariate).train_model(symbol, epochs)
+
+def train_intraday_price_model(symbol: str, df, epochs: int, multivariate: bool):
+    """Train and save a price model on a symbol's intraday history"""
+    from stock_predictor import StockPredictor
+    predictor = StockPredictor("models", multivariate=multivariate)
+    predictor.create_model()
+    predictor.train_model(df, epochs=epochs)
+    predictor.save_model(symbol)
+
+def fine_tune_price_model(symbol: str, df, epochs: int, multivariate: bool):
+    """Continue training a symbol's saved price model on its latest history and save it"""
+    from stock_predictor import StockPredictor
+    predictor = StockPredictor("models", multivariate=multivariate)
+    predictor.model = predictor.model_manager.load_model(f"{symbol}_model.h5")
+    predictor.model.compile(optimizer='adam', loss='mean_squared_error')
+    predictor.model_initialized = True
+    predictor.train_model(df, epochs=epochs)
+    predictor.save_model(symbol)
+
+def train_fused_model(symbol: str, df, epochs: int, multivariate: bool) -> dict:
+    """Train and save a symbol's fused price+trend model"""
+    from fused_predictor import FusedStockPredictor
+    return FusedStockPredictor("models", multivariate=multivariate).train_model(symbol, df, epochs)
+
+def train_trend_weights(weights: list, df, epochs: int, multivariate: bool) -> list:
+    """Continue training the shared trend model from weights, returning the new weights"""
+    from stock_trend_predictor import StockTrendPredictor
+    predictor = StockTrendPredictor(multivariate=multivariate)
+    predictor.create_model()
+    predictor.model.set_weights(weights)
+    predictor.train_model(df, epochs=epochs)
+    return predictor.model.get_weights()
+
+class TrainingPool:
+    """
+    Runs training jobs in worker processes pinned to the training CPUs
+
+    Workers are spawned, not forked, and configure themselves with
+    ``configure_process('training')`` before importing TensorFlow, so
+    training gets its own CPU set, thread pools and lower priority and
+    cannot steal cores or TensorFlow threads from the serving process.
+    Models reach the server through the model files (or, for the shared
+    trend model, returned weights). With ``workers=0`` jobs run in the
+    calling process instead.
+
+    Every server process (e.g. each ``serve.py`` worker) has its own pool.
+    With ``lock_path`` set, run() holds an exclusive lock on that file for
+    the whole job, so pools sharing the path train one job at a time
+    between them and the training CPUs are never oversubscribed. The lock
+    is a no-op where fcntl is unavailable.
+
+    Args:
+        workers: Number of training processes
+        lock_path: Lock file shared by all pools that must not train at once
+    """
+
+    def __init__(self, workers: int = 1, lock_path: Optional[str] = None):
+        self.workers = workers
+        self.lock_path = lock_path
+        self._executor = None
+        if workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=configure_process, initargs=('training',))
+
+    def submit(self, job, *args):
+        """Start job(*args) in a training process and return its Future"""
+        return self._executor.submit(job, *args)
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the training lock shared with the other pools on lock_path"""
+        if self.lock_path is None or fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        # flock belongs to the open file, so threads of one process exclude each other too
+        with open(self.lock_path, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def run(self, job, *args):
+        """
+        Run job(*args) in a training process (or inline without workers) and
+        return its result, holding the training lock while it runs
+        """
+        with self.exclusive():
+            if self._executor is None:
+                return job(*args)
+            return self.submit(job, *args).result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,84 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from prediction_scheduler import DEFAULT_HOT_SYMBOLS
+
+logger = logging.getLogger(__name__)
+
+class Warmup:
+    """
+    Runs a warmup step for each configured symbol in a background thread and
+    tracks readiness for the /ready endpoint.
+
+    Args:
+        warm_symbol: Callable that warms one symbol and returns a dictionary
+            of step name to seconds taken
+        symbols: Symbols to warm; defaults to the WARMUP_SYMBOLS environment
+            variable, falling back to HOT_SYMBOLS
+        warm_shared: Optional callable that warms models shared by all
+            symbols; it runs once before the symbols
+    """
+
+    def __init__(self, warm_symbol: Callable[[str], Dict[str, float]], symbols: Optional[List[str]] = None,
+                 warm_shared: Optional[Callable[[], None]] = None):
+        if symbols is None:
+            symbols = os.getenv('WARMUP_SYMBOLS', os.getenv('HOT_SYMBOLS', DEFAULT_HOT_SYMBOLS)).split(',')
+        self.symbols = [s.strip().upper() for s in symbols if s.strip()]
+        self.warm_symbol = warm_symbol
+        self.warm_shared = warm_shared
+        self.shared_seconds = None
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.failed: Dict[str, str] = {}
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def start(self):
+        self.started_at = time.time()
+        threading.Thread(target=self.run, name="warmup", daemon=True).start()
+
+    def run(self, symbols: Optional[List[str]] = None):
+        """Warm every symbol once; failures are recorded but do not block readiness"""
+        if symbols is None and self.warm_shared is not None:
+            began = time.perf_counter()
+            try:
+                self.warm_shared()
+                self.shared_seconds = time.perf_counter() - began
+                logger.info("Warmed shared models in %.2fs", self.shared_seconds)
+            except Exception as e:
+                self.failed['shared'] = str(e)
+                logger.warning("Warmup of shared models failed: %s", e)
+        for symbol in symbols or self.symbols:
+            began = time.perf_counter()
+            try:
+                steps = self.warm_symbol(symbol)
+                steps['total'] = time.perf_counter() - began
+                self.timings[symbol] = steps
+                logger.info("Warmed %s in %.2fs (%s)", symbol, steps['total'],
+                            ", ".join(f"{name} {seconds:.2f}s" for name, seconds in steps.items() if name != 'total'))
+            except Exception as e:
+                self.failed[symbol] = str(e)
+                logger.warning("Warmup of %s failed: %s", symbol, e)
+        if symbols is None:
+            self.finished_at = time.time()
+            logger.info("Warmup finished in %.2fs, %d/%d symbols ready", self.finished_at - self.started_at,
+                        len(self.timings), len(self.symbols))
+            self._done.set()
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "symbols": self.symbols,
+            "warmed": sorted(self.timings),
+            "failed": self.failed,
+            "shared_seconds": self.shared_seconds,
+            "timings": self.timings,
+            "duration": (self.finished_at or time.time()) - self.started_at if self.started_at else None
+        }